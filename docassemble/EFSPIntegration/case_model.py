@@ -0,0 +1,466 @@
+"""
+A compact model of the cases found in a case search, read from the proxy's JSON-ized
+XML, without saving any of it in the interview's state.
+
+Every search result is saved in the interview's state, including the ones the user
+never opens, so they're kept as these small `__slots__` objects instead of docassemble
+objects with the raw responses on them. Only the case the user picks is turned into
+`ALIndividual`s and `DAObject`s (see [expand_found_case](conversions#expand_found_case)).
+"""
+
+import re
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+__all__ = [
+    "CaseAddress",
+    "CasePerson",
+    "CaseSummary",
+    "parse_case_entry",
+    "add_case_details",
+]
+
+_CASE_AUGMENTATION = "{urn:tyler:ecf:extensions:Common}CaseAugmentation"
+# The parts of a CaseAugmentation that the parties are read from
+_PARTY_KEYS = ("caseParticipant", "caseOtherEntityAttorney")
+_NIEM = "{http://niem.gov/niem/niem-core/2.0}"
+
+
+def _get(xml_val: Any, elems: Sequence[Union[str, int]]) -> Any:
+    """Like [chain_xml](conversions#chain_xml), but without logging what's missing"""
+    val = xml_val
+    for elem in elems:
+        if not val:
+            return None
+        if isinstance(val, dict):
+            val = val.get(elem) or {}
+        else:
+            try:
+                val = val[elem]
+            except (IndexError, KeyError, TypeError):
+                val = {}
+    return val
+
+
+def _slot_values(obj: Any) -> Tuple:
+    """The values of an object's slots, in order. Pickled instead of the default
+    {slot: value} dict, so that the slot names aren't saved again for every person"""
+    return tuple(getattr(obj, slot) for slot in obj.__slots__)
+
+
+def _set_slot_values(obj: Any, values: Tuple) -> None:
+    for slot, value in zip(obj.__slots__, values):
+        setattr(obj, slot, value)
+
+
+class CaseAddress:
+    """A party's mailing address. Only the parts the court gave are set"""
+
+    __slots__ = ("address", "city", "state", "zip")
+
+    def __init__(
+        self,
+        address: Optional[str] = None,
+        city: Optional[str] = None,
+        state: Optional[str] = None,
+        zip: Optional[str] = None,
+    ):
+        self.address = address
+        self.city = city
+        self.state = state
+        self.zip = zip
+
+    def __getstate__(self) -> Tuple:
+        return _slot_values(self)
+
+    def __setstate__(self, state: Tuple) -> None:
+        _set_slot_values(self, state)
+
+    def __repr__(self) -> str:
+        return f"CaseAddress({self.address!r}, {self.city!r}, {self.state!r}, {self.zip!r})"
+
+
+class CasePerson:
+    """A participant or attorney in a case.
+
+    Names that are None weren't given (or were sealed), unlike empty names, which were
+    given but empty. `party_type`, `party_type_name` and `person_type` are only set
+    for participants, and `attorney_ids` are the ids of the attorneys representing them.
+    """
+
+    __slots__ = (
+        "tyler_id",
+        "party_type",
+        "party_type_name",
+        "person_type",
+        "first",
+        "middle",
+        "last",
+        "phone_number",
+        "email",
+        "address",
+        "is_redacted",
+        "attorney_ids",
+    )
+
+    def __init__(self, tyler_id: Optional[str] = None):
+        self.tyler_id = tyler_id
+        self.party_type: Optional[str] = None
+        self.party_type_name: Optional[str] = None
+        self.person_type: Optional[str] = None
+        self.first: Optional[str] = None
+        self.middle: Optional[str] = None
+        self.last: Optional[str] = None
+        self.phone_number: Optional[str] = None
+        self.email: Optional[str] = None
+        self.address: Optional[CaseAddress] = None
+        self.is_redacted = False
+        self.attorney_ids: List[Optional[str]] = []
+
+    def full_name(self) -> str:
+        return " ".join(name for name in [self.first, self.middle, self.last] if name)
+
+    def __getstate__(self) -> Tuple:
+        return _slot_values(self)
+
+    def __setstate__(self, state: Tuple) -> None:
+        _set_slot_values(self, state)
+
+    def __repr__(self) -> str:
+        return f"CasePerson({self.tyler_id!r}, {self.full_name()!r})"
+
+
+# The participants, attorneys and the attorneys of each party in a case
+_Parties = Tuple[
+    List[CasePerson],
+    Dict[Optional[str], CasePerson],
+    Dict[Optional[str], List[Optional[str]]],
+]
+
+
+class CaseSummary:
+    """What we know about one found case. The header (the ids, title and category)
+    comes from the search result. The rest is only filled in by
+    [add_case_details](#add_case_details), after which `fetched` is true.
+
+    The parties are only read from the details the first time `participants`,
+    `attorneys` or `party_to_attorneys` is used, and kept after that. Until then, just
+    the raw JSON of the parties and attorneys is kept, even when the summary is pickled,
+    so saving a page of search results doesn't read the parties of cases no one opens.
+    The tradeoff is size: until they're read, each fetched case saves that JSON (about
+    20 KiB for a case with a few parties) instead of the parties read from it (under 1
+    KiB), so a saved search is several times bigger than it would be with every party
+    read up front (see `test/benchmark_case_state.py`). Only the few results whose
+    details were fetched have any.
+    """
+
+    __slots__ = (
+        "court_id",
+        "tracking_id",
+        "docket_number",
+        "category",
+        "title",
+        "fetched",
+        "details_worked",
+        "date_ms",
+        "case_type",
+        "lower_docket_number",
+        "lower_case_title",
+        "lower_judge",
+        "_party_xml",
+        "_roles",
+        "_parties",
+    )
+
+    def __init__(
+        self,
+        court_id: str,
+        tracking_id: Optional[str] = None,
+        docket_number: Optional[str] = None,
+        category: Optional[str] = None,
+        title: Optional[str] = None,
+    ):
+        self.court_id = court_id
+        self.tracking_id = tracking_id
+        self.docket_number = docket_number
+        self.category = category
+        self.title = title
+        self.fetched = False
+        self.details_worked: Optional[Tuple[int, Optional[str]]] = None
+        self.date_ms = 0
+        self.case_type: Optional[str] = None
+        self.lower_docket_number: Any = None
+        self.lower_case_title: Any = None
+        self.lower_judge: Any = None
+        self._party_xml: Optional[List[Mapping]] = None
+        self._roles: Mapping = {}
+        self._parties: Optional[_Parties] = ([], {}, {})
+
+    def _load_parties(self) -> _Parties:
+        if self._parties is None:
+            # Always kept until the parties are read
+            assert self._party_xml is not None
+            self._parties = _parse_parties(self._party_xml, self._roles)
+            self._party_xml = None
+            self._roles = {}
+        return self._parties
+
+    @property
+    def participants(self) -> List[CasePerson]:
+        return self._load_parties()[0]
+
+    @property
+    def attorneys(self) -> Dict[Optional[str], CasePerson]:
+        return self._load_parties()[1]
+
+    @property
+    def party_to_attorneys(self) -> Dict[Optional[str], List[Optional[str]]]:
+        return self._load_parties()[2]
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        for slot, value in state.items():
+            setattr(self, slot, value)
+
+    def __repr__(self) -> str:
+        return f"CaseSummary({self.court_id!r}, {self.tracking_id!r}, {self.title!r})"
+
+
+def parse_case_entry(entry: Optional[Mapping], court_id: str) -> CaseSummary:
+    """The header of a case from a search result, usually from `get_cases`"""
+    return CaseSummary(
+        court_id,
+        tracking_id=_get(entry, ["value", "caseTrackingID", "value"]),
+        docket_number=_get(entry, ["value", "caseDocketID", "value"]),
+        category=_get(entry, ["value", "caseCategoryText", "value"]),
+        title=_get(entry, ["value", "caseTitleText", "value"]),
+    )
+
+
+def _readable(name: str) -> str:
+    # TODO(brycew): some french last names are all caps? It could happen, but this is best for now.
+    if len(name) > 1 and name.isupper():
+        return name.title()
+    return name
+
+
+def _parse_name(person: CasePerson, name_val: Optional[Mapping]) -> None:
+    name_val = name_val or {}
+    person.first = _readable(_get(name_val, ["personGivenName", "value"]) or "")
+    person.middle = _readable(_get(name_val, ["personMiddleName", "value"]) or "")
+    person.last = _readable(_get(name_val, ["personSurName", "value"]) or "")
+
+
+def _parse_phone_number(phone_xml: Optional[Mapping]) -> Optional[str]:
+    """Parses a nc:TelephoneNumberType into a string"""
+    if phone_xml is None:
+        return None
+    name = phone_xml.get("name")
+    if name == _NIEM + "FullTelephoneNumber":
+        return _get(phone_xml, ["value", "telephoneNumberFullID", "value"])
+    elif name == _NIEM + "InternationalTelephoneNumber":
+        return (_get(phone_xml, ["value", "telephoneCountryCodeID", "value"]) or "") + (
+            _get(phone_xml, ["value", "telephoneNumberID", "value"]) or ""
+        )
+    elif name == _NIEM + "NANPTelephoneNumber":
+        tp = phone_xml.get("value") or {}
+        return (
+            (_get(tp, ["telephoneAreaCodeID", "value"]) or "")
+            + (_get(tp, ["telephoneExchangeID", "value"]) or "")
+            + (_get(tp, ["telephoneLineID", "value"]) or "")
+        )
+    # TODO(brycew): no telephone type we recognize?
+    return None
+
+
+def _parse_address(address_xml: Optional[Mapping]) -> CaseAddress:
+    address = CaseAddress()
+    street_xml = _get(address_xml, ["value", "addressDeliveryPoint", 0, "value"])
+    if street_xml:
+        street_full = _get(street_xml, ["streetFullText", "value"])
+        if street_full:
+            address.address = street_full
+        else:
+            street_name = _get(street_xml, ["streetName", "value"])
+            street_number = _get(street_xml, ["streetNumberText", "value"])
+            if street_name and street_number:
+                address.address = f"{street_number} {street_name}"
+    for attr, field in [("city", "locationCityName"), ("zip", "locationPostalCode")]:
+        part_xml = _get(address_xml, ["value", field]) or {}
+        if "value" in part_xml:
+            setattr(address, attr, part_xml.get("value"))
+    state = _get(address_xml, ["value", "locationState", "value", "value"])
+    if state:
+        address.state = state
+    return address
+
+
+def _parse_contact_means(person: CasePerson, entity: Mapping) -> None:
+    contact_info: Mapping = next(
+        iter((entity.get("personAugmentation") or {}).get("contactInformation") or []),
+        {},
+    )
+    for contact in contact_info.get("contactMeans") or []:
+        name = contact.get("name")
+        value = contact.get("value") or {}
+        if name == _NIEM + "ContactTelephoneNumber":
+            phone = _parse_phone_number(value.get("telephoneNumberRepresentation"))
+            if phone:
+                person.phone_number = phone
+        elif name == _NIEM + "ContactMailingAddress":
+            person.address = _parse_address(value.get("addressRepresentation"))
+        elif name == _NIEM + "ContactEmailID":
+            email = value.get("value")
+            # Sometimes the email of a user can be redacted / sealed, but we aren't told about it.
+            if email:
+                if "@" in email:  # the simplest email regex
+                    person.email = email
+                else:
+                    person.is_redacted = True
+
+
+def _is_person(entity: Mapping) -> bool:
+    return entity.get("personOtherIdentification") is not None
+
+
+def _participant_id(entity: Mapping) -> Optional[str]:
+    if _is_person(entity):
+        return _get(
+            entity, ["personOtherIdentification", 0, "identificationID", "value"]
+        )
+    return _get(
+        entity,
+        [
+            "organizationIdentification",
+            "value",
+            "identification",
+            0,
+            "identificationID",
+            "value",
+        ],
+    )
+
+
+def _parse_participant(participant_val: Mapping, roles: Mapping) -> CasePerson:
+    """Reads a CaseParticipantType"""
+    person = CasePerson()
+    person.party_type = _get(
+        participant_val, ["value", "caseParticipantRoleCode", "value"]
+    )
+    person.party_type_name = (roles.get(person.party_type) or {}).get("name")
+    entity = _get(participant_val, ["value", "entityRepresentation", "value"]) or {}
+    if _is_person(entity):
+        person.person_type = "ALIndividual"
+        _parse_name(person, entity.get("personName"))
+        _parse_contact_means(person, entity)
+    else:
+        person.person_type = "business"
+        person.first = _get(entity, ["organizationName", "value"]) or ""
+    if person.full_name().lower() == "**sealed**":
+        # If their name is this exact string, it's likely that the case is redacted somehow.
+        person.is_redacted = True
+        person.first = None
+        person.last = None
+    person.tyler_id = _participant_id(entity)
+    return person
+
+
+def _parse_attorney(attorney_val: Mapping) -> CasePerson:
+    """Reads a caseOtherEntityAttorney"""
+    entity = _get(attorney_val, ["roleOfPersonReference", "ref"])
+    person = CasePerson(
+        _get(entity, ["personOtherIdentification", 0, "identificationID", "value"])
+    )
+    if entity:
+        _parse_name(person, entity.get("personName"))
+        _parse_contact_means(person, entity)
+    return person
+
+
+def _clean_title(title: str) -> str:
+    title = re.sub(
+        r"([A-Z])In the Matter of the Estate of([A-Z])",
+        r"\1 In the Matter of the Estate of \2",
+        title,
+    )
+    return re.sub(r"([A-Z])vs([A-Z])", r"\1 vs \2", title)
+
+
+def add_case_details(
+    case: CaseSummary, case_details: Optional[Mapping], roles: Optional[Mapping] = None
+) -> CaseSummary:
+    """Fills in the rest of `case` from the proxy's full details about it (from
+    `get_case`). The parties are read from them when they're first used.
+
+    Args:
+      roles: the party type codes to party types, to name each participant's type
+    """
+    roles = roles or {}
+    case_details = case_details or {}
+    rest = _get(case_details, ["value", "rest"]) or []
+    # TODO: is the order of this array predictable? might it break if Tyler changes something?
+    case.case_type = _get(rest, [1, "value", "caseTypeText", "value"]) or None
+    court = _get(
+        rest,
+        [
+            0,
+            "value",
+            "caseCourt",
+            "organizationIdentification",
+            "value",
+            "identificationID",
+            "value",
+        ],
+    )
+    if court:
+        case.court_id = court
+    title = _get(case_details, ["value", "caseTitleText", "value"])
+    if title:
+        case.title = _clean_title(title)
+    case.date_ms = (
+        _get(
+            case_details,
+            ["value", "activityDateRepresentation", "value"]
+            + ["dateRepresentation", "value", "value"],
+        )
+        or 0
+    )
+    case._party_xml = []
+    case._roles = roles
+    case._parties = None
+    for aug in rest:
+        value = aug.get("value") or {}
+        if "AppellateCaseOriginalCase" in (aug.get("declaredType") or ""):
+            case.lower_docket_number = value.get("caseDocketID")
+            case.lower_case_title = value.get("caseTitleText")
+        if aug.get("name") == _CASE_AUGMENTATION:
+            case.lower_judge = value.get("lowerCourtJudgeText")
+            # Only what _parse_parties reads, not the rest of the augmentation
+            case._party_xml.append(
+                {key: value[key] for key in _PARTY_KEYS if key in value}
+            )
+    case.fetched = True
+    return case
+
+
+def _parse_parties(augmentations: List[Mapping], roles: Mapping) -> _Parties:
+    """Reads the participants and attorneys from the CaseAugmentations of a case"""
+    participants: List[CasePerson] = []
+    attorneys: Dict[Optional[str], CasePerson] = {}
+    party_to_attorneys: Dict[Optional[str], List[Optional[str]]] = {}
+    for value in augmentations:
+        for participant in value.get("caseParticipant") or []:
+            role = _get(participant, ["value", "caseParticipantRoleCode", "value"])
+            if (role or "").upper() != "ATTY":
+                participants.append(_parse_participant(participant, roles))
+        for attorney_val in value.get("caseOtherEntityAttorney") or []:
+            attorney = _parse_attorney(attorney_val)
+            attorneys[attorney.tyler_id] = attorney
+            for party in attorney_val.get("caseRepresentedPartyReference") or []:
+                party_id = _participant_id(party.get("ref") or {})
+                party_to_attorneys.setdefault(party_id, []).append(attorney.tyler_id)
+                for participant in participants:
+                    if participant.tyler_id == party_id:
+                        participant.attorney_ids.append(attorney.tyler_id)
+    return participants, attorneys, party_to_attorneys
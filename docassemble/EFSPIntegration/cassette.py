@@ -0,0 +1,221 @@
+"""
+Records the proxy's real responses to "cassette" files, and plays them back later
+without a proxy, so interview code can be benchmarked and tested against real Tyler
+payloads.
+
+Passwords, tokens, and the names, addresses and contact details of filers and parties
+are masked before anything is written:
+
+```
+with proxy_conn.use_cassette("cook_case_search.json", record=True):
+    proxy_conn.get_cases_raw("cook", person_name={...})
+
+# Later, with no proxy running; timing_scale=1 waits as long as the proxy did
+with proxy_conn.use_cassette("cook_case_search.json", timing_scale=1):
+    proxy_conn.get_cases_raw("cook", person_name={...})
+```
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Pattern
+
+import requests
+from requests import PreparedRequest, Response
+from urllib.parse import urlsplit
+
+from .redaction import (
+    PII_KEYS,
+    SENSITIVE_KEYS,
+    mask_value,
+    redact_headers,
+    redact_url,
+)
+from .transports import Transport, build_response
+
+__all__ = [
+    "CASSETTE_KEYS",
+    "CassetteMiss",
+    "CassetteRecorder",
+    "CassettePlayer",
+]
+
+CASSETTE_VERSION = 1
+
+# Everything masked in a cassette: secrets, and personal details
+CASSETTE_KEYS: Pattern = re.compile(
+    f"{SENSITIVE_KEYS.pattern}|{PII_KEYS.pattern}", re.IGNORECASE
+)
+
+# Describe how the original body was sent, not the one that's replayed
+_DROPPED_HEADERS = {"content-length", "content-encoding", "transfer-encoding"}
+
+
+class CassetteMiss(requests.exceptions.RequestException):
+    """A request that the cassette has no recorded response for"""
+
+
+def _request_key(method: Optional[str], url: Optional[str], keys: Pattern) -> str:
+    """What requests are matched on: the method, path and masked query, but not the
+    host, so a cassette recorded against one proxy can be played against any URL"""
+    parts = urlsplit(redact_url(url, keys) or "")
+    path = parts.path + (f"?{parts.query}" if parts.query else "")
+    return f"{method} {path}"
+
+
+def _mask_body(body: Any, keys: Pattern) -> Dict[str, Any]:
+    """Keeps JSON bodies (masked) as JSON. Other bodies can't be masked safely, so only
+    their length is kept."""
+    if body is None or body == b"" or body == "":
+        return {}
+    if isinstance(body, bytes):
+        try:
+            body = body.decode("utf-8")
+        except UnicodeDecodeError:
+            return {"omitted": f"{len(body)} bytes of binary data"}
+    try:
+        return {"json": mask_value(json.loads(body), keys)}
+    except ValueError:
+        return {"omitted": f"{len(body)} characters of non-JSON data"}
+
+
+class CassetteRecorder(Transport):
+    """A transport that sends each request with `inner`, and keeps a masked copy of the
+    request and its response to save to `path`.
+
+    Args:
+      inner: what actually sends the requests, usually the connection's `proxy_client`
+      keys: the fields, query params and headers whose values are masked
+    """
+
+    def __init__(self, path: str, inner: Any, *, keys: Pattern = CASSETTE_KEYS):
+        self.path = path
+        self.inner = inner
+        self.keys = keys
+        self.interactions: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def send(self, request: PreparedRequest, **kwargs) -> Response:
+        start = time.monotonic()
+        resp = self.inner.send(request, **kwargs)
+        resp.content
+        elapsed = time.monotonic() - start
+        interaction = {
+            "request": {
+                "key": _request_key(request.method, request.url, self.keys),
+                "method": request.method,
+                "url": redact_url(request.url, self.keys),
+                "headers": redact_headers(request.headers),
+                "body": _mask_body(request.body, self.keys),
+            },
+            "response": {
+                "status": resp.status_code,
+                "reason": resp.reason,
+                "headers": {
+                    k: v
+                    for k, v in redact_headers(resp.headers).items()
+                    if k.lower() not in _DROPPED_HEADERS
+                },
+                "encoding": resp.encoding,
+                "body": _mask_body(resp.content, self.keys),
+            },
+            "elapsed": elapsed,
+        }
+        with self._lock:
+            self.interactions.append(interaction)
+        return resp
+
+    def save(self) -> None:
+        """Writes everything recorded so far, replacing the cassette at `path`"""
+        with self._lock:
+            cassette = {
+                "version": CASSETTE_VERSION,
+                "recorded_at": datetime.now(timezone.utc).isoformat(),
+                "interactions": list(self.interactions),
+            }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(cassette, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+
+class CassettePlayer(Transport):
+    """A transport that answers requests from a cassette, without any network.
+
+    Requests are matched on their method, path and query. If the same request was
+    recorded several times, the responses are played in the order they were recorded,
+    and the last one is repeated after that.
+
+    Args:
+      timing_scale: how long to wait before each response, as a multiple of how long
+          the proxy took when it was recorded. 0 doesn't wait at all
+    """
+
+    def __init__(
+        self, path: str, *, timing_scale: float = 0.0, keys: Pattern = CASSETTE_KEYS
+    ):
+        with open(path) as f:
+            cassette = json.load(f)
+        if cassette.get("version") != CASSETTE_VERSION:
+            raise ValueError(
+                f"{path} is a version {cassette.get('version')} cassette, "
+                f"only version {CASSETTE_VERSION} can be played"
+            )
+        self.path = path
+        self.timing_scale = timing_scale
+        self.keys = keys
+        self.interactions: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for interaction in cassette.get("interactions", []):
+            self.interactions[interaction["request"]["key"]].append(interaction)
+        self._played: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def rewind(self) -> None:
+        """Plays every response from the start again"""
+        with self._lock:
+            self._played.clear()
+
+    def unplayed(self) -> List[str]:
+        """The requests that were recorded but haven't been asked for yet"""
+        with self._lock:
+            return [
+                key
+                for key, recorded in self.interactions.items()
+                if self._played[key] < len(recorded)
+            ]
+
+    def send(self, request: PreparedRequest, **kwargs) -> Response:
+        key = _request_key(request.method, request.url, self.keys)
+        with self._lock:
+            recorded = self.interactions.get(key)
+            if not recorded:
+                raise CassetteMiss(
+                    f"{self.path} has no response for {key}", request=request
+                )
+            interaction = recorded[min(self._played[key], len(recorded) - 1)]
+            self._played[key] += 1
+        elapsed = interaction.get("elapsed", 0.0)
+        if self.timing_scale:
+            time.sleep(elapsed * self.timing_scale)
+        return _response(request, interaction["response"], elapsed)
+
+
+def _response(
+    request: PreparedRequest, recorded: Dict[str, Any], elapsed: float
+) -> Response:
+    encoding = recorded.get("encoding") or "utf-8"
+    body = recorded.get("body") or {}
+    return build_response(
+        request,
+        recorded["status"],
+        json.dumps(body["json"]).encode(encoding) if "json" in body else b"",
+        headers=recorded.get("headers"),
+        reason=recorded.get("reason"),
+        encoding=encoding,
+        elapsed=elapsed,
+    )
@@ -0,0 +1,270 @@
+"""
+Keeps the proxy's responses for court codes in memory, shared by every
+[EfspConnection](#EfspConnection) in a process, and saves them to and loads them from
+snapshot files.
+
+Only the proxy's `codes/` endpoints are cached. The proxy answers those from its own
+copy of each jurisdiction's code tables, which it downloads from Tyler with its own
+account, and doesn't read the user's Tyler login for them. So a code URL (which has
+the jurisdiction in it) gets the same response for every user until the proxy
+refreshes its tables, and one worker's response can answer everyone's. Anything that
+goes to Tyler as the user, like a court's policy, isn't cached or loaded from
+snapshots. Nothing is cached until a cache is set with
+[set_code_cache](#set_code_cache) (or the `code cache hours` config in docassemble).
+
+A snapshot is a gzipped file: a JSON header line with the format version, then one
+JSON line with the key and body of each response. Make one with
+`python -m docassemble.EFSPIntegration.code_snapshot export`, and load it when a
+worker starts with [load_code_snapshot](#load_code_snapshot).
+"""
+
+import gzip
+import json
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from .endpoints import endpoint_template
+
+__all__ = [
+    "SNAPSHOT_FORMAT",
+    "SNAPSHOT_VERSION",
+    "CodeCache",
+    "SnapshotError",
+    "code_cache_key",
+    "get_code_cache",
+    "set_code_cache",
+    "load_code_snapshot",
+    "open_snapshot",
+    "write_snapshot",
+]
+
+SNAPSHOT_FORMAT = "efsp-code-snapshot"
+SNAPSHOT_VERSION = 1
+
+# Use counts that fade below this are forgotten, so one use is kept for a half-life
+_MIN_USES = 0.5
+
+
+class SnapshotError(ValueError):
+    """A snapshot file that can't be read, or is from a newer version of this package"""
+
+
+def code_cache_key(method: str, url: str, base_url: str) -> Optional[str]:
+    """The key for a request's response in a [CodeCache](#CodeCache): the URL without
+    the server, so snapshots can be loaded by workers that use a different proxy URL.
+    None if the response shouldn't be cached."""
+    if method != "GET" or not url.startswith(base_url):
+        return None
+    if not endpoint_template(url, base_url).startswith("codes/"):
+        return None
+    return url[len(base_url) :]
+
+
+def _is_search(key: str) -> bool:
+    """If a key is a search for a term (like `?search=motion`). An empty search, which
+    gets every name, isn't one."""
+    return bool(parse_qs(urlsplit(key).query).get("search"))
+
+
+class CodeCache:
+    """The raw bodies of successful code responses, by [code_cache_key](#code_cache_key).
+
+    Args:
+      ttl: seconds to keep a response
+      max_entries: the most responses to keep. The least recently used are dropped
+      uses_half_life: seconds for the count of how often a response was used to halve
+    """
+
+    def __init__(
+        self,
+        ttl: float = 12 * 60 * 60,
+        max_entries: int = 50_000,
+        uses_half_life: float = 24 * 60 * 60,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.uses_half_life = uses_half_life
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # How often each key was asked for lately, to know which to keep warm
+        self.uses: Counter = Counter()
+        self._uses_decayed_at = time.time()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """The body stored for `key`, if it isn't older than the ttl"""
+        with self._lock:
+            # Searches are mostly typed once, and aren't worth keeping warm
+            if not _is_search(key):
+                self.uses[key] += 1
+            stored = self._entries.get(key)
+            if stored is None or time.time() - stored[0] >= self.ttl:
+                if stored is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return stored[1]
+
+    def put(self, key: str, body: bytes, stored_at: Optional[float] = None) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() if stored_at is None else stored_at, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stored_at(self, key: str) -> Optional[float]:
+        """When `key` was stored, even if it's expired. None if it isn't stored"""
+        stored = self._entries.get(key)
+        return stored[0] if stored else None
+
+    def expiring(self, within: float) -> List[str]:
+        """The stored keys that expire in less than `within` seconds (or already have),
+        the most used lately first"""
+        # inf - inf is nan, which nothing is less than
+        cutoff = time.time() + (within - self.ttl if within < self.ttl else 0)
+        with self._lock:
+            keys = [
+                key
+                for key, (stored_at, _) in self._entries.items()
+                if stored_at <= cutoff
+            ]
+            return sorted(keys, key=lambda key: -self.uses[key])
+
+    def decay_uses(self, now: Optional[float] = None) -> None:
+        """Fades every use count by how long it's been since they were last faded, so a
+        count halves every `uses_half_life` seconds. What's popular now counts for more
+        than what was popular last week, but yesterday's busy codes are still warm."""
+        now = time.time() if now is None else now
+        with self._lock:
+            elapsed = now - self._uses_decayed_at
+            if elapsed <= 0:
+                return
+            self._uses_decayed_at = now
+            factor = 0.5 ** (elapsed / self.uses_half_life)
+            self.uses = Counter(
+                {
+                    key: count * factor
+                    for key, count in self.uses.items()
+                    if count * factor >= _MIN_USES
+                }
+            )
+
+    def items(self) -> List[Tuple[str, bytes]]:
+        """Every stored (key, body), oldest used first, including expired ones"""
+        with self._lock:
+            return [(key, body) for key, (_, body) in self._entries.items()]
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Forgets one response, or all of them if `key` is None"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+_cache: Optional[CodeCache] = None
+
+
+def get_code_cache() -> Optional[CodeCache]:
+    return _cache
+
+
+def set_code_cache(cache: Optional[CodeCache]) -> None:
+    """Sets the cache that every connection in this process uses. None turns caching off"""
+    global _cache
+    _cache = cache
+
+
+def write_snapshot(
+    path: str, entries: Iterable[Tuple[str, bytes]], **header: Any
+) -> int:
+    """Writes (key, body) entries to a snapshot file, with `header` added to the version
+    header. Returns how many were written."""
+    tmp_path = f"{path}.tmp"
+    count = 0
+    with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=9) as f:
+        f.write(
+            json.dumps(
+                {
+                    "format": SNAPSHOT_FORMAT,
+                    "version": SNAPSHOT_VERSION,
+                    "created_at": time.time(),
+                    **header,
+                }
+            )
+            + "\n"
+        )
+        for key, body in entries:
+            f.write(json.dumps([key, body.decode("utf-8")], separators=(",", ":")))
+            f.write("\n")
+            count += 1
+    os.replace(tmp_path, path)
+    return count
+
+
+@contextmanager
+def open_snapshot(
+    path: str,
+) -> Iterator[Tuple[Dict[str, Any], Iterator[Tuple[str, bytes]]]]:
+    """Opens a snapshot file, giving its header and an iterator over its (key, body)
+    entries, which can only be read inside the `with` block"""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        try:
+            header = json.loads(f.readline())
+        except (OSError, ValueError) as ex:
+            raise SnapshotError(f"{path} isn't a code snapshot: {ex}")
+        if not isinstance(header, dict) or header.get("format") != SNAPSHOT_FORMAT:
+            raise SnapshotError(f"{path} isn't a code snapshot")
+        if header.get("version", 0) > SNAPSHOT_VERSION:
+            raise SnapshotError(
+                f"{path} is version {header.get('version')}, and this package can "
+                f"only read up to version {SNAPSHOT_VERSION}"
+            )
+
+        def entries() -> Iterator[Tuple[str, bytes]]:
+            for line in f:
+                if line.strip():
+                    key, body = json.loads(line)
+                    yield key, body.encode("utf-8")
+
+        yield header, entries()
+
+
+def load_code_snapshot(
+    path: str, cache: Optional[CodeCache] = None, *, max_age: Optional[float] = None
+) -> int:
+    """Puts every response in a snapshot file into `cache`, or the process' cache (which
+    is made if there isn't one yet). Returns how many were loaded.
+
+    The responses are kept for the cache's full ttl from now, not from when the
+    snapshot was made, unless the snapshot is older than `max_age` seconds, in which
+    case nothing is loaded.
+    """
+    with open_snapshot(path) as (header, entries):
+        if max_age is not None and time.time() - header.get("created_at", 0) > max_age:
+            return 0
+        if cache is None:
+            cache = get_code_cache()
+            if cache is None:
+                cache = CodeCache()
+                set_code_cache(cache)
+        count = 0
+        for key, body in entries:
+            # Older snapshots could have responses that aren't the same for everyone
+            if code_cache_key("GET", key, "") != key:
+                continue
+            cache.put(key, body)
+            count += 1
+        return count
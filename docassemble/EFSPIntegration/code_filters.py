@@ -0,0 +1,335 @@
+"""
+Picks codes (filing types, party types, etc.) out of a court's code list with simple
+filters that can be saved in interview dicts: a label to match, a `CodeType`, a
+`ContainAny` list, or a list of words that all have to be in the label.
+
+A code list is normalized once into a [CodeIndex](#CodeIndex), and each filter is
+compiled once into a [CodeFilter](#CodeFilter), so trying many filters against the same
+big list doesn't lowercase every label again for every filter.
+
+Doesn't include anything from docassemble, and can be used without having it installed.
+"""
+
+from abc import ABC, abstractmethod
+from bisect import bisect_right
+from collections import OrderedDict
+from functools import lru_cache
+import threading
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+__all__ = [
+    "CodeType",
+    "ContainAny",
+    "SearchType",
+    "CodeIndex",
+    "CodeFilter",
+    "code_index",
+    "make_filter",
+    "make_filters",
+    "select_codes",
+]
+
+
+class CodeType(str):
+    pass
+
+
+class ContainAny(list):
+    pass
+
+
+# TODO(brycew): python 3.10, make this Iterable[str]
+SearchType = Union[Iterable, ContainAny, str, CodeType]
+
+
+def _label(opt: Any) -> str:
+    return (opt[1] or "").lower()
+
+
+class CodeIndex:
+    """A code list, with each option's label lowercased once, and the options looked up
+    by code and by their whole label.
+
+    Each option is a tuple (or list) of its code and its label, like `("1234", "Motion")`.
+    """
+
+    def __init__(self, options: Iterable):
+        self.options: List[Any] = list(options)
+        self.labels: List[str] = []
+        self.by_code: Dict[Any, List[int]] = {}
+        self.by_label: Dict[str, List[int]] = {}
+        for pos, opt in enumerate(self.options):
+            label = _label(opt)
+            self.labels.append(label)
+            self.by_code.setdefault(opt[0], []).append(pos)
+            self.by_label.setdefault(label.strip(), []).append(pos)
+        # All of the labels on separate lines, so a word can be found in all of them
+        # with one `str.find` per match instead of checking each label
+        self._text: Optional[str] = None
+        self._starts: List[int] = []
+        if not any("\n" in label for label in self.labels):
+            offset = 0
+            for label in self.labels:
+                self._starts.append(offset)
+                offset += len(label) + 1
+            self._text = "\n".join(self.labels)
+
+    def __len__(self) -> int:
+        return len(self.options)
+
+    def containing(self, term: str, positions: Optional[List[int]] = None) -> List[int]:
+        """The positions of the labels that contain `term`, which must be lowercase.
+        Only checks `positions`, if given."""
+        labels = self.labels
+        if positions is not None:
+            return [pos for pos in positions if term in labels[pos]]
+        if self._text is None or not term or "\n" in term:
+            return [pos for pos, label in enumerate(labels) if term in label]
+        found = []
+        text, starts = self._text, self._starts
+        at = text.find(term)
+        while at != -1:
+            pos = bisect_right(starts, at) - 1
+            found.append(pos)
+            if pos + 1 >= len(starts):
+                break
+            at = text.find(term, starts[pos + 1])
+        return found
+
+    def narrow(
+        self, found: List[int], positions: Optional[List[int]] = None
+    ) -> List[int]:
+        if positions is None:
+            return found
+        allowed = set(positions)
+        return [pos for pos in found if pos in allowed]
+
+
+# The indexes of the code lists filtered most recently, by their contents. Interviews
+# filter the same list many times on a page, once for each filing.
+_INDEX_CACHE_SIZE = 32
+_index_cache: "OrderedDict[Tuple, CodeIndex]" = OrderedDict()
+_index_cache_lock = threading.Lock()
+
+
+def code_index(options: Union[CodeIndex, Iterable]) -> CodeIndex:
+    """The [CodeIndex](#CodeIndex) for a code list, reusing the one made recently for a
+    list with the same options. Hashing the options is much quicker than indexing them
+    again, and any change to them, even in the middle of the list, makes a new index.
+    Lists with options that can't be hashed are indexed every time."""
+    if isinstance(options, CodeIndex):
+        return options
+    if not isinstance(options, (list, tuple)) or not options:
+        return CodeIndex(options)
+    try:
+        key = tuple(tuple(opt) for opt in options)
+        hash(key)
+    except TypeError:
+        return CodeIndex(options)
+    with _index_cache_lock:
+        cached = _index_cache.get(key)
+        if cached is not None:
+            _index_cache.move_to_end(key)
+            return cached
+    index = CodeIndex(options)
+    with _index_cache_lock:
+        _index_cache[key] = index
+        while len(_index_cache) > _INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
+
+
+class CodeFilter(ABC):
+    """A compiled filter. Calling it with one option says if the option matches;
+    `select` finds all of the matching options in a [CodeIndex](#CodeIndex) at once."""
+
+    @abstractmethod
+    def __call__(self, opt: Any) -> bool:
+        """If `opt` matches the filter"""
+
+    def select(
+        self, index: CodeIndex, positions: Optional[List[int]] = None
+    ) -> List[int]:
+        """The positions of the matching options in `index`, in order. Only checks
+        `positions`, if given."""
+        if positions is None:
+            positions = list(range(len(index)))
+        options = index.options
+        return [pos for pos in positions if self(options[pos])]
+
+
+class _NothingFilter(CodeFilter):
+    def __call__(self, opt: Any) -> bool:
+        return False
+
+    def select(
+        self, index: CodeIndex, positions: Optional[List[int]] = None
+    ) -> List[int]:
+        return []
+
+    def __repr__(self) -> str:
+        return "NothingFilter()"
+
+
+class _FunctionFilter(CodeFilter):
+    def __init__(self, func: Callable[..., bool]):
+        self.func = func
+
+    def __call__(self, opt: Any) -> bool:
+        return self.func(opt)
+
+    def __repr__(self) -> str:
+        return f"FunctionFilter({self.func!r})"
+
+
+class _CodeFilter(CodeFilter):
+    def __init__(self, code: str):
+        self.code = code
+
+    def __call__(self, opt: Any) -> bool:
+        return opt[0] == self.code
+
+    def select(
+        self, index: CodeIndex, positions: Optional[List[int]] = None
+    ) -> List[int]:
+        return index.narrow(index.by_code.get(self.code, []), positions)
+
+    def __repr__(self) -> str:
+        return f"CodeFilter({self.code!r})"
+
+
+class _LabelFilter(CodeFilter):
+    """The whole label matches, ignoring case and whitespace at the ends"""
+
+    def __init__(self, label: str):
+        self.label = label.lower().strip()
+
+    def __call__(self, opt: Any) -> bool:
+        return _label(opt).strip() == self.label
+
+    def select(
+        self, index: CodeIndex, positions: Optional[List[int]] = None
+    ) -> List[int]:
+        return index.narrow(index.by_label.get(self.label, []), positions)
+
+    def __repr__(self) -> str:
+        return f"LabelFilter({self.label!r})"
+
+
+class _ContainsFilter(CodeFilter):
+    """The label contains any (or all) of the terms, ignoring case"""
+
+    def __init__(self, terms: Iterable[str], match_any: bool):
+        self.terms = tuple(term.lower() for term in terms)
+        self.match_any = match_any
+
+    def _matches(self, label: str) -> bool:
+        if self.match_any:
+            return any(term in label for term in self.terms)
+        return all(term in label for term in self.terms)
+
+    def __call__(self, opt: Any) -> bool:
+        return self._matches(_label(opt))
+
+    def select(
+        self, index: CodeIndex, positions: Optional[List[int]] = None
+    ) -> List[int]:
+        if self.match_any:
+            matched: Set[int] = set()
+            for term in self.terms:
+                matched.update(index.containing(term, positions))
+            return sorted(matched)
+        if not self.terms:
+            return list(range(len(index))) if positions is None else positions
+        found = index.containing(self.terms[0], positions)
+        for term in self.terms[1:]:
+            if not found:
+                break
+            found = index.containing(term, found)
+        return found
+
+    def __repr__(self) -> str:
+        return f"ContainsFilter({self.terms!r}, match_any={self.match_any})"
+
+
+@lru_cache(maxsize=256)
+def _compile(kind: str, spec: Any) -> CodeFilter:
+    """Filters made from the same spec are shared; `spec` has to be hashable"""
+    if kind == "code":
+        return _CodeFilter(spec)
+    if kind == "label":
+        return _LabelFilter(spec)
+    if kind == "in_label":
+        return _ContainsFilter([spec], match_any=False)
+    return _ContainsFilter(spec, match_any=(kind == "any"))
+
+
+def make_filter(
+    search: Union[Callable[..., bool], SearchType, None],
+) -> CodeFilter:
+    """Makes a 'filter' function from some simple type.
+
+    Necessary because docassemble doesn't store lambdas and functions well in
+    interview dicts, so the filters need to be set as primitive types and kept
+    that way until the search actually happens (in filter_codes).
+    """
+    if not search:
+        # With None, this is usually with an exclude; so default to False
+        return _NothingFilter()
+    if isinstance(search, CodeFilter):
+        return search
+    if callable(search):
+        return _FunctionFilter(search)
+    if isinstance(search, CodeType):
+        return _compile("code", str(search))
+    elif isinstance(search, str):
+        return _compile("label", search)
+    elif isinstance(search, ContainAny):
+        return _compile("any", tuple(search))
+    else:  # if isinstance(search, Iterable):
+        return _compile("all", tuple(search))
+
+
+def make_filters(
+    filters: Iterable[Union[Callable[..., bool], SearchType]],
+) -> List[CodeFilter]:
+    """Compiles filters from most specific to least specific. After all of them, labels
+    that only contain a string filter (instead of being the whole label) also match."""
+    filters = list(filters)
+    filter_lambdas = [make_filter(filter_fn) for filter_fn in filters]
+    for filter_fn in filters:
+        if not isinstance(filter_fn, CodeType) and isinstance(filter_fn, str):
+            filter_lambdas.append(_compile("in_label", filter_fn))
+    return filter_lambdas
+
+
+def select_codes(
+    options: Union[CodeIndex, Iterable],
+    filters: Iterable[Union[Callable[..., bool], SearchType]],
+    exclude: Union[Callable[..., bool], SearchType, None] = None,
+) -> List[Any]:
+    """The options matching the first (most specific) filter that matches any, and
+    that don't match `exclude`, sorted by label and then code"""
+    index = code_index(options)
+    exclude_filter = make_filter(exclude)
+    positions: List[int] = []
+    for code_filter in make_filters(filters):
+        positions = code_filter.select(index)
+        if positions and exclude:
+            excluded = set(exclude_filter.select(index, positions))
+            positions = [pos for pos in positions if pos not in excluded]
+        if positions:
+            break
+    codes = [index.options[pos] for pos in positions]
+    return sorted(codes, key=lambda option: option[1] + str(option[0]))
@@ -0,0 +1,195 @@
+"""
+Searches the names of a jurisdiction's codes (case types, filing types, etc.) locally,
+instead of asking the proxy for every search, like the `search_*` methods of
+[EfspConnection](#EfspConnection) used to.
+
+The search is tokenized and ranked: every word searched for has to be in a name, as the
+whole word, the start of a word, or a word with one typo in it.
+
+Doesn't include anything from docassemble, and can be used without having it installed.
+"""
+
+import re
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+__all__ = [
+    "CodeSearchIndex",
+    "CodeSearchStore",
+    "tokenize",
+    "get_code_search_store",
+]
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+# How much each way of matching a searched word counts towards a name's rank
+_EXACT, _PREFIX, _TYPO = 3, 2, 1
+# Shorter words with a typo match too many other words
+_MIN_TYPO_LENGTH = 4
+
+
+def tokenize(text: str) -> List[str]:
+    """The lowercase words in `text`, without punctuation"""
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _deletes(token: str) -> Set[str]:
+    return {token[:idx] + token[idx + 1 :] for idx in range(len(token))}
+
+
+def _one_edit_apart(first: str, second: str) -> bool:
+    """If one letter was added, removed, changed, or swapped with the next one"""
+    if first == second or abs(len(first) - len(second)) > 1:
+        return False
+    if len(first) > len(second):
+        first, second = second, first
+    idx = 0
+    while idx < len(first) and first[idx] == second[idx]:
+        idx += 1
+    if len(first) != len(second):
+        return first[idx:] == second[idx + 1 :]
+    return first[idx + 1 :] == second[idx + 1 :] or (
+        first[idx : idx + 2] == second[idx : idx + 2][::-1]
+        and first[idx + 2 :] == second[idx + 2 :]
+    )
+
+
+class CodeSearchIndex:
+    """An inverted index over code names.
+
+    Args:
+      names: the names to search. Repeats are only kept once
+    """
+
+    def __init__(self, names: Iterable[str]):
+        self.names: List[str] = list(dict.fromkeys(name for name in names if name))
+        self._normalized = [" ".join(tokenize(name)) for name in self.names]
+        self._postings: Dict[str, Set[int]] = {}
+        for doc, name in enumerate(self._normalized):
+            for token in name.split():
+                self._postings.setdefault(token, set()).add(doc)
+        self._tokens = sorted(self._postings)
+        # Each word, and each word with one letter removed, to the words they came from.
+        # Two words are one typo apart only if they share one of these.
+        self._typo_keys: Dict[str, Set[str]] = {}
+        for token in self._tokens:
+            if len(token) >= _MIN_TYPO_LENGTH - 1:
+                for key in _deletes(token) | {token}:
+                    self._typo_keys.setdefault(key, set()).add(token)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _matches(self, word: str) -> Dict[int, int]:
+        """The names that match one searched word, and how well"""
+        matches: Dict[int, int] = {}
+
+        def add(token: str, weight: int) -> None:
+            for doc in self._postings[token]:
+                if matches.get(doc, 0) < weight:
+                    matches[doc] = weight
+
+        start = bisect_left(self._tokens, word)
+        for token in self._tokens[start:]:
+            if not token.startswith(word):
+                break
+            add(token, _EXACT if token == word else _PREFIX)
+        if len(word) >= _MIN_TYPO_LENGTH:
+            candidates: Set[str] = set()
+            for key in _deletes(word) | {word}:
+                candidates.update(self._typo_keys.get(key, ()))
+            for token in candidates:
+                if _one_edit_apart(word, token):
+                    add(token, _TYPO)
+        return matches
+
+    def search(self, query: Optional[str], limit: Optional[int] = None) -> List[str]:
+        """The names that match every word in `query`, best matches first. Every name,
+        in order, if there's nothing to search for."""
+        words = tokenize(query or "")
+        if not words:
+            return sorted(self.names)[:limit]
+        scores: Optional[Dict[int, int]] = None
+        for word in dict.fromkeys(words):
+            matches = self._matches(word)
+            if scores is None:
+                scores = matches
+            else:
+                scores = {
+                    doc: score + matches[doc]
+                    for doc, score in scores.items()
+                    if doc in matches
+                }
+            if not scores:
+                return []
+        assert scores is not None
+        phrase = " ".join(words)
+        ranked: List[Tuple[int, int, str]] = []
+        for doc, score in scores.items():
+            normalized = self._normalized[doc]
+            if normalized == phrase:
+                score += 10
+            elif normalized.startswith(phrase):
+                score += 5
+            elif phrase in normalized:
+                score += 2
+            ranked.append((-score, len(self.names[doc]), self.names[doc]))
+        ranked.sort()
+        return [name for _, _, name in ranked[:limit]]
+
+
+class CodeSearchStore:
+    """Keeps a [CodeSearchIndex](#CodeSearchIndex) for each code search endpoint, and
+    loads it again when it's older than `ttl`.
+
+    If loading fails, the index isn't loaded again until `retry_after` seconds later, so
+    that a proxy that can't list all of the names isn't asked on every search.
+    """
+
+    def __init__(self, ttl: float = 12 * 60 * 60, retry_after: float = 5 * 60):
+        self.ttl = ttl
+        self.retry_after = retry_after
+        self.indexes: Dict[str, Tuple[float, Optional[CodeSearchIndex]]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get(
+        self, key: str, load: Callable[[], Optional[Iterable[str]]]
+    ) -> Optional[CodeSearchIndex]:
+        """The index for `key`, calling `load` for all of the names if it's missing or
+        old. None if the names couldn't be loaded."""
+        stored = self.indexes.get(key)
+        if stored and self._fresh(stored):
+            return stored[1]
+        with self._lock:
+            key_lock = self._locks.setdefault(key, threading.Lock())
+        with key_lock:
+            # Another thread might have just loaded it
+            stored = self.indexes.get(key)
+            if stored and self._fresh(stored):
+                return stored[1]
+            names = load()
+            index = CodeSearchIndex(names) if names else None
+            self.indexes[key] = (time.time(), index)
+            return index
+
+    def _fresh(self, stored: Tuple[float, Optional[CodeSearchIndex]]) -> bool:
+        max_age = self.ttl if stored[1] is not None else self.retry_after
+        return time.time() - stored[0] < max_age
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Forgets one index, or all of them if `key` is None"""
+        if key is None:
+            self.indexes = {}
+        else:
+            self.indexes.pop(key, None)
+
+
+# Shared by every connection in this process; the names are the same for everyone
+_store = CodeSearchStore()
+
+
+def get_code_search_store() -> CodeSearchStore:
+    return _store
@@ -0,0 +1,240 @@
+"""
+Downloads every code of a jurisdiction's courts into a snapshot file, so freshly
+started workers can answer code lookups from memory instead of asking the proxy (see
+[code_cache](#code_cache)):
+
+```
+python -m docassemble.EFSPIntegration.code_snapshot export illinois.snapshot.gz \\
+    --url https://efile.example.com --api-key ... --jurisdiction illinois
+python -m docassemble.EFSPIntegration.code_snapshot info illinois.snapshot.gz
+```
+
+Then set `code snapshot file: /path/to/illinois.snapshot.gz` in the `efile proxy`
+config. The court policies need a Tyler login; set `TYLER_EMAIL` and `TYLER_PASSWORD`
+in the environment to include them.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .code_cache import (
+    CodeCache,
+    get_code_cache,
+    open_snapshot,
+    set_code_cache,
+    write_snapshot,
+)
+from .py_efsp_client import ApiResponse, EfspConnection
+
+__all__ = ["DATAFIELDS", "DEPTHS", "export_codes", "snapshot_court", "main"]
+
+# The datafields that interviews look up
+DATAFIELDS = [
+    "GlobalPassword",
+    "OptionalServicesMultipleCopies",
+    "FilingFilingDescription",
+    "FilingFilingComments",
+    "FilingFilingAttorneyView",
+]
+
+# How far into each court to go: the court's own codes, then everything that depends
+# on a case type, then everything that depends on a filing type
+DEPTHS = ["court", "case_type", "filing_type"]
+
+_TIMINGS = [None, "Initial", "Subsequent"]
+
+
+def _codes(futures: Iterable[Future]) -> List[str]:
+    """The unique codes from responses with lists of codes, in the order they're seen"""
+    codes: Dict[str, None] = {}
+    for future in futures:
+        resp = future.result()
+        if isinstance(resp, ApiResponse) and resp.is_ok():
+            for item in resp.data or []:
+                if isinstance(item, dict) and item.get("code"):
+                    codes[str(item["code"])] = None
+    return list(codes)
+
+
+def snapshot_court(
+    conn: EfspConnection,
+    court_id: str,
+    *,
+    depth: str = "filing_type",
+    max_workers: int = 8,
+) -> int:
+    """Makes every code call an interview might make for one court, so they're all in
+    the process' code cache. Returns how many calls were made."""
+    calls = 0
+    with conn.batch(max_workers) as b:
+        for method in [
+            "get_court",
+            "get_filer_types",
+            "get_service_type_codes",
+            "get_disclaimers",
+            "get_damage_amounts",
+            "get_procedure_or_remedies",
+        ]:
+            getattr(b, method)(court_id)
+        b.get_party_types(court_id, None)
+        for field_name in DATAFIELDS:
+            b.get_datafield(court_id, field_name)
+        categories = [
+            b.get_case_categories(court_id, fileable_only=fileable_only, timing=timing)
+            for fileable_only in [False, True]
+            for timing in _TIMINGS
+        ]
+        calls += 13 + len(DATAFIELDS)
+    if depth == "court":
+        return calls
+
+    case_types: List[Tuple[str, Future]] = []
+    with conn.batch(max_workers) as b:
+        for category in _codes(categories):
+            for timing in _TIMINGS:
+                case_types.append(
+                    (category, b.get_case_types(court_id, category, timing=timing))
+                )
+    calls += len(case_types)
+    pairs: Set[Tuple[str, str]] = set()
+    for category, future in case_types:
+        pairs.update((category, case_type) for case_type in _codes([future]))
+
+    filing_types = []
+    with conn.batch(max_workers) as b:
+        for case_type in sorted({case_type for _, case_type in pairs}):
+            b.get_party_types(court_id, case_type)
+            b.get_case_subtypes(court_id, case_type)
+            b.get_cross_references(court_id, case_type)
+            calls += 3
+        for category, case_type in sorted(pairs):
+            for initial in [True, False]:
+                filing_types.append(
+                    b.get_filing_types(court_id, category, case_type, initial)
+                )
+    calls += len(filing_types)
+    if depth == "case_type":
+        return calls
+
+    with conn.batch(max_workers) as b:
+        for filing_type in _codes(filing_types):
+            b.get_document_types(court_id, filing_type)
+            b.get_optional_services(court_id, filing_type)
+            b.get_motion_types(court_id, filing_type)
+            b.get_filing_components(court_id, filing_type)
+            calls += 4
+    return calls
+
+
+def export_codes(
+    conn: EfspConnection,
+    path: str,
+    courts: Optional[List[str]] = None,
+    *,
+    depth: str = "filing_type",
+    max_workers: int = 8,
+    progress: Optional[Callable[[str, int], None]] = None,
+) -> Dict[str, Any]:
+    """Writes the codes of `courts` (or every court from `get_courts`) to a snapshot
+    file at `path`. Returns the snapshot's header, with how many responses are in it.
+
+    Args:
+      progress: called with each court id and how many calls it took, once it's done
+    """
+    if depth not in DEPTHS:
+        raise ValueError(f"depth has to be one of {DEPTHS}, not {depth}")
+    previous_cache = get_code_cache()
+    cache = CodeCache(ttl=float("inf"), max_entries=sys.maxsize)
+    set_code_cache(cache)
+    try:
+        if courts is None:
+            resp = conn.get_courts()
+            if not resp.is_ok():
+                raise RuntimeError(f"Couldn't get the list of courts: {resp}")
+            courts = [
+                str(court.get("code")) if isinstance(court, dict) else str(court)
+                for court in resp.data or []
+            ]
+        for court_id in courts:
+            calls = snapshot_court(conn, court_id, depth=depth, max_workers=max_workers)
+            if progress:
+                progress(court_id, calls)
+        header: Dict[str, Any] = {
+            "jurisdiction": conn.default_jurisdiction,
+            "courts": courts,
+            "depth": depth,
+        }
+        header["entries"] = write_snapshot(path, cache.items(), **header)
+        return header
+    finally:
+        set_code_cache(previous_cache)
+
+
+def _info(path: str) -> Dict[str, Any]:
+    with open_snapshot(path) as (header, entries):
+        count = 0
+        body_bytes = 0
+        for _, body in entries:
+            count += 1
+            body_bytes += len(body)
+    return {
+        **header,
+        "entries": count,
+        "body_bytes": body_bytes,
+        "file_bytes": os.path.getsize(path),
+    }
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="download codes to a snapshot file")
+    export.add_argument("path")
+    export.add_argument("--url", required=True, help="the E-file proxy server's URL")
+    export.add_argument("--api-key", default=os.environ.get("EFSP_API_KEY"))
+    export.add_argument("--jurisdiction", required=True)
+    export.add_argument(
+        "--courts", help="comma separated court ids. Defaults to every court"
+    )
+    export.add_argument("--depth", choices=DEPTHS, default="filing_type")
+    export.add_argument("--max-workers", type=int, default=8)
+    info = commands.add_parser("info", help="describe a snapshot file")
+    info.add_argument("path")
+    parsed = parser.parse_args(args)
+
+    if parsed.command == "info":
+        print(json.dumps(_info(parsed.path), indent=2))
+        return
+
+    conn = EfspConnection(
+        url=parsed.url,
+        api_key=parsed.api_key,
+        default_jurisdiction=parsed.jurisdiction,
+    )
+    if os.environ.get("TYLER_EMAIL") and os.environ.get("TYLER_PASSWORD"):
+        conn.authenticate_user(
+            tyler_email=os.environ["TYLER_EMAIL"],
+            tyler_password=os.environ["TYLER_PASSWORD"],
+        )
+    start = time.monotonic()
+    header = export_codes(
+        conn,
+        parsed.path,
+        parsed.courts.split(",") if parsed.courts else None,
+        depth=parsed.depth,
+        max_workers=parsed.max_workers,
+        progress=lambda court_id, calls: print(f"{court_id}: {calls} calls"),
+    )
+    print(
+        f"Wrote {header['entries']} responses from {len(header['courts'])} courts "
+        f"to {parsed.path} in {time.monotonic() - start:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
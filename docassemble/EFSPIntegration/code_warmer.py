@@ -0,0 +1,244 @@
+"""
+Refreshes the code responses that interviews use the most before they expire from the
+[code cache](#CodeCache), so the first filers of the day don't wait on cold lookups.
+
+The cache counts how often each response (each court, case category, case type and
+filing type combination, see [code_combination](#code_combination)) is asked for, with
+the counts halving every day. A warmer refreshes the most used of the ones about to
+expire, a few at a time:
+
+* in each worker, every few minutes, with [start_code_cache_warmer](#start_code_cache_warmer)
+  (the `warm code cache minutes` config in docassemble). The cache is in each worker's
+  memory, so this is what keeps workers warm.
+* from a scheduled job or the command line, to refresh a snapshot file (see
+  [code_snapshot](#code_snapshot)) that workers load when they start:
+
+```
+python -m docassemble.EFSPIntegration.code_warmer illinois.snapshot.gz \\
+    --url https://efile.example.com --api-key ... --jurisdiction illinois
+```
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from .code_cache import (
+    CodeCache,
+    get_code_cache,
+    open_snapshot,
+    set_code_cache,
+    write_snapshot,
+)
+from .py_efsp_client import EfspConnection
+
+__all__ = [
+    "CodeCombination",
+    "CodeCacheWarmer",
+    "code_combination",
+    "get_code_cache_warmer",
+    "start_code_cache_warmer",
+    "warm_snapshot",
+    "main",
+]
+
+
+class CodeCombination(NamedTuple):
+    court: Optional[str]
+    case_category: Optional[str]
+    case_type: Optional[str]
+    filing_type: Optional[str]
+
+
+def code_combination(key: str) -> CodeCombination:
+    """The court, case category, case type and filing type that a code cache key is
+    for, where they're in it"""
+    parts = urlsplit(key)
+    segments = parts.path.strip("/").split("/")
+    query = parse_qs(parts.query)
+
+    def after(segment: str) -> Optional[str]:
+        if segment in segments:
+            idx = segments.index(segment)
+            if idx + 1 < len(segments):
+                return segments[idx + 1]
+        return None
+
+    def param(name: str) -> Optional[str]:
+        return query.get(name, [None])[0]
+
+    return CodeCombination(
+        after("courts"),
+        param("category_id"),
+        after("case_types") or param("type_id"),
+        after("filing_types"),
+    )
+
+
+class CodeCacheWarmer:
+    """Refreshes the most used code responses that are about to expire.
+
+    Args:
+      conn: the connection to refresh the process' code cache with
+      refresh_before: seconds before a response expires that it can be refreshed
+      max_refreshes: the most responses to refresh each time
+      max_workers: the most refreshes in flight at the same time
+    """
+
+    def __init__(
+        self,
+        conn: EfspConnection,
+        *,
+        refresh_before: float = 30 * 60,
+        max_refreshes: int = 200,
+        max_workers: int = 4,
+    ):
+        self.conn = conn
+        self.refresh_before = refresh_before
+        self.max_refreshes = max_refreshes
+        self.max_workers = max_workers
+        self._timer: Optional[threading.Timer] = None
+        self._interval: Optional[float] = None
+
+    def due(self) -> List[str]:
+        """The keys to refresh now, most used over the last few days first"""
+        cache = get_code_cache()
+        if cache is None:
+            return []
+        # Responses no one has asked for in days can expire
+        return [
+            key for key in cache.expiring(self.refresh_before) if cache.uses[key] > 0
+        ][: self.max_refreshes]
+
+    def warm_once(self) -> Dict[str, Any]:
+        """Refreshes what's due, then fades the use counts by how long it's been since
+        the last time (see [CodeCache.decay_uses](#decay_uses)). Returns how it went."""
+        cache = get_code_cache()
+        due = self.due()
+        start = time.monotonic()
+        failed = 0
+        if due:
+            batch = self.conn.batch(self.max_workers)
+            for key in due:
+                batch.refresh_cached_code(key)
+            for future in batch.as_completed():
+                if future.exception() is not None or not future.result().is_ok():
+                    failed += 1
+        if cache is not None:
+            cache.decay_uses()
+        return {
+            "refreshed": len(due) - failed,
+            "failed": failed,
+            "seconds": time.monotonic() - start,
+            "hottest": [code_combination(key) for key in due[:5]],
+        }
+
+    def start(self, interval: float) -> None:
+        """Runs [warm_once](#warm_once) every `interval` seconds in a background thread"""
+        self._interval = interval
+        if self._timer is not None and self._timer.is_alive():
+            return
+        self._timer = threading.Timer(interval, self._background_warm)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def stop(self) -> None:
+        self._interval = None
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _background_warm(self) -> None:
+        self._timer = None
+        try:
+            result = self.warm_once()
+            if result["failed"]:
+                self.conn.get_logger().warning(
+                    f"Couldn't refresh {result['failed']} cached code responses"
+                )
+        except Exception as ex:
+            self.conn.get_logger().warning(f"Warming the code cache failed: {ex}")
+        if self._interval is not None:
+            self.start(self._interval)
+
+
+_warmer: Optional[CodeCacheWarmer] = None
+
+
+def get_code_cache_warmer() -> Optional[CodeCacheWarmer]:
+    return _warmer
+
+
+def start_code_cache_warmer(
+    conn: EfspConnection, interval: float = 10 * 60, **kwargs: Any
+) -> CodeCacheWarmer:
+    """Starts this process' warmer, if it hasn't been started yet. Takes the same
+    keyword arguments as [CodeCacheWarmer](#CodeCacheWarmer)."""
+    global _warmer
+    if _warmer is None:
+        _warmer = CodeCacheWarmer(conn, **kwargs)
+        _warmer.start(interval)
+    return _warmer
+
+
+def warm_snapshot(
+    conn: EfspConnection,
+    path: str,
+    *,
+    max_workers: int = 4,
+    limit: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Gets every response in a snapshot file (or the first `limit` of them) again,
+    and writes the file back with them. Responses that can't be refreshed keep their old
+    body. Returns how many were refreshed."""
+    previous_cache = get_code_cache()
+    cache = CodeCache(ttl=float("inf"), max_entries=sys.maxsize)
+    set_code_cache(cache)
+    try:
+        with open_snapshot(path) as (header, entries):
+            for key, body in entries:
+                cache.put(key, body)
+                cache.uses[key] = 1
+        warmer = CodeCacheWarmer(
+            conn,
+            refresh_before=float("inf"),
+            max_refreshes=limit if limit is not None else len(cache),
+            max_workers=max_workers,
+        )
+        result = warmer.warm_once()
+        header.pop("created_at", None)
+        write_snapshot(path, cache.items(), **header)
+        return result
+    finally:
+        set_code_cache(previous_cache)
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("path", help="the snapshot file to refresh")
+    parser.add_argument("--url", required=True, help="the E-file proxy server's URL")
+    parser.add_argument("--api-key", default=os.environ.get("EFSP_API_KEY"))
+    parser.add_argument("--jurisdiction", required=True)
+    parser.add_argument("--max-workers", type=int, default=4)
+    parser.add_argument("--limit", type=int, help="the most responses to refresh")
+    parsed = parser.parse_args(args)
+    conn = EfspConnection(
+        url=parsed.url,
+        api_key=parsed.api_key,
+        default_jurisdiction=parsed.jurisdiction,
+    )
+    result = warm_snapshot(
+        conn, parsed.path, max_workers=parsed.max_workers, limit=parsed.limit
+    )
+    print(
+        f"Refreshed {result['refreshed']} responses in {result['seconds']:.1f}s "
+        f"({result['failed']} failed)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,6 @@
 """Functions that help convert the JSON-ized XML from the proxy server into usable information."""
 
 import re
-import tempfile
 import json
 from datetime import datetime, timezone
 from typing import List, Dict, Tuple, Any, Mapping, Callable, Optional, Union
@@ -21,9 +20,13 @@ from docassemble.base.util import (
 )
 from docassemble.AssemblyLine.al_general import ALIndividual, ALAddress
 from docassemble.base.functions import get_config
+from .case_model import (
+    CasePerson,
+    CaseSummary,
+    add_case_details,
+    parse_case_entry,
+)
 from .efm_client import ApiResponse, ProxyConnection
-import importlib
-import dateutil.parser
 
 __all__ = [
     "convert_court_to_id",
@@ -37,6 +40,9 @@ __all__ = [
     "validate_tyler_regex",
     "parse_case_info",
     "fetch_case_info",
+    "fetch_case_summary",
+    "parse_found_case",
+    "expand_found_case",
     "_payment_type",
     "_payment_labels",
     "payment_expiration",
@@ -377,12 +383,6 @@ def validate_tyler_regex(data_field: Mapping) -> Callable[[str], Any]:
     return fn_validate
 
 
-def _is_person(possible_person_entity: dict) -> bool:
-    """Helper for getting party ID"""
-    # TODO(brycew): could also check the declaredType?
-    return possible_person_entity.get("personOtherIdentification") is not None
-
-
 def chain_xml(xml_val, elems: List[Union[str, int]]):
     val = xml_val
     for idx, elem in enumerate(elems):
@@ -410,189 +410,6 @@ def combine_opt_strs(elems: List[Optional[str]], title=True):
     return ret.strip()
 
 
-def _parse_phone_number(phone_xml) -> Optional[str]:
-    """Parses a gov.niem.niem.niem_core._2.TelephoneNumberType / nc:TelephoneNumberType into a string"""
-    if phone_xml is None:
-        return None
-    if (
-        phone_xml.get("name")
-        == "{http://niem.gov/niem/niem-core/2.0}FullTelephoneNumber"
-    ):
-        return chain_xml(phone_xml, ["value", "telephoneNumberFullID", "value"])
-    elif (
-        phone_xml.get("name")
-        == "{http://niem.gov/niem/niem-core/2.0}InternationalTelephoneNumber"
-    ):
-        return (
-            chain_xml(phone_xml, ["value", "telephoneCountryCodeID", "value"]) or ""
-        ) + (chain_xml(phone_xml, ["value", "telephoneNumberID", "value"]) or "")
-    elif (
-        phone_xml.get("name")
-        == "{http://niem.gov/niem/niem-core/2.0}NANPTelephoneNumber"
-    ):
-        tp = phone_xml.get("value") or {}
-        return (
-            (chain_xml(tp, ["telephoneAreaCodeID", "value"]) or "")
-            + (chain_xml(tp, ["telephoneExchangeID", "value"]) or "")
-            + (chain_xml(tp, ["telephoneLineID", "value"]) or "")
-        )
-    else:
-        # TODO(brycew): no telephone type we recognize?
-        return None
-
-
-def _parse_address(address_xml: Mapping) -> ALAddress:
-    address = ALAddress()
-    street_xml = chain_xml(address_xml, ["value", "addressDeliveryPoint", 0, "value"])
-    # TODO(brycew): haven't seen street address IRL yet, not sure how it serializes
-    if street_xml:
-        street_full = chain_xml(street_xml, ["streetFullText", "value"])
-        if street_full:
-            address.address = street_full
-        else:
-            street_name = chain_xml(street_xml, ["streetName", "value"])
-            street_number = chain_xml(street_xml, ["streetNumberText", "value"])
-            if street_name and street_number:
-                address.address = f"{street_number} {street_name}"
-    city_xml = chain_xml(address_xml, ["value", "locationCityName"]) or {}
-    if city_xml and "value" in city_xml:
-        address.city = city_xml.get("value")
-    zip_xml = chain_xml(address_xml, ["value", "locationPostalCode"]) or {}
-    if zip_xml and "value" in zip_xml:
-        address.zip = zip_xml.get("value")
-    state_xml = chain_xml(address_xml, ["value", "locationState"]) or {}
-    if state_xml and state_xml.get("value", {}).get("value"):
-        address.state = state_xml.get("value", {}).get("value")
-    return address
-
-
-def _is_attorney(participant_val):
-    role_code = chain_xml(
-        participant_val, ["value", "caseParticipantRoleCode", "value"]
-    )
-    return role_code.upper() == "ATTY"
-
-
-def _parse_participant_id(entity):
-    """Just get the participant ID from the Participant"""
-    if _is_person(entity):
-        return (
-            next(iter(entity.get("personOtherIdentification", {})), {})
-            .get("identificationID", {})
-            .get("value")
-        )
-    else:
-        return chain_xml(
-            entity,
-            [
-                "organizationIdentification",
-                "value",
-                "identification",
-                0,
-                "identificationID",
-                "value",
-            ],
-        )
-
-
-def _parse_name(name_obj, name_val):
-    if not name_val:
-        name_val = {}
-
-    # TODO(brycew): some french last names are all caps? It could happen, but this is best for now.
-    def make_readable(name):
-        if len(name) > 1 and name.isupper():
-            return name.title()
-        return name
-
-    name_obj.first = make_readable(name_val.get("personGivenName", {}).get("value", ""))
-    name_obj.middle = make_readable(
-        name_val.get("personMiddleName", {}).get("value", "")
-    )
-    name_obj.last = make_readable(name_val.get("personSurName", {}).get("value", ""))
-    return name_obj
-
-
-def _parse_contact_means(obj, contact_means_xml):
-    if not contact_means_xml:
-        contact_means_xml = []
-    for contact_info in contact_means_xml:
-        if (
-            contact_info.get("name")
-            == "{http://niem.gov/niem/niem-core/2.0}ContactTelephoneNumber"
-        ):
-            phone = _parse_phone_number(
-                contact_info.get("value", {}).get("telephoneNumberRepresentation")
-            )
-            if phone:
-                obj.phone_number = phone
-        if (
-            contact_info.get("name")
-            == "{http://niem.gov/niem/niem-core/2.0}ContactMailingAddress"
-        ):
-            address = _parse_address(
-                contact_info.get("value", {}).get("addressRepresentation")
-            )
-            if address:
-                obj.address = address
-                obj.address.instanceName = obj.instanceName + ".address"
-        if (
-            contact_info.get("name")
-            == "{http://niem.gov/niem/niem-core/2.0}ContactEmailID"
-        ):
-            email = contact_info.get("value", {}).get("value")
-            # Sometimes the email of a user can be redacted / sealed, but we aren't told about it.
-            if email:
-                if "@" in email:  # the simplest email regex
-                    obj.email = email
-                else:
-                    obj.is_redacted = True
-    return obj
-
-
-def _parse_participant(part_obj, participant_val, roles: dict):
-    """Given an xsd:CommonTypes-4.0:CaseParticipantType, fills it with necessary info"""
-    part_obj.is_redacted = False  # Assuming we can get all of the information
-    part_obj.party_type = chain_xml(
-        participant_val, ["value", "caseParticipantRoleCode", "value"]
-    )
-    part_obj.party_type_name = roles.get(part_obj.party_type, {}).get("name")
-    entity = chain_xml(participant_val, ["value", "entityRepresentation", "value"])
-    if _is_person(entity):
-        part_obj.person_type = "ALIndividual"
-        name = entity.get("personName") or {}
-        _parse_name(part_obj.name, name)
-        # TODO(brycew): parse the address, phone, and email if possible
-        contact_xml = next(
-            iter(entity.get("personAugmentation", {}).get("contactInformation", []))
-        ).get("contactMeans", [])
-        _parse_contact_means(part_obj, contact_xml)
-    else:
-        part_obj.person_type = "business"
-        part_obj.name.first = entity.get("organizationName", {}).get("value", "")
-    if part_obj.name.full().lower() == "**sealed**":
-        # If their name is this exact string, it's likely that the case is redacted somehow.
-        part_obj.is_redacted = True
-        if hasattr(part_obj.name, "first"):
-            delattr(part_obj.name, "first")
-        if hasattr(part_obj.name, "last"):
-            delattr(part_obj.name, "last")
-    part_obj.tyler_id = _parse_participant_id(entity)
-    return part_obj
-
-
-def _parse_attorney(att_obj, att_val):
-    """Given an Attorney (caseOtherEntityAttorney), gets the name and contact info into a docassemble object"""
-    entity = chain_xml(att_val, ["roleOfPersonReference", "ref"])
-    if entity:
-        _parse_name(att_obj.name, entity.get("personName") or {})
-        contact_xml = next(
-            iter(entity.get("personAugmentation", {}).get("contactInformation", []))
-        ).get("contactMeans", [])
-        _parse_contact_means(att_obj, contact_xml)
-    return att_obj
-
-
 def parse_service_contacts(service_list):
     """We'll take both Tyler service contact lists and Niem service contact lists.
     Tyler's are just `{"firstName": "Bob", "middleName": "P", ..., "serviceContactId": "abcrunh-13..."
@@ -646,6 +463,106 @@ def parse_service_contacts(service_list):
     return info
 
 
+def _set_case_header(new_case: DAObject, summary: CaseSummary) -> None:
+    """Sets what the case search results show about a case"""
+    new_case.court_id = summary.court_id
+    new_case.title = summary.title
+    new_case.tracking_id = summary.tracking_id
+    new_case.docket_number = summary.docket_number
+    new_case.category = summary.category
+    if summary.fetched:
+        new_case.case_details_worked = summary.details_worked
+        new_case.case_type = summary.case_type
+        new_case.efile_case_type = summary.case_type
+        new_case.date = tyler_timestamp_to_datetime(summary.date_ms)
+
+
+def _set_person(obj: ALIndividual, person: CasePerson) -> None:
+    for attr in ["first", "middle", "last"]:
+        if getattr(person, attr) is not None:
+            setattr(obj.name, attr, getattr(person, attr))
+    if person.phone_number:
+        obj.phone_number = person.phone_number
+    if person.email:
+        obj.email = person.email
+    if person.address is not None:
+        obj.address = ALAddress(obj.instanceName + ".address")
+        for attr in ["address", "city", "state", "zip"]:
+            if getattr(person.address, attr) is not None:
+                setattr(obj.address, attr, getattr(person.address, attr))
+    if person.is_redacted:
+        obj.is_redacted = True
+
+
+def _set_case_fields(new_case: DAObject, summary: CaseSummary) -> None:
+    """Sets everything about a case on `new_case`, with the participants as
+    `ALIndividual`s"""
+    _set_case_header(new_case, summary)
+    for attr in ["lower_docket_number", "lower_case_title", "lower_judge"]:
+        if getattr(summary, attr) is not None:
+            setattr(new_case, attr, getattr(summary, attr))
+    new_case.participants = DAList(
+        new_case.instanceName + ".participants",
+        object_type=ALIndividual,
+        auto_gather=False,
+    )
+    for person in summary.participants:
+        partip_obj = new_case.participants.appendObject()
+        partip_obj.is_redacted = False
+        partip_obj.party_type = person.party_type
+        partip_obj.party_type_name = person.party_type_name
+        partip_obj.person_type = person.person_type
+        _set_person(partip_obj, person)
+        partip_obj.tyler_id = person.tyler_id
+        if person.attorney_ids:
+            partip_obj.existing_attorney_ids = list(person.attorney_ids)
+    new_case.attorneys = DADict(
+        new_case.instanceName + ".attorneys",
+        object_type=ALIndividual,
+        auto_gather=False,
+    )
+    for attorney_id, attorney in summary.attorneys.items():
+        _set_person(
+            new_case.attorneys.initializeObject(attorney_id, ALIndividual), attorney
+        )
+    new_case.party_to_attorneys = {
+        party_id: list(attorney_ids)
+        for party_id, attorney_ids in summary.party_to_attorneys.items()
+    }
+    new_case.participants.gathered = True
+    new_case.attorneys.gathered = True
+
+
+def _fetch_case_details(
+    proxy_conn: ProxyConnection, summary: CaseSummary, roles: Optional[dict] = None
+) -> dict:
+    """Fills in `summary` like [fetch_case_summary](#fetch_case_summary), and returns
+    the full details it was filled in from"""
+    # NOTE: case court can change from searched location (i.e. search in peoria can find cases
+    # in peoriacr); using the original here, but can change it here if necessary
+    full_case_details = proxy_conn.get_case(summary.court_id, summary.tracking_id or "")
+    if not full_case_details.is_ok():
+        log_error_and_notify(
+            f"couldn't get full details for {summary.court_id}-{ summary.tracking_id}",
+            full_case_details,
+        )
+    summary.details_worked = (
+        full_case_details.response_code,
+        full_case_details.error_msg,
+    )
+    case_details = full_case_details.data or {}
+    add_case_details(summary, case_details, roles)
+    return case_details
+
+
+def fetch_case_summary(
+    proxy_conn: ProxyConnection, summary: CaseSummary, roles: Optional[dict] = None
+) -> CaseSummary:
+    """Gets the full details about a case, and fills in `summary` with them"""
+    _fetch_case_details(proxy_conn, summary, roles)
+    return summary
+
+
 def parse_case_info(
     proxy_conn: ProxyConnection,
     new_case: DAObject,
@@ -667,17 +584,50 @@ def parse_case_info(
       roles: a dictionary of the party type codes to the party type name.
           Used so we can filter and sort participants later
     """
-    if not roles:
-        roles = {}
     new_case.details = entry
-    new_case.court_id = court_id
-    new_case.title = chain_xml(entry, ["value", "caseTitleText", "value"])
-    new_case.tracking_id = chain_xml(entry, ["value", "caseTrackingID", "value"])
-    new_case.docket_number = chain_xml(entry, ["value", "caseDocketID", "value"])
-    new_case.category = chain_xml(entry, ["value", "caseCategoryText", "value"])
+    summary = parse_case_entry(entry, court_id)
+    if fetch:
+        new_case.case_details = _fetch_case_details(proxy_conn, summary, roles)
+        _set_case_fields(new_case, summary)
+    else:
+        _set_case_header(new_case, summary)
+
+
+def parse_found_case(
+    proxy_conn: ProxyConnection,
+    new_case: DAObject,
+    entry: dict,
+    court_id: str,
+    *,
+    fetch: bool = True,
+    roles: dict = None,
+):
+    """Like [parse_case_info](#parse_case_info), for one of many search results: only
+    what the results show is set on `new_case`, and the rest is kept in a compact
+    [CaseSummary](case_model#CaseSummary) in `new_case.case_summary`, until
+    [expand_found_case](#expand_found_case) is called on the case the user picks.
 
+    Unlike `parse_case_info`, the raw `details` and `case_details` aren't kept.
+    """
+    new_case.case_summary = parse_case_entry(entry, court_id)
     if fetch:
-        fetch_case_info(proxy_conn, new_case, roles)
+        fetch_case_summary(proxy_conn, new_case.case_summary, roles)
+    _set_case_header(new_case, new_case.case_summary)
+
+
+def expand_found_case(
+    proxy_conn: ProxyConnection, found_case: DAObject, roles: Optional[dict] = None
+) -> None:
+    """Turns a search result from [parse_found_case](#parse_found_case) into a full
+    case, like from [parse_case_info](#parse_case_info). Its details are only fetched if
+    they weren't already. Does nothing if it's already been expanded."""
+    summary = getattr(found_case, "case_summary", None)
+    if summary is None:
+        return
+    if not summary.fetched:
+        fetch_case_summary(proxy_conn, summary, roles)
+    _set_case_fields(found_case, summary)
+    del found_case.case_summary
 
 
 def fetch_case_info(
@@ -686,118 +636,30 @@ def fetch_case_info(
     """Fills in these attributes with the full case details:
     * attorneys
     * party_to_attorneys
-    * case_details_worked
     * case_details
+    * case_details_worked
     * case_type
     * title
     * date
     * participants
-    """
-    if not roles:
-        roles = {}
 
-    # NOTE: case court can change from searched location (i.e. search in peoria can find cases
-    # in peoriacr); using the original here, but can change it here if necessary
-    full_case_details = proxy_conn.get_case(new_case.court_id, new_case.tracking_id)
-    if not full_case_details.is_ok():
-        log_error_and_notify(
-            f"couldn't get full details for {new_case.court_id}-{ new_case.tracking_id}",
-            full_case_details,
-        )
-    new_case.attorneys = DADict(
-        new_case.instanceName + ".attorneys",
-        object_type=ALIndividual,
-        auto_gather=False,
-    )
-    new_case.party_to_attorneys = {}
-    new_case.case_details_worked = (
-        full_case_details.response_code,
-        full_case_details.error_msg,
-    )
-    new_case.case_details = full_case_details.data or {}
-    # TODO: is the order of this array predictable? might it break if Tyler changes something?
-    new_case.case_type = (
-        new_case.case_details.get("value", {})
-        .get("rest", [{}, {}])[1]
-        .get("value", {})
-        .get("caseTypeText", {})
-        .get("value")
-    )
-    maybe_court = chain_xml(
-        new_case.case_details,
-        [
-            "value",
-            "rest",
-            0,
-            "value",
-            "caseCourt",
-            "organizationIdentification",
-            "value",
-            "identificationID",
-            "value",
-        ],
-    )
-    if maybe_court:
-        new_case.court_id = maybe_court
-    new_case.efile_case_type = new_case.case_type
-    new_case.title = chain_xml(
-        new_case.case_details, ["value", "caseTitleText", "value"]
-    )
-    if new_case.title:
-        new_case.title = re.sub(
-            r"([A-Z])In the Matter of the Estate of([A-Z])",
-            r"\1 In the Matter of the Estate of \2",
-            new_case.title,
-        )
-        new_case.title = re.sub(r"([A-Z])vs([A-Z])", r"\1 vs \2", new_case.title)
-    new_case.date = tyler_daterep_to_datetime(
-        chain_xml(
-            new_case.case_details, ["value", "activityDateRepresentation", "value"]
-        )
-    )
-    new_case.participants = DAList(
-        new_case.instanceName + ".participants",
-        object_type=ALIndividual,
-        auto_gather=False,
+    Search results from [parse_found_case](#parse_found_case) only get `case_type`,
+    `title` and `date` (and not `case_details`), until they're expanded.
+    """
+    summary = getattr(new_case, "case_summary", None)
+    if summary is not None:
+        fetch_case_summary(proxy_conn, summary, roles)
+        _set_case_header(new_case, summary)
+        return
+    summary = CaseSummary(
+        new_case.court_id,
+        tracking_id=new_case.tracking_id,
+        docket_number=getattr(new_case, "docket_number", None),
+        category=getattr(new_case, "category", None),
+        title=getattr(new_case, "title", None),
     )
-    for aug in new_case.case_details.get("value", {}).get("rest", []):
-        if "AppellateCaseOriginalCase" in aug.get("declaredType"):
-            new_case.lower_docket_number = aug.get("value", {}).get("caseDocketID")
-            new_case.lower_case_title = aug.get("value", {}).get("caseTitleText")
-        if aug.get("name") == r"{urn:tyler:ecf:extensions:Common}CaseAugmentation":
-            new_case.lower_judge = aug.get("value", {}).get("lowerCourtJudgeText")
-            participant_xml = aug.get("value", {}).get("caseParticipant", [])
-            for participant in participant_xml:
-                if not _is_attorney(participant):
-                    partip_obj = new_case.participants.appendObject()
-                    _parse_participant(partip_obj, participant, roles)
-
-            attorneys = aug.get("value", {}).get("caseOtherEntityAttorney")
-            for attorney in attorneys:
-                entity = chain_xml(attorney, ["roleOfPersonReference", "ref"])
-                tmp: Dict = next(iter(entity.get("personOtherIdentification", {})), {})
-                attorney_tyler_id = tmp.get("identificationID", {}).get("value", None)
-                new_att_obj = new_case.attorneys.initializeObject(
-                    attorney_tyler_id, ALIndividual
-                )
-                _parse_attorney(new_att_obj, attorney)
-                parties = attorney.get("caseRepresentedPartyReference", [])
-                for party in parties:
-                    party_id = _parse_participant_id(party.get("ref", {}))
-                    if party_id in new_case.party_to_attorneys:
-                        new_case.party_to_attorneys[party_id].append(attorney_tyler_id)
-                    else:
-                        new_case.party_to_attorneys[party_id] = [attorney_tyler_id]
-                    for participant in new_case.participants.elements:
-                        if participant.tyler_id == party_id:
-                            if hasattr(participant, "existing_attorney_ids"):
-                                participant.existing_attorney_ids.append(
-                                    attorney_tyler_id
-                                )
-                            else:
-                                participant.existing_attorney_ids = [attorney_tyler_id]
-    new_case.participants.gathered = True
-    new_case.attorneys.gathered = True
+    new_case.case_details = _fetch_case_details(proxy_conn, summary, roles)
+    _set_case_fields(new_case, summary)
 
 
 def _payment_labels(acc: Optional[Mapping]) -> str:
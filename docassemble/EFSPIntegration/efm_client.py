@@ -1,13 +1,12 @@
 #!/usr/bin/env python3
 import logging
 import re
-import pycountry
 from typing import Dict, Union
 
 import requests
 from logging import LoggerAdapter
 from requests import Response, PreparedRequest
-from docassemble.base.functions import all_variables, get_config
+from docassemble.base.functions import all_variables, get_config, this_thread
 from docassemble.base.util import (
     DAObject,
     log,
@@ -26,8 +25,22 @@ from .py_efsp_client import (
     ApiResponse,
     LoggerWithContext,
     EfspConnection,
+    TokenManager,
+    set_connection_pool_size,
+    in_batch_worker,
     _user_visible_resp,
 )
+from .code_cache import (
+    CodeCache,
+    SnapshotError,
+    get_code_cache,
+    load_code_snapshot,
+    set_code_cache,
+)
+from .code_warmer import start_code_cache_warmer
+from .slow_calls import get_slow_call_capture, set_slow_call_capture
+from .tracing import JsonlFileExporter, get_span_exporter, set_span_exporter
+from .us_states import state_name_to_code
 
 __all__ = ["ApiResponse", "ProxyConnection", "state_name_to_code"]
 
@@ -49,13 +62,6 @@ class DALogger(LoggerAdapter):
         log(f"[{args}, {kwargs}] {msg}")
 
 
-def state_name_to_code(state_name: str) -> str:
-    try:
-        return pycountry.subdivisions.lookup(state_name).code.split("-")[-1]
-    except LookupError as ex:
-        return state_name
-
-
 def _give_data_url(bundle: ALDocumentBundle, key: str = "final") -> None:
     """Prepares the filing documents by setting a semi-permanent enabled and a data url
     The document bundle can either consist of documents or other document bundles. But each top element will
@@ -157,6 +163,34 @@ def _get_all_vars(bundle: ALDocumentBundle, key: str = "final") -> Dict:
     return all_vars_dict
 
 
+def _set_up_code_cache() -> None:
+    """Turns on the process' code cache if it's configured, fills it from the snapshot
+    file if there is one, and starts keeping the most used codes warm"""
+    efile_config = get_config("efile proxy", {})
+    cache_hours = efile_config.get("code cache hours")
+    snapshot_file = efile_config.get("code snapshot file")
+    if not (cache_hours or snapshot_file) or get_code_cache() is not None:
+        return
+    set_code_cache(CodeCache(ttl=float(cache_hours or 12) * 60 * 60))
+    if snapshot_file:
+        try:
+            loaded = load_code_snapshot(snapshot_file)
+            log(f"Loaded {loaded} code responses from {snapshot_file}")
+        except (OSError, SnapshotError) as ex:
+            log(f"Couldn't load the code snapshot {snapshot_file}: {ex}")
+    warm_minutes = efile_config.get("warm code cache minutes")
+    if warm_minutes and efile_config.get("url") and efile_config.get("api key"):
+        # Its own connection to the configured proxy, not any interview's
+        start_code_cache_warmer(
+            EfspConnection(url=efile_config["url"], api_key=efile_config["api key"]),
+            interval=float(warm_minutes) * 60,
+        )
+
+
+# Docassemble loads this module once when each worker starts, before any interview runs
+_set_up_code_cache()
+
+
 class ProxyConnection(EfspConnection):
     """The main class you use to communicate with the E-file proxy server from docassemble.
 
@@ -171,16 +205,42 @@ class ProxyConnection(EfspConnection):
         api_key: str = None,
         credentials_code_block: str = "tyler_login",
         default_jurisdiction: str = None,
+        reauthenticate_on_401: bool = None,
     ):
         """
         Creates the connection. Tries to get params from docassemble's config, but can
         be overriden with parameters to __init__.
+
+        If `reauthenticate_on_401` is true (or `reauthenticate on 401` is set in the
+        config), an idempotent request that gets a 401 gets a new token and is sent
+        once more before `credentials_code_block` is reconsidered.
         """
         temp_efile_config = get_config("efile proxy", {})
         if url is None:
             url = temp_efile_config.get("url", "")
         if api_key is None:
             api_key = temp_efile_config.get("api key")
+        if reauthenticate_on_401 is None:
+            reauthenticate_on_401 = temp_efile_config.get(
+                "reauthenticate on 401", False
+            )
+        if temp_efile_config.get("connection pool size"):
+            set_connection_pool_size(int(temp_efile_config["connection pool size"]))
+        capture_file = temp_efile_config.get("slow call capture file")
+        capture = get_slow_call_capture()
+        if capture_file and (capture is None or capture.path != capture_file):
+            set_slow_call_capture(
+                capture_file,
+                sample_rate=float(temp_efile_config.get("slow call sample rate", 0.1)),
+            )
+        span_file = temp_efile_config.get("span file")
+        if span_file:
+            exporter = get_span_exporter()
+            if (
+                not isinstance(exporter, JsonlFileExporter)
+                or exporter.path != span_file
+            ):
+                set_span_exporter(JsonlFileExporter(span_file))
 
         self.credentials_code_block = credentials_code_block
 
@@ -195,12 +255,34 @@ class ProxyConnection(EfspConnection):
             interview_name=interview_name,
             logger=DALogger(logging.getLogger("docassemble")),
         )
+        self.reauthenticate_on_401 = reauthenticate_on_401
+        if temp_efile_config.get("slow call seconds"):
+            self.set_slow_call_threshold(float(temp_efile_config["slow call seconds"]))
+        self.set_local_code_search(
+            bool(temp_efile_config.get("local code search", False))
+        )
+        try:
+            self.get_token_manager().load()
+        except Exception as ex:
+            self.get_logger().warning(f"Couldn't load stored Tyler tokens: {ex}")
+
+    def _make_token_manager(self) -> TokenManager:
+        """Tokens are saved in the user's encrypted DAStore"""
+        temp_efile_config = get_config("efile proxy", {})
+        return TokenManager(
+            self,
+            DAStore(encrypted=True),
+            lifetime=temp_efile_config.get("tyler token lifetime", 12 * 60 * 60),
+            refresh=self.authenticate_user,
+        )
 
     def _call_proxy(self, req: PreparedRequest) -> ApiResponse:
         try:
-            resp = self.proxy_client.send(req)
-            if resp.status_code == 401 and self.credentials_code_block:
-                reconsider(self.credentials_code_block)
+            resp = self._retry_unauthorized(req, self._timed_send(req))
+            # `reconsider` only works on the interview's own thread; a batch calls
+            # `_on_unauthorized` once it's back there
+            if resp.status_code == 401 and not in_batch_worker():
+                self._on_unauthorized()
         except requests.ConnectionError as ex:
             return _user_visible_resp(
                 f"Could not connect to the Proxy server at {self.base_url}: {ex}"
@@ -211,6 +293,19 @@ class ProxyConnection(EfspConnection):
             return _user_visible_resp(f"Url {self.base_url} is not valid: {ex}")
         return _user_visible_resp(resp)
 
+    def _thread_context(self):
+        # Batch workers need the interview's context to use the config and DAStore
+        context = dict(this_thread.__dict__)
+
+        def setup():
+            this_thread.__dict__.update(context)
+
+        return setup
+
+    def _on_unauthorized(self) -> None:
+        if self.credentials_code_block:
+            reconsider(self.credentials_code_block)
+
     def get_logger(self):
         if not hasattr(self, "logger"):
             # Copying what we do in `EfspConnection.get_logger` because it needs to
@@ -234,6 +329,8 @@ class ProxyConnection(EfspConnection):
             tyler_password (str)
         """
         temp_efile_config = get_config("efile proxy", {})
+        # Only logins with the server's own credentials can be repeated later
+        uses_config_credentials = tyler_email is None and tyler_password is None
         if tyler_email is None:
             tyler_email = temp_efile_config.get("tyler email")
         if tyler_password is None:
@@ -243,10 +340,11 @@ class ProxyConnection(EfspConnection):
             tyler_password=tyler_password,
             jurisdiction=jurisdiction,
         )
-        if resp.is_ok():
-            store = DAStore(encrypted=True)
-            for k, v in resp.data.get("tokens", {}).items():
-                store.set(f"EFSP-{k}", v)
+        if resp.is_ok() and resp.data and resp.data.get("tokens"):
+            token_manager = self.get_token_manager()
+            token_manager.can_refresh = uses_config_credentials
+            if temp_efile_config.get("refresh tokens in background"):
+                token_manager.start_background_refresh()
         return resp
 
     def register_user(
@@ -323,24 +421,33 @@ class ProxyConnection(EfspConnection):
             admin_copy=admin_copy,
         )
 
+    def _all_vars(
+        self,
+        court_bundle: Union[ALDocumentBundle, dict],
+        endpoint: str,
+        key: str = "final",
+    ) -> Dict:
+        """Gets the interview's variables to send to the proxy, and records which of them
+        are the biggest (see [record_payload_breakdown](py_efsp_client#record_payload_breakdown))
+        """
+        if not isinstance(court_bundle, ALDocumentBundle):
+            return court_bundle
+        all_vars = _get_all_vars(court_bundle, key=key)
+        self.record_payload_breakdown(endpoint, all_vars)
+        return all_vars
+
     def check_filing(
         self, court_id: str, court_bundle: Union[ALDocumentBundle, dict]
     ) -> ApiResponse:
-        all_vars = (
-            _get_all_vars(court_bundle, key="preview")
-            if isinstance(court_bundle, ALDocumentBundle)
-            else court_bundle
+        all_vars = self._all_vars(
+            court_bundle, "filingreview/courts/{court}/filing/check", key="preview"
         )
         return super().check_filing(court_id, all_vars)
 
     def file_for_review(
         self, court_id: str, court_bundle: Union[ALDocumentBundle, dict]
     ) -> ApiResponse:
-        all_vars = (
-            _get_all_vars(court_bundle)
-            if isinstance(court_bundle, ALDocumentBundle)
-            else court_bundle
-        )
+        all_vars = self._all_vars(court_bundle, "filingreview/courts/{court}/filings")
         if get_config("debug"):
             log(all_vars, "console")
         return super().file_for_review(court_id, all_vars)
@@ -349,12 +456,10 @@ class ProxyConnection(EfspConnection):
         self, court_id: str, court_bundle: Union[ALDocumentBundle, dict] = None
     ) -> ApiResponse:
         """Checks the court info: if it has conditional service types, call a special API with all filing info so far to get service types"""
-        court_info = self.get_court(court_id)
-        if court_info.data.get("hasconditionalservicetypes") and court_bundle:
-            all_vars = (
-                _get_all_vars(court_bundle)
-                if isinstance(court_bundle, ALDocumentBundle)
-                else court_bundle
+        court_info = self.get_court_info_store()
+        if court_info.has_conditional_service_types(court_id) and court_bundle:
+            all_vars = self._all_vars(
+                court_bundle, "filingreview/courts/{court}/filing/servicetypes"
             )
         else:
             all_vars = {}
@@ -363,10 +468,8 @@ class ProxyConnection(EfspConnection):
     def calculate_filing_fees(
         self, court_id: str, court_bundle: Union[ALDocumentBundle, dict]
     ):
-        all_vars = (
-            _get_all_vars(court_bundle, key="preview")
-            if isinstance(court_bundle, ALDocumentBundle)
-            else court_bundle
+        all_vars = self._all_vars(
+            court_bundle, "filingreview/courts/{court}/filing/fees", key="preview"
         )
         return super().calculate_filing_fees(court_id, all_vars)
 
@@ -376,10 +479,8 @@ class ProxyConnection(EfspConnection):
         req_return_date,
         court_bundle: Union[ALDocumentBundle, dict],
     ):
-        all_vars = (
-            _get_all_vars(court_bundle, key="preview")
-            if isinstance(court_bundle, ALDocumentBundle)
-            else court_bundle
+        all_vars = self._all_vars(
+            court_bundle, "scheduling/courts/{court}/return_date", key="preview"
         )
         return super().get_return_date(court_id, req_return_date, all_vars)
 
@@ -0,0 +1,77 @@
+"""
+Helpers for the URLs of the E-file proxy server's REST API.
+"""
+
+from typing import List, Optional
+from urllib.parse import urlsplit
+
+__all__ = ["endpoint_template", "url_jurisdiction"]
+
+
+# Path segments that are followed by an id in the proxy's REST API, and the name
+# that the id is given in an endpoint template.
+_TEMPLATE_COLLECTIONS = {
+    "courts": "court",
+    "filings": "filing",
+    "cases": "case",
+    "users": "user",
+    "attorneys": "attorney",
+    "payment-accounts": "payment_account",
+    "global-accounts": "global_account",
+    "service-contacts": "service_contact",
+    "categories": "category",
+    "case_types": "case_type",
+    "filing_types": "filing_type",
+    "party_types": "party_type",
+    "optional_services": "optional_service",
+    "datafields": "field_name",
+}
+_TEMPLATE_STATIC_SEGMENTS = {"public"}
+
+
+def endpoint_template(url: str, base_url: Optional[str] = None) -> str:
+    """Turns a full request URL into the endpoint it's calling, without any ids in it.
+
+    For example, `https://proxy/jurisdictions/illinois/codes/courts/adams/party_types`
+    becomes `codes/courts/{court}/party_types`. The jurisdiction and query params are dropped,
+    so the result can be used to group calls to the same endpoint together.
+    """
+    path = urlsplit(url).path
+    if base_url:
+        base_path = urlsplit(base_url).path
+        if base_path and path.startswith(base_path):
+            path = path[len(base_path) :]
+    segments = [seg for seg in path.split("/") if seg]
+    if len(segments) >= 2 and segments[0] == "jurisdictions":
+        segments = segments[2:]
+    templated: List[str] = []
+    idx = 0
+    while idx < len(segments):
+        segment = segments[idx]
+        templated.append(segment)
+        placeholder = _TEMPLATE_COLLECTIONS.get(segment)
+        if (
+            placeholder
+            and idx + 1 < len(segments)
+            and segments[idx + 1] not in _TEMPLATE_COLLECTIONS
+            and segments[idx + 1] not in _TEMPLATE_STATIC_SEGMENTS
+        ):
+            templated.append("{" + placeholder + "}")
+            idx += 2
+        else:
+            idx += 1
+    return "/".join(templated)
+
+
+def url_jurisdiction(url: str, base_url: Optional[str] = None) -> Optional[str]:
+    """The jurisdiction a request URL is for, or None for calls that aren't in one
+    (like `authenticate_user`)."""
+    path = urlsplit(url).path
+    if base_url:
+        base_path = urlsplit(base_url).path
+        if base_path and path.startswith(base_path):
+            path = path[len(base_path) :]
+    segments = [seg for seg in path.split("/") if seg]
+    if len(segments) >= 2 and segments[0] == "jurisdictions":
+        return segments[1]
+    return None
@@ -0,0 +1,159 @@
+"""
+Pages through the filings from [get_filing_list](#get_filing_list), newest first, so
+interviews can show a few of them at a time instead of every filing a firm made in a
+year.
+
+Pages are found with a cursor (the filing date and id of the last filing on the page
+before), not an offset, so a page stays the same when filings are added before it.
+Filings with the same date and id (or no id) are told apart by the order the proxy
+returned them in. A cursor that can't be read starts over at the first page.
+
+The paging is done here, not by the proxy: it can't page filings itself, so every
+filing in the date range is fetched and sorted first, and pages are cut from that list.
+It saves rendering and storing every filing on a page, not the fetch.
+
+Doesn't include anything from docassemble, and can be used without having it installed.
+"""
+
+from bisect import bisect_right
+from datetime import datetime
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+__all__ = [
+    "FilingPage",
+    "FilingPages",
+    "date_windows",
+    "get_filing_id",
+    "filing_timestamp",
+]
+
+# (negative filing date, filing id, how many filings with that date and id came before
+# it): sorts newest first, the same date by id, and the same date and id as returned
+_SortKey = Tuple[int, str, int]
+
+
+def get_filing_id(filing: Mapping) -> Optional[str]:
+    """The id of a filing from [get_filing_list](#get_filing_list). The same id that
+    `filing_id_and_label` uses"""
+    ids = filing.get("documentIdentification") or []
+    if len(ids) < 2:
+        return None
+    return (ids[1].get("identificationID") or {}).get("value")
+
+
+def filing_timestamp(filing: Mapping) -> int:
+    """When a filing was filed, in milliseconds from the epoch. 0 if it isn't there"""
+    try:
+        return int(
+            filing.get("documentFiledDate", {})
+            .get("dateRepresentation", {})
+            .get("value", {})
+            .get("value", 0)
+        )
+    except (AttributeError, TypeError, ValueError):
+        return 0
+
+
+def date_windows(
+    start: datetime, end: datetime, window: Any
+) -> List[Tuple[datetime, datetime]]:
+    """Splits the dates from `start` to before `end` into (start, before) windows, each
+    `window` long (a `timedelta`, or a `relativedelta` like `date_interval(months=1)`),
+    except the last, which stops at `end`."""
+    if not start + window > start:
+        raise ValueError(f"window has to move dates forward, not {window!r}")
+    windows = []
+    while start < end:
+        before = min(start + window, end)
+        windows.append((start, before))
+        start = before
+    return windows
+
+
+def _sort_keys(filings: Iterable[Mapping]) -> Iterator[Tuple[_SortKey, Mapping]]:
+    seen: Dict[Tuple[int, str], int] = {}
+    for filing in filings:
+        timestamp, filing_id = -filing_timestamp(filing), get_filing_id(filing) or ""
+        count = seen.get((timestamp, filing_id), 0)
+        seen[(timestamp, filing_id)] = count + 1
+        yield (timestamp, filing_id, count), filing
+
+
+def _parse_cursor(cursor: Any) -> Optional[_SortKey]:
+    """The sort key in a `next_cursor`, or None if it isn't one"""
+    try:
+        timestamp, _, rest = cursor.partition(":")
+        last_id, _, count = rest.rpartition(":")
+        return (-int(timestamp), last_id, int(count))
+    except (AttributeError, ValueError):
+        return None
+
+
+class FilingPage(NamedTuple):
+    filings: List[Mapping]
+    """The filings on this page, newest first"""
+    next_cursor: Optional[str]
+    """Pass to [FilingPages.page](#page) for the next page. None on the last page"""
+    total: int
+    """How many filings there are on every page"""
+
+    def labels(self, label: Callable[[Mapping], Any]) -> List[Any]:
+        """`label` (like `filing_id_and_label`) of each filing on just this page"""
+        return [label(filing) for filing in self.filings]
+
+
+class FilingPages:
+    """Filings sorted newest first, that can be read a page at a time.
+
+    Args:
+      filings: the `data` of a [get_filing_list](#get_filing_list) response
+    """
+
+    def __init__(self, filings: Optional[Iterable[Mapping]]):
+        keyed = sorted(_sort_keys(filings or []), key=lambda item: item[0])
+        self._keys: List[_SortKey] = [key for key, _ in keyed]
+        self.filings: List[Mapping] = [filing for _, filing in keyed]
+
+    def __len__(self) -> int:
+        return len(self.filings)
+
+    def __iter__(self) -> Iterator[Mapping]:
+        return iter(self.filings)
+
+    def _start(self, after: Optional[str]) -> int:
+        key = _parse_cursor(after) if after else None
+        if key is None:
+            return 0
+        return bisect_right(self._keys, key)
+
+    def page(self, after: Optional[str] = None, size: int = 25) -> FilingPage:
+        """The `size` filings after the cursor `after`, or the newest ones if there's no
+        cursor, or it isn't one"""
+        start = self._start(after)
+        filings = self.filings[start : start + size]
+        next_cursor = None
+        if start + size < len(self.filings) and filings:
+            timestamp, last_id, count = self._keys[start + size - 1]
+            next_cursor = f"{-timestamp}:{last_id}:{count}"
+        return FilingPage(filings, next_cursor, len(self.filings))
+
+    def iter(
+        self,
+        after: Optional[str] = None,
+        label: Optional[Callable[[Mapping], Any]] = None,
+    ) -> Iterator[Any]:
+        """Every filing after the cursor `after`, one at a time, for exports. Labelled
+        with `label` as they're read, if it's given."""
+        for filing in self.filings[self._start(after) :]:
+            yield label(filing) if label else filing
@@ -18,8 +18,20 @@ from typing import (
 from datetime import datetime
 
 from docassemble.base.util import CustomDataType, DAObject, DAList, log, word
+from .party_coverage import PartyTypeCoverage
+from .code_filters import (
+    CodeIndex,
+    CodeType,
+    ContainAny,
+    SearchType,
+    code_index,
+    make_filter,
+    make_filters,
+    select_codes,
+)
 from .conversions import (
     parse_case_info,
+    parse_found_case,
     fetch_case_info,
     chain_xml,
     log_error_and_notify,
@@ -237,7 +249,16 @@ def search_case_by_name(
     roles=None,
 ) -> Tuple[bool, DAList]:
     """Searches for cases by party name. If there are more than 10 cases found, we don't
-    add all of the detailed information about the case, just for the first few cases"""
+    add all of the detailed information about the case, just for the first few cases.
+
+    The found cases only have what the search results show, not `participants`,
+    `attorneys`, `party_to_attorneys`, `details` or `case_details`; call
+    [expand_found_case](conversions#expand_found_case) on the one the user picks to get
+    them. `filter_fn` gets the cases before that, so it should read the parties from
+    `new_case.case_summary` (a [CaseSummary](case_model#CaseSummary)), like
+    `new_case.case_summary.participants`. They're empty for cases after the first
+    [num_case_choices](#num_case_choices), whose details aren't fetched yet.
+    """
     if not var_name:
         var_name = "found_cases"
     found_cases = DAList(var_name, object_type=DAObject, auto_gather=False)
@@ -252,7 +273,7 @@ def search_case_by_name(
         for idx, entry in enumerate(reversed(get_cases_response.data)):
             new_case = found_cases.appendObject()
             should_fetch = idx < num_case_choices()
-            parse_case_info(
+            parse_found_case(
                 proxy_conn, new_case, entry, court_id, fetch=should_fetch, roles=roles
             )
             # Allows users to control what cases are shown as options
@@ -292,20 +313,30 @@ def shift_case_select_window(
     return start_idx, end_idx
 
 
-def any_missing_party_types(
-    party_type_map: dict, users: ALPeopleList, other_parties: ALPeopleList
-):
-    no_missing_required_party_types = True
+def missing_party_types(
+    party_type_map: dict,
+    users: ALPeopleList,
+    other_parties: ALPeopleList,
+    coverage: Optional[PartyTypeCoverage] = None,
+) -> List[Dict[str, Any]]:
+    """The required party types in `party_type_map` that none of the parties have.
+
+    Pass the same [PartyTypeCoverage](#PartyTypeCoverage) each time to only recount the
+    parties that changed. Every party's `party_type` is still read on each call.
+    """
+    if coverage is None:
+        coverage = PartyTypeCoverage(party_type_map)
+    coverage.sync(users, other_parties)
+    return coverage.missing()
 
-    def user_has_party_code(p, req_type):
-        return hasattr(p, "party_type") and p.party_type == req_type.get("code")
 
-    for p_type in party_type_map.values():
-        if p_type.get("isrequired"):
-            no_missing_required_party_types &= any(
-                filter(lambda p: user_has_party_code(p, p_type), users)
-            ) or any(filter(lambda p: user_has_party_code(p, p_type), other_parties))
-    return not no_missing_required_party_types
+def any_missing_party_types(
+    party_type_map: dict,
+    users: ALPeopleList,
+    other_parties: ALPeopleList,
+    coverage: Optional[PartyTypeCoverage] = None,
+) -> bool:
+    return bool(missing_party_types(party_type_map, users, other_parties, coverage))
 
 
 def exactly_one_required_filing_component(fc_opts, fc_map) -> bool:
@@ -328,7 +359,7 @@ def fee_total(fee_resp) -> Optional[float]:
 
 def get_full_court_info(proxy_conn, court_id: str) -> Dict:
     """Gets all of the information about the court from the id"""
-    full_court_resp = proxy_conn.get_court(court_id)
+    full_court_resp = proxy_conn.get_court_info_store().get(court_id)
     if full_court_resp.is_ok():
         return full_court_resp.data
     else:
@@ -362,124 +393,64 @@ def get_max_allowed_sizes(proxy_conn, court_id: str) -> Optional[Tuple[int, int]
             policy_resp.data, ["developmentPolicyParameters", "value"]
         )
         attachment_obj = chain_xml(dev_params, ["maximumAllowedAttachmentSize"])
-        attachment_max = _scale_byte_units(
-            chain_xml(attachment_obj, ["measureValue", "value", "value"]),
-            chain_xml(attachment_obj, ["measureUnitText", "value"]),
-        )
         message_obj = chain_xml(dev_params, ["maximumAllowedMessageSize"])
-        message_max = _scale_byte_units(
-            chain_xml(message_obj, ["measureValue", "value", "value"]),
-            chain_xml(message_obj, ["measureUnitText", "value"]),
-        )
+        try:
+            attachment_max = _scale_byte_units(
+                chain_xml(attachment_obj, ["measureValue", "value", "value"]),
+                chain_xml(attachment_obj, ["measureUnitText", "value"]),
+            )
+            message_max = _scale_byte_units(
+                chain_xml(message_obj, ["measureValue", "value", "value"]),
+                chain_xml(message_obj, ["measureUnitText", "value"]),
+            )
+        except (AttributeError, TypeError, ValueError) as ex:
+            log(f"Couldn't read the max allowed sizes in {court_id}'s policy: {ex}")
+            return None
         return attachment_max, message_max
     else:
         return None
 
 
-class CodeType(str):
-    pass
-
-
-class ContainAny(list):
-    pass
-
-
-# TODO(brycew): python 3.10, make this Iterable[str]
-SearchType = Union[Iterable, ContainAny, str, CodeType]
-
+def set_court_payload_budget(
+    proxy_conn, allowed_sizes: Optional[Tuple[int, int]]
+) -> Optional[int]:
+    """Warns about filings that are bigger than the court's maximum message size.
 
-def make_filter(
-    search: Union[Callable[..., bool], SearchType, None],
-) -> Callable[..., bool]:
-    """Makes a 'filter' function from some simple type.
+    `allowed_sizes` should be what [get_max_allowed_sizes](#get_max_allowed_sizes)
+    already returned, so this doesn't ask for the court's policy again. The budget is
+    only a warning: it's compared to the JSON sent to the proxy, not the message the
+    proxy sends to the court, so it can't say for sure that the court would refuse it.
 
-    Necessary because docassemble doesn't store lambdas and functions well in
-    interview dicts, so the filters need to be set as primitive types and kept
-    that way until the search actually happens (in filter_codes).
-    """
-    if not search:
-        # With None, this is usually with an exclude; so default to False
-        return lambda opt: False
-    if callable(search):
-        return search
-    if isinstance(search, CodeType):
-        return lambda opt, search_code=search: opt[0] == search_code
-    elif isinstance(search, str):
-        # unfortunately mypy doesn't work work well with lambdas, so use a def instead
-        # https://github.com/python/mypy/issues/4226
-        def func_from_str(opt, search_str=search):
-            return (opt[1] or "").lower().strip() == search_str.lower().strip()
-
-        return func_from_str
-    elif isinstance(search, ContainAny):
-
-        def func_from_any(opt, search_list=search):
-            return any(
-                [
-                    search_item.lower() in (opt[1] or "").lower()
-                    for search_item in search_list
-                ]
-            )
-
-        return func_from_any
-    else:  # if isinstance(search, Iterable):
-
-        def func_from_iter(opt, search_list=search):
-            return all(
-                [
-                    search_item.lower() in (opt[1] or "").lower()
-                    for search_item in search_list
-                ]
-            )
-
-        return func_from_iter
-
-
-def make_filters(
-    filters: Iterable[Union[Callable[..., bool], SearchType]],
-) -> Iterable[Callable[..., bool]]:
-    filter_lambdas = []
-    for filter_fn in filters:
-        filter_lambdas.append(make_filter(filter_fn))
-    for filter_fn in filters:
-        if not isinstance(filter_fn, CodeType) and isinstance(filter_fn, str):
-
-            def func_in_str(opt, filter_str=filter_fn):
-                return filter_str.lower() in (opt[1] or "").lower()
-
-            filter_lambdas.append(func_in_str)
-    return filter_lambdas
+    Returns the budget that was set, if the court has one."""
+    if not allowed_sizes or not allowed_sizes[1]:
+        return None
+    proxy_conn.set_payload_budget(
+        allowed_sizes[1], endpoint="filingreview/courts/{court}/filings"
+    )
+    return allowed_sizes[1]
 
 
 def filter_codes(
-    options: Iterable,
+    options: Union[CodeIndex, Iterable],
     filters: Iterable[Union[Callable[..., bool], SearchType]],
     default: str,
     exclude: Union[Callable[..., bool], SearchType, None] = None,
 ) -> Tuple[List[Any], Optional[str]]:
     """Given a list of filter functions from most specific to least specific,
     (if true, use that code), filters a total list of codes. If any codes match the exclude filter, won't use them.
-    """
-    codes_tmp: List[Any] = []
-    filter_lambdas = make_filters(filters)
-    exclude_lambda = make_filter(exclude)
-    for filter_fn in filter_lambdas:
-        if codes_tmp:
-            break
-        codes_tmp = [
-            opt
-            for opt in options
-            if filter_fn(opt) and (not exclude or not exclude_lambda(opt))
-        ]
 
-    codes = sorted(codes_tmp, key=lambda option: option[1] + str(option[0]))
+    `options` can also be a [CodeIndex](#CodeIndex), to filter the same list many times
+    without normalizing it again.
+    """
+    codes = select_codes(options, filters, exclude)
     if len(codes) == 1:
         return codes, codes[0][0]
     elif len(codes) == 0:
+        all_options = code_index(options).options
         log_error_and_notify(
-            f"Warning! No existing codes matched filters ({filters})! Falling back to default, but this is unchecked and dangerous. It will be removed in the future. (all of the options: {options})"
+            f"Warning! No existing codes matched filters ({filters})! Falling back to default, but this is unchecked and dangerous. It will be removed in the future. (all of the options: {all_options})"
         )
-        return list(options), default
+        return list(all_options), default
     else:
         log(
             f"Warning! More than one code matched filters ({filters})! This can result in a worse UX for users. (the found options ({codes}))"
@@ -523,7 +494,9 @@ def case_labeler(case):
 
 def get_available_efile_courts(proxy_conn) -> list:
     """Gets the list of efilable courts, if it can"""
-    resp = proxy_conn.authenticate_user()  # use default config keys
+    # Logs in with the default config keys, not the user's, only if the server's token
+    # from an earlier login is missing or about to expire
+    resp = proxy_conn.get_config_token_manager().ensure()
     if resp.response_code == 200:
         court_list = proxy_conn.get_court_list()
         if court_list.is_ok():
@@ -0,0 +1,187 @@
+"""
+Counts and times the calls made to the E-file proxy server, by endpoint and jurisdiction.
+
+Every [EfspConnection](#EfspConnection) in a process records into the same registry,
+so a docassemble endpoint or a cron job can expose it with
+[render_prometheus](#render_prometheus).
+"""
+
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple
+
+__all__ = [
+    "DEFAULT_LATENCY_BUCKETS",
+    "Histogram",
+    "MetricsRegistry",
+    "get_registry",
+    "render_prometheus",
+]
+
+# In seconds. Tyler calls are rarely faster than 50ms, and can take over a minute
+DEFAULT_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# endpoint template, jurisdiction, method
+Labels = Tuple[str, str, str]
+
+
+class Histogram:
+    """Cumulative histogram, in the same shape Prometheus expects."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        # One extra count for observations over the largest bucket (`+Inf`)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(upper bound, number of observations at or below it) for each bucket"""
+        total = 0
+        result = []
+        for bound, count in zip(list(self.buckets) + [float("inf")], self.counts):
+            total += count
+            result.append((_format_number(bound), total))
+        return result
+
+
+class MetricsRegistry:
+    """Latency histograms, status code counts and byte counts for proxy calls.
+
+    Everything is labelled by endpoint template (see
+    [endpoint_template](#endpoint_template)), jurisdiction and HTTP method, so there
+    are only as many series as there are endpoints, not one per court or case.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self.latency: Dict[Labels, Histogram] = {}
+        self.statuses: Dict[Tuple[str, str, str, str], int] = {}
+        self.request_bytes: Dict[Labels, int] = {}
+        self.response_bytes: Dict[Labels, int] = {}
+
+    def observe(
+        self,
+        *,
+        endpoint: str,
+        jurisdiction: Optional[str],
+        method: str,
+        status: int,
+        seconds: float,
+        request_bytes: int = 0,
+        response_bytes: int = 0,
+    ) -> None:
+        """Records one call.
+
+        Args:
+          status: the HTTP status code. -1 if the call never got a response (see
+              [ApiResponse](#ApiResponse))
+          seconds: how long the call took, including any retries
+        """
+        labels = (endpoint, jurisdiction or "", method)
+        with self._lock:
+            if labels not in self.latency:
+                self.latency[labels] = Histogram(self.buckets)
+            self.latency[labels].observe(seconds)
+            status_labels = labels + (str(status),)
+            self.statuses[status_labels] = self.statuses.get(status_labels, 0) + 1
+            self.request_bytes[labels] = (
+                self.request_bytes.get(labels, 0) + request_bytes
+            )
+            self.response_bytes[labels] = (
+                self.response_bytes.get(labels, 0) + response_bytes
+            )
+
+    def reset(self) -> None:
+        with self._lock:
+            self.latency.clear()
+            self.statuses.clear()
+            self.request_bytes.clear()
+            self.response_bytes.clear()
+
+    def render_prometheus(self, prefix: str = "efsp_client") -> str:
+        """The registry in the Prometheus text exposition format (version 0.0.4)"""
+        lines: List[str] = []
+        with self._lock:
+            lines.append(
+                f"# HELP {prefix}_request_duration_seconds Time taken by calls to the proxy"
+            )
+            lines.append(f"# TYPE {prefix}_request_duration_seconds histogram")
+            for labels, hist in sorted(self.latency.items()):
+                base = _label_str(labels)
+                for bound, total in hist.cumulative():
+                    lines.append(
+                        f"{prefix}_request_duration_seconds_bucket"
+                        f'{{{base},le="{bound}"}} {total}'
+                    )
+                lines.append(
+                    f"{prefix}_request_duration_seconds_sum{{{base}}} {_format_number(hist.sum)}"
+                )
+                lines.append(
+                    f"{prefix}_request_duration_seconds_count{{{base}}} {hist.count}"
+                )
+
+            lines.append(
+                f"# HELP {prefix}_responses_total Calls to the proxy, by status code"
+            )
+            lines.append(f"# TYPE {prefix}_responses_total counter")
+            for status_labels, count in sorted(self.statuses.items()):
+                base = _label_str(status_labels[:3])
+                lines.append(
+                    f'{prefix}_responses_total{{{base},status="{status_labels[3]}"}} {count}'
+                )
+
+            for name, counts, help_text in [
+                ("request_bytes_total", self.request_bytes, "Request body bytes sent"),
+                (
+                    "response_bytes_total",
+                    self.response_bytes,
+                    "Response body bytes received",
+                ),
+            ]:
+                lines.append(f"# HELP {prefix}_{name} {help_text}")
+                lines.append(f"# TYPE {prefix}_{name} counter")
+                for labels, total in sorted(counts.items()):
+                    lines.append(f"{prefix}_{name}{{{_label_str(labels)}}} {total}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_str(labels: Tuple[str, ...]) -> str:
+    endpoint, jurisdiction, method = labels
+    return (
+        f'endpoint="{_escape(endpoint)}",jurisdiction="{_escape(jurisdiction)}",'
+        f'method="{_escape(method)}"'
+    )
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+_registry = MetricsRegistry()
+
+
+def get_registry() -> MetricsRegistry:
+    """The registry that every connection in this process records into"""
+    return _registry
+
+
+def render_prometheus(
+    registry: Optional[MetricsRegistry] = None, prefix: str = "efsp_client"
+) -> str:
+    """Renders `registry` (by default, the process-wide one) in the Prometheus text
+    format, i.e. to return from a docassemble endpoint with the content type
+    `text/plain; version=0.0.4`."""
+    return (registry or _registry).render_prometheus(prefix)
@@ -0,0 +1,84 @@
+"""
+Keeps track of which of a case type's required party types have been given to a party
+yet, so interviews can check for missing ones on every page without comparing every
+party to every party type.
+
+docassemble sets `party_type` directly from questions, so nothing is told when it
+changes: [sync](#sync) still reads every party's `party_type` each time it's called.
+
+Doesn't include anything from docassemble, and can be used without having it installed.
+"""
+
+from collections import Counter
+from typing import Any, Dict, Hashable, Iterable, List, Optional
+
+__all__ = ["PartyTypeCoverage"]
+
+
+def _party_key(party: Any) -> Hashable:
+    # docassemble objects keep their name across pages; other objects only their id
+    return getattr(party, "instanceName", None) or id(party)
+
+
+class PartyTypeCoverage:
+    """How many parties have each party type, and which required party types no one has.
+
+    Args:
+      party_type_map: the party types of a case type, keyed by code, as made by
+          `choices_and_map` from `get_party_types`. The types with a truthy `isrequired`
+          are required
+    """
+
+    def __init__(self, party_type_map: Dict[str, Dict[str, Any]]):
+        self.required: Dict[str, Dict[str, Any]] = {
+            p_type.get("code", code): p_type
+            for code, p_type in party_type_map.items()
+            if p_type.get("isrequired")
+        }
+        self.counts: Counter = Counter()
+        self._assigned: Dict[Hashable, Optional[str]] = {}
+
+    def set_party_type(self, party_key: Hashable, code: Optional[str]) -> None:
+        """Records that a party now has the party type `code` (or none)"""
+        old = self._assigned.get(party_key)
+        if old == code:
+            return
+        if old is not None:
+            self.counts[old] -= 1
+            if self.counts[old] <= 0:
+                del self.counts[old]
+        if code is None:
+            self._assigned.pop(party_key, None)
+        else:
+            self._assigned[party_key] = code
+            self.counts[code] += 1
+
+    def remove_party(self, party_key: Hashable) -> None:
+        self.set_party_type(party_key, None)
+
+    def sync(self, *party_lists: Iterable[Any]) -> None:
+        """Updates the counts from the parties' current `party_type`s, and forgets about
+        parties that aren't in any of the lists anymore.
+
+        This is a full rescan: every party in the lists is visited to read its
+        `party_type`. Only the parties whose type changed are counted again, and
+        checking for missing types doesn't depend on the number of parties. Code that
+        sets a party's type itself can call [set_party_type](#set_party_type) instead.
+        """
+        seen = set()
+        for parties in party_lists:
+            for party in parties:
+                key = _party_key(party)
+                seen.add(key)
+                self.set_party_type(key, getattr(party, "party_type", None))
+        for key in [key for key in self._assigned if key not in seen]:
+            self.remove_party(key)
+
+    def missing(self) -> List[Dict[str, Any]]:
+        """The required party types that no party has"""
+        return [
+            p_type for code, p_type in self.required.items() if not self.counts[code]
+        ]
+
+    def any_missing(self) -> bool:
+        return any(not self.counts[code] for code in self.required)
@@ -7,23 +7,109 @@ Doesn't include anything from docassemble, and can be used without having it ins
 """
 
 import re
+import json
+import time
 import logging
+import threading
 import requests
 from logging import LoggerAdapter
 from requests import Request, PreparedRequest
 from uuid import UUID, uuid4
 from requests import Response
-from datetime import datetime
-from typing import Optional, Union, List, Dict
+from datetime import datetime, timedelta
+from typing import (
+    Optional,
+    Union,
+    List,
+    Dict,
+    Tuple,
+    Any,
+    Callable,
+    ContextManager,
+    Iterator,
+    Set,
+)
 import http.client as http_client
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import as_completed as futures_as_completed
+from contextlib import contextmanager
 from copy import deepcopy
-
-__all__ = ["LoggerWithContext", "ApiResponse", "EfspConnection"]
+from .cassette import CassettePlayer, CassetteRecorder
+from .code_cache import code_cache_key, get_code_cache
+from .code_search import get_code_search_store
+from .filing_pages import FilingPages, date_windows, get_filing_id
+from .endpoints import endpoint_template, url_jurisdiction
+from .metrics import get_registry
+from .slow_calls import get_slow_call_capture
+from .tracing import Span, current_span, span, use_parent
+from .transports import (
+    RequestsTransport,
+    Transport,
+    _add_timing,
+    _call_timing,
+    _pooled_session,
+    set_connection_pool_size,
+)
+
+__all__ = [
+    "LoggerWithContext",
+    "ApiResponse",
+    "Batch",
+    "EfspConnection",
+    "CourtInfoStore",
+    "MemoryTokenStore",
+    "TokenManager",
+    "set_connection_pool_size",
+    "endpoint_template",
+    "url_jurisdiction",
+    "payload_breakdown",
+]
 
 SESSION_ID_HEADER = "efsp-session-id"
 CORR_ID_HEADER = "efsp-correlation-id"  # TODO(brycew): Figure out how to add
 REQUEST_ID_HEADER = "efsp-request-id"
 
+# Retrying these after re-authenticating can't do something twice
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+# Shared by every connection in this process, so that many requests failing with the
+# same expired token only cause one re-authentication. Keyed by the failed token, with
+# when the lock was made. Both are pruned once they're older than the reuse window.
+_reauth_locks: Dict[Tuple[str, str, str], Tuple[threading.Lock, float]] = {}
+_reauth_locks_lock = threading.Lock()
+_recent_reauths: Dict[Tuple[str, str, str], Tuple[float, Dict[str, Any]]] = {}
+_RECENT_REAUTH_SECONDS = 60
+
+
+def _prune_reauths(now: float) -> None:
+    """Forgets re-authentications too old to be reused, and the locks of failed tokens
+    that no one has re-authenticated for lately. Call with `_reauth_locks_lock` held."""
+    for key in [
+        key
+        for key, (at, _) in _recent_reauths.items()
+        if now - at >= _RECENT_REAUTH_SECONDS
+    ]:
+        del _recent_reauths[key]
+    for key in [
+        key
+        for key, (lock, made_at) in _reauth_locks.items()
+        if now - made_at >= _RECENT_REAUTH_SECONDS
+        and key not in _recent_reauths
+        and not lock.locked()
+    ]:
+        del _reauth_locks[key]
+
+
+# Guards the payload stats, which the worker threads of a `Batch` all update
+_payload_sizes_lock = threading.Lock()
+# Set in the worker threads of a `Batch`
+_batch_local = threading.local()
+
+
+def in_batch_worker() -> bool:
+    """True if the current thread is running calls queued on a [Batch](#Batch)"""
+    return getattr(_batch_local, "active", False)
+
 
 class LoggerWithContext(LoggerAdapter):
     """Acts like the `merge_extra` feature from LoggerAdapter (python 3.13) is always on.
@@ -51,12 +137,14 @@ class ApiResponse(object):
         *,
         session_id: Optional[str] = None,
         req_id: Optional[str] = None,
+        response_bytes: Optional[int] = None,
     ):
         self.response_code = response_code
         self.error_msg = error_msg
         self.data = data
         self.session_id = session_id
         self.req_id = req_id
+        self.response_bytes = response_bytes
 
     def __str__(self):
         if self.error_msg:
@@ -86,6 +174,12 @@ class ApiResponse(object):
             self.req_id = None
         return self.req_id
 
+    def get_response_bytes(self) -> Optional[int]:
+        """The size of the raw response body, if it came from the server."""
+        if not hasattr(self, "response_bytes"):
+            self.response_bytes = None
+        return self.response_bytes
+
 
 def _user_visible_resp(resp: Union[Response, str, None]) -> ApiResponse:
     """This function takes the essentials of a response and puts in into
@@ -98,17 +192,469 @@ def _user_visible_resp(resp: Union[Response, str, None]) -> ApiResponse:
         return ApiResponse(-1, resp, None)
     session_id = resp.request.headers.get(SESSION_ID_HEADER)
     req_id = resp.request.headers.get(REQUEST_ID_HEADER)
+    response_bytes = len(resp.content or b"")
     try:
         data = resp.json()
         return ApiResponse(
-            resp.status_code, None, data, session_id=session_id, req_id=req_id
+            resp.status_code,
+            None,
+            data,
+            session_id=session_id,
+            req_id=req_id,
+            response_bytes=response_bytes,
         )
     except:
         return ApiResponse(
-            resp.status_code, resp.text, None, session_id=session_id, req_id=req_id
+            resp.status_code,
+            resp.text,
+            None,
+            session_id=session_id,
+            req_id=req_id,
+            response_bytes=response_bytes,
         )
 
 
+def payload_breakdown(
+    payload: Dict[str, Any], top_n: int = 10
+) -> List[Tuple[str, int]]:
+    """Returns the serialized size in bytes of the `top_n` biggest top-level entries of
+    a JSON payload, biggest first.
+
+    Mostly useful for the big `all_vars` dicts sent when filing, to find which
+    interview variables are taking up the most room.
+    """
+    sizes = [
+        (key, len(json.dumps(val, default=str).encode("utf-8")))
+        for key, val in payload.items()
+    ]
+    sizes.sort(key=lambda item: item[1], reverse=True)
+    return sizes[:top_n]
+
+
+class CourtInfoStore:
+    """Keeps the full codes document of each court (from
+    [EfspConnection.get_court](#get_court)) for a while, so the many places that need
+    one or two facts about a court don't each download the whole thing again.
+
+    Only successful responses are kept. They're kept when the connection logs in again:
+    the proxy's codes don't depend on who's logged in (see [code_cache](#code_cache)).
+    """
+
+    def __init__(self, fetch: Callable[[str], ApiResponse], ttl: float = 60 * 60):
+        """
+        Args:
+          fetch: gets the codes document for a court id, usually `EfspConnection.get_court`
+          ttl: how long (in seconds) to keep a court's info before fetching it again
+        """
+        self.fetch = fetch
+        self.ttl = ttl
+        self.courts: Dict[str, Tuple[float, ApiResponse]] = {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # Court codes are big; they're fetched again in the next process if needed
+        state["courts"] = {}
+        return state
+
+    def get(self, court_id: str) -> ApiResponse:
+        """The (possibly stored) response from `get_court` for this court"""
+        with span("court_info", court_id=court_id) as info_span:
+            stored = self.courts.get(court_id)
+            if stored and time.time() - stored[0] < self.ttl:
+                info_span.set(cache_hit=True)
+                return stored[1]
+            info_span.set(cache_hit=False)
+            resp = self.fetch(court_id)
+            if resp.is_ok():
+                self.courts[court_id] = (time.time(), resp)
+            else:
+                self.courts.pop(court_id, None)
+            return resp
+
+    def info(self, court_id: str) -> Dict[str, Any]:
+        """The codes document for this court, or an empty dict if it couldn't be fetched"""
+        resp = self.get(court_id)
+        if resp.is_ok() and isinstance(resp.data, dict):
+            return resp.data
+        return {}
+
+    def invalidate(self, court_id: Optional[str] = None) -> None:
+        """Forgets about one court, or all courts if `court_id` is None"""
+        if court_id is None:
+            self.courts = {}
+        else:
+            self.courts.pop(court_id, None)
+
+    def name(self, court_id: str) -> str:
+        return self.info(court_id).get("name") or court_id
+
+    def efm_type(self, court_id: str) -> str:
+        return self.info(court_id).get("efmType") or "ecf"
+
+    def has_conditional_service_types(self, court_id: str) -> bool:
+        return bool(self.info(court_id).get("hasconditionalservicetypes"))
+
+    def allowable_card_types(self, court_id: str) -> List[str]:
+        return self.info(court_id).get("allowablecardtypes") or []
+
+    def allows_non_indexed_filing(self, court_id: str) -> bool:
+        return bool(self.info(court_id).get("allowfilingintononindexedcase"))
+
+    def allows_return_date(self, court_id: str) -> bool:
+        return bool(self.info(court_id).get("allowreturndate"))
+
+    def allows_initial_filing(self, court_id: str) -> bool:
+        return bool(self.info(court_id).get("initial"))
+
+    def allows_subsequent_filing(self, court_id: str) -> bool:
+        return bool(self.info(court_id).get("subsequent"))
+
+
+class MemoryTokenStore:
+    """Keeps tokens in a dict. Has the same `get`, `set`, and `delete` methods as
+    docassemble's `DAStore`, which is what's used in interviews."""
+
+    def __init__(self) -> None:
+        self.values: Dict[str, Any] = {}
+
+    def get(self, key: str) -> Any:
+        return self.values.get(key)
+
+    def set(self, key: str, value: Any) -> None:
+        self.values[key] = value
+
+    def delete(self, key: str) -> None:
+        self.values.pop(key, None)
+
+
+# Tokens from logins with the server's own configured credentials. They're the same
+# for every user, so every connection in this process shares them
+_config_tokens = MemoryTokenStore()
+
+
+class TokenManager:
+    """Reuses Tyler tokens for as long as they're valid, instead of re-authenticating.
+
+    Tokens from successful logins are saved to `store` along with when they were
+    obtained, so later connections can load them instead of calling `authenticate`.
+    Tyler doesn't tell us when a token expires, so they're treated as expired
+    `lifetime` seconds after they were obtained, and as needing a refresh
+    `refresh_margin` seconds before that.
+
+    Only tokens from a login that `refresh` can repeat (i.e. one using the server's
+    own configured credentials, not a user's password) are ever refreshed.
+
+    `key_prefix` starts the name of everything saved in `store`, so that tokens from
+    different logins can be kept in the same store without replacing each other.
+    """
+
+    key_prefix = "EFSP-"
+
+    def __init__(
+        self,
+        conn: "EfspConnection",
+        store=None,
+        *,
+        lifetime: float = 12 * 60 * 60,
+        refresh_margin: float = 30 * 60,
+        refresh: Optional[Callable[[], ApiResponse]] = None,
+        key_prefix: Optional[str] = None,
+    ):
+        self.conn = conn
+        if key_prefix is not None:
+            self.key_prefix = key_prefix
+        self.store = store if store is not None else MemoryTokenStore()
+        self.lifetime = lifetime
+        self.refresh_margin = refresh_margin
+        self.refresh = refresh
+        self.can_refresh = False
+        self._timer: Optional[threading.Timer] = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # Timers are tied to this process, and can't be pickled
+        state["_timer"] = None
+        return state
+
+    def token_header(self, jurisdiction: Optional[str] = None) -> str:
+        if jurisdiction is None:
+            jurisdiction = self.conn.default_jurisdiction
+        return "TYLER-TOKEN-" + str(jurisdiction).upper()
+
+    def id_header(self, jurisdiction: Optional[str] = None) -> str:
+        if jurisdiction is None:
+            jurisdiction = self.conn.default_jurisdiction
+        return "TYLER-ID-" + str(jurisdiction).upper()
+
+    def _obtained_at_key(self, header: str) -> str:
+        return f"{self.key_prefix}{header}-OBTAINED-AT"
+
+    def save(self, tokens: Dict[str, str]) -> None:
+        """Saves the tokens from a successful `authenticate` response"""
+        now = time.time()
+        for k, v in tokens.items():
+            self.store.set(f"{self.key_prefix}{k}", v)
+            self.store.set(self._obtained_at_key(k), now)
+
+    def expires_at(self, jurisdiction: Optional[str] = None) -> Optional[float]:
+        """When the stored token for the jurisdiction should be treated as expired, if we know"""
+        obtained_at = self.store.get(
+            self._obtained_at_key(self.token_header(jurisdiction))
+        )
+        if not obtained_at:
+            return None
+        return float(obtained_at) + self.lifetime
+
+    def is_fresh(self, jurisdiction: Optional[str] = None) -> bool:
+        """If the stored token is still good, and isn't close to expiring"""
+        expires_at = self.expires_at(jurisdiction)
+        return expires_at is not None and time.time() < expires_at - self.refresh_margin
+
+    def load(self, jurisdiction: Optional[str] = None) -> bool:
+        """Puts the stored tokens in the connection's headers, if they are still fresh.
+
+        Returns:
+          true if the connection now has a fresh token for the jurisdiction
+        """
+        if not self.is_fresh(jurisdiction):
+            return False
+        headers = self.conn.proxy_client.headers
+        for header in [self.token_header(jurisdiction), self.id_header(jurisdiction)]:
+            val = self.store.get(f"{self.key_prefix}{header}")
+            if val:
+                headers[header] = val
+        return bool(headers.get(self.token_header(jurisdiction)))
+
+    def ensure(self, jurisdiction: Optional[str] = None) -> ApiResponse:
+        """Makes sure the connection has a fresh token, only calling `refresh` if it
+        has to. Returns the `refresh` response, or a 200 response with the reused tokens.
+        """
+        if self.load(jurisdiction):
+            headers = self.conn.proxy_client.headers
+            tokens = {
+                header: headers.get(header)
+                for header in [
+                    self.token_header(jurisdiction),
+                    self.id_header(jurisdiction),
+                ]
+                if headers.get(header)
+            }
+            return ApiResponse(200, None, {"tokens": tokens})
+        if self.refresh is None:
+            return ApiResponse(401, "No valid Tyler token, and no way to get one", None)
+        return self.refresh()
+
+    def reauthenticate(self, failed_token: Optional[str]) -> bool:
+        """Gets a new token after the proxy rejected `failed_token`.
+
+        If another request in this process already got a new token after the same
+        failure, that token is reused instead of authenticating again. Otherwise, tries
+        a newer token from the store, then `refresh` if the login can be repeated.
+
+        Returns:
+          true if the connection now has a different token to try
+        """
+        header = self.token_header()
+        key = (self.conn.base_url, header, failed_token or "")
+        with _reauth_locks_lock:
+            now = time.time()
+            _prune_reauths(now)
+            lock = _reauth_locks.setdefault(key, (threading.Lock(), now))[0]
+        with lock:
+            headers = self.conn.proxy_client.headers
+            recent = _recent_reauths.get(key)
+            if recent and time.time() - recent[0] < _RECENT_REAUTH_SECONDS:
+                headers.update(recent[1])
+                return True
+            stored = self.store.get(f"{self.key_prefix}{header}")
+            if stored and stored != failed_token and self.load():
+                return True
+            if not self.can_refresh or self.refresh is None:
+                return False
+            resp = self.refresh()
+            if not resp.is_ok():
+                return False
+            tokens = {
+                name: headers.get(name)
+                for name in [header, self.id_header()]
+                if headers.get(name)
+            }
+            with _reauth_locks_lock:
+                _recent_reauths[key] = (time.time(), tokens)
+            return True
+
+    def start_background_refresh(self) -> None:
+        """Refreshes the token in a background thread shortly before it expires.
+
+        Does nothing if the token can't be refreshed, or if a refresh is already scheduled.
+        """
+        if not self.can_refresh or self.refresh is None:
+            return
+        if self._timer is not None and self._timer.is_alive():
+            return
+        expires_at = self.expires_at()
+        if expires_at is None:
+            return
+        delay = max(0.0, expires_at - self.refresh_margin - time.time())
+        self._timer = threading.Timer(delay, self._background_refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def stop_background_refresh(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _background_refresh(self) -> None:
+        self._timer = None
+        if self.refresh is None:
+            return
+        try:
+            resp = self.refresh()
+        except Exception as ex:
+            self.conn.get_logger().warning(f"Background token refresh failed: {ex}")
+            return
+        if resp.is_ok():
+            self.start_background_refresh()
+        else:
+            self.conn.get_logger().warning(f"Background token refresh failed: {resp}")
+
+
+def _auth_headers(headers) -> Dict[str, Any]:
+    """Just the Tyler token headers, i.e. TYLER-TOKEN-ILLINOIS and TYLER-ID-ILLINOIS"""
+    return {k: v for k, v in headers.items() if k.upper().startswith("TYLER-")}
+
+
+def _body_bytes(req: PreparedRequest) -> int:
+    if not req.body:
+        return 0
+    if isinstance(req.body, str):
+        return len(req.body.encode("utf-8"))
+    if isinstance(req.body, bytes):
+        return len(req.body)
+    return 0
+
+
+class Batch:
+    """Queues calls to an [EfspConnection](#EfspConnection) and runs them concurrently.
+
+    Any method of the connection can be called on the batch, with the same arguments.
+    Instead of running right away, each call returns a `concurrent.futures.Future`.
+    When the `with` block exits, all of the queued calls run on a thread pool, so
+    their latencies overlap instead of adding up:
+
+    ```
+    with proxy_conn.batch() as b:
+        firm = b.get_firm()
+        users = b.get_user_list()
+        attorneys = b.get_attorney_list()
+    firm.result().data
+    ```
+
+    Only independent calls should be batched: they run in no particular order. If the
+    `with` block raises, nothing queued is run and every future is cancelled.
+    """
+
+    def __init__(self, conn: "EfspConnection", max_workers: int = 4):
+        self._conn = conn
+        self._max_workers = max(1, max_workers)
+        self._calls: List[Tuple[Future, Callable, tuple, dict]] = []
+
+    def __enter__(self) -> "Batch":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.run()
+        else:
+            self.cancel()
+
+    def __getattr__(self, name: str) -> Callable[..., Future]:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        method = getattr(self._conn, name)
+        if not callable(method):
+            raise AttributeError(
+                f"{name} isn't a method of {type(self._conn).__name__}"
+            )
+
+        def queue(*args, **kwargs) -> Future:
+            return self.submit(method, *args, **kwargs)
+
+        return queue
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Queues `fn(*args, **kwargs)`, for functions that aren't connection methods"""
+        future: Future = Future()
+        self._calls.append((future, fn, args, kwargs))
+        return future
+
+    def cancel(self) -> None:
+        for future, _, _, _ in self._calls:
+            future.cancel()
+        self._calls = []
+
+    def run(self) -> List[Future]:
+        """Runs everything queued so far, and waits for it all to finish"""
+        futures = [call[0] for call in self._calls]
+        for _ in self.as_completed():
+            pass
+        return futures
+
+    def as_completed(self) -> Iterator[Future]:
+        """Runs everything queued so far, yielding each future as soon as its call
+        finishes. If the loop over it stops early, calls that haven't started are
+        cancelled."""
+        calls, self._calls = self._calls, []
+        if not calls:
+            return
+        # Make the session now, so the workers don't each race to make their own
+        self._conn.proxy_client
+        setup = self._conn._thread_context()
+        parent = current_span()
+        futures = [call[0] for call in calls]
+        workers = min(self._max_workers, len(calls))
+        executor = ThreadPoolExecutor(max_workers=workers)
+        try:
+            for call in calls:
+                executor.submit(self._run_one, setup, parent, *call)
+            for future in futures_as_completed(futures):
+                yield future
+        finally:
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=True)
+        if any(
+            not f.cancelled()
+            and f.exception() is None
+            and isinstance(f.result(), ApiResponse)
+            and f.result().response_code == 401
+            for f in futures
+        ):
+            self._conn._on_unauthorized()
+
+    @staticmethod
+    def _run_one(
+        setup: Callable[[], None],
+        parent: Optional[Span],
+        future: Future,
+        fn: Callable,
+        args: tuple,
+        kwargs: dict,
+    ) -> None:
+        if not future.set_running_or_notify_cancel():
+            return
+        _batch_local.active = True
+        try:
+            setup()
+            with use_parent(parent):
+                future.set_result(fn(*args, **kwargs))
+        except BaseException as ex:
+            future.set_exception(ex)
+        finally:
+            _batch_local.active = False
+
+
 class EfspConnection:
     """A python client that communicates with the E-file proxy server."""
 
@@ -120,12 +666,15 @@ class EfspConnection:
         default_jurisdiction: str = None,
         interview_name: str = None,
         logger=None,
+        transport: Optional[Transport] = None,
     ):
         """
         Args:
           url (str)
           api_key (str)
           default_jurisdiction (str)
+          transport: sends the requests, instead of the `proxy_client` session. See
+              [transports](#transports)
         """
         if not url.endswith("/"):
             url = url + "/"
@@ -135,7 +684,6 @@ class EfspConnection:
 
         self.base_url = url
         self.api_key = api_key
-        self.proxy_client = requests.Session()
         self.active_token = None
         # Keep one uuid for the whole of this class's life, i.e. the session
         self.session_id = str(uuid4())
@@ -145,20 +693,61 @@ class EfspConnection:
         self.logger = LoggerWithContext(logger, {"session_id": self.session_id})
         self.logger.info(f"setting default jurisdiction to {default_jurisdiction}")
         self.default_jurisdiction = default_jurisdiction
-        self.proxy_client.headers.update(
+        self.verbose = False
+        self.authed_user_id = None
+        self.payload_sizes: Dict[str, Dict[str, Any]] = {}
+        self.payload_budgets: Dict[str, Tuple[int, bool]] = {}
+        self.court_info_store = CourtInfoStore(self.get_court)
+        self.reauthenticate_on_401 = False
+        self.slow_call_seconds: Optional[float] = None
+        self._transport = transport
+
+    @property
+    def proxy_client(self) -> requests.Session:
+        """The HTTP session used to talk to the proxy. Made when first needed, and
+        never saved when the connection is pickled."""
+        if self.__dict__.get("_proxy_client") is None:
+            self._proxy_client = self._new_session()
+        return self._proxy_client
+
+    @proxy_client.setter
+    def proxy_client(self, session: requests.Session) -> None:
+        self._proxy_client = session
+
+    def _new_session(self) -> requests.Session:
+        session = _pooled_session(self.base_url)
+        session.headers.update(
             {
                 "Content-type": "application/json",
                 "Accept": "application/json",
             }
         )
-        self.proxy_client.headers["X-API-KEY"] = api_key
-        self.verbose = False
-        self.authed_user_id = None
+        session.headers["X-API-KEY"] = self.api_key
+        session.headers.update(self.__dict__.pop("auth_headers", None) or {})
+        return session
+
+    def __getstate__(self):
+        """Only saves the connection's configuration and tokens, not the HTTP session
+        or the payload sizes seen in this process"""
+        state = self.__dict__.copy()
+        session = state.pop("_proxy_client", None)
+        state.pop("_transport", None)
+        state.pop("payload_sizes", None)
+        if session is not None:
+            state["auth_headers"] = _auth_headers(session.headers)
+        return state
+
+    def __setstate__(self, state):
+        # Connections pickled before sessions were left out saved the whole session
+        old_session = state.pop("proxy_client", None)
+        if old_session is not None and "auth_headers" not in state:
+            state["auth_headers"] = _auth_headers(old_session.headers)
+        self.__dict__.update(state)
 
     # Should only be called from _send.
     def _call_proxy(self, req: PreparedRequest) -> ApiResponse:
         try:
-            resp = self.proxy_client.send(req)
+            resp = self._retry_unauthorized(req, self._timed_send(req))
         except requests.ConnectionError as ex:
             return _user_visible_resp(
                 f"Could not connect to the Proxy server at {self.base_url}: {ex}"
@@ -171,8 +760,67 @@ class EfspConnection:
             return _user_visible_resp(f"Something went wrong with the request: {ex}")
         return _user_visible_resp(resp)
 
-    def _send(self, to_send: Request, *, req_id: Optional[UUID] = None) -> ApiResponse:
-        """Handle sending the request / structuring the response"""
+    def _retry_unauthorized(self, req: PreparedRequest, resp: Response) -> Response:
+        """If `reauthenticate_on_401` is on, and an idempotent request failed with a 401,
+        gets a new token and sends the request again, once. Returns the final response.
+        """
+        if (
+            resp.status_code != 401
+            or not getattr(self, "reauthenticate_on_401", False)
+            or req.method not in IDEMPOTENT_METHODS
+        ):
+            return resp
+        token_manager = self.get_token_manager()
+        failed_token = req.headers.get(token_manager.token_header())
+        if not token_manager.reauthenticate(failed_token):
+            return resp
+        self.get_logger().info(
+            f"Got a new token after a 401, replaying {req.method} on {req.url}",
+            extra={"req-id": req.headers.get(REQUEST_ID_HEADER)},
+        )
+        call_span = current_span()
+        if call_span is not None and call_span.name == "proxy_call":
+            call_span.set(retries=call_span.attributes.get("retries", 0) + 1)
+        replay = req.copy()
+        for header in [token_manager.token_header(), token_manager.id_header()]:
+            token = self.proxy_client.headers.get(header)
+            if token:
+                replay.headers[header] = (
+                    token.decode() if isinstance(token, bytes) else token
+                )
+        return self._timed_send(replay)
+
+    def _timed_send(self, req: PreparedRequest) -> Response:
+        """Sends a request, adding the time spent waiting for the first byte of the
+        response and for the rest of its body to the current call's timings."""
+        timings = getattr(_call_timing, "timings", None)
+        connect_before = timings.get("connect", 0.0) if timings is not None else 0.0
+        start = time.monotonic()
+        resp = self.get_transport().send(req, stream=True)
+        headers_at = time.monotonic()
+        resp.content  # Reads the whole body, and returns the connection to the pool
+        done_at = time.monotonic()
+        connect = (
+            timings.get("connect", 0.0) - connect_before if timings is not None else 0.0
+        )
+        _add_timing("ttfb", headers_at - start - connect)
+        _add_timing("body", done_at - headers_at)
+        _call_timing.response = resp
+        return resp
+
+    def _send(
+        self,
+        to_send: Request,
+        *,
+        req_id: Optional[UUID] = None,
+        refresh_cache: bool = False,
+    ) -> ApiResponse:
+        """Handle sending the request / structuring the response
+
+        Args:
+          refresh_cache: send the request even if the response is in the code cache,
+              and store the new response
+        """
         if req_id is None:
             req_id = uuid4()
         to_send.headers["efsp-request-id"] = str(req_id)
@@ -181,7 +829,291 @@ class EfspConnection:
         self.get_logger().info(
             f"Calling {to_send.method} on {to_send.url}", extra={"req-id": str(req_id)}
         )
-        return self._call_proxy(self.proxy_client.prepare_request(to_send))
+        prepared = self.proxy_client.prepare_request(to_send)
+        endpoint = endpoint_template(to_send.url, self.base_url)
+        jurisdiction = url_jurisdiction(to_send.url, self.base_url)
+        request_bytes = _body_bytes(prepared)
+        cache = get_code_cache()
+        cache_key = None
+        if cache is not None and prepared.url:
+            cache_key = code_cache_key(to_send.method, prepared.url, self.base_url)
+        with span(
+            "proxy_call",
+            endpoint=endpoint,
+            jurisdiction=jurisdiction,
+            method=to_send.method,
+            session_id=self.get_session_id(),
+            request_id=str(req_id),
+            request_bytes=request_bytes,
+            retries=0,
+            cache_hit=False,
+        ) as call_span:
+            if cache is not None and cache_key is not None and not refresh_cache:
+                body = cache.get(cache_key)
+                if body is not None:
+                    call_span.set(cache_hit=True, status=200, response_bytes=len(body))
+                    return ApiResponse(
+                        200,
+                        None,
+                        json.loads(body),
+                        session_id=self.get_session_id(),
+                        req_id=str(req_id),
+                        response_bytes=len(body),
+                    )
+            over_budget = self._check_payload_budget(endpoint, request_bytes, req_id)
+            if over_budget:
+                call_span.set(status=over_budget.response_code, sent=False)
+                return over_budget
+            # Calls can nest, i.e. re-authenticating in the middle of another call
+            outer_timings = getattr(_call_timing, "timings", None)
+            _call_timing.timings = timings = {}
+            _call_timing.response = None
+            start = time.monotonic()
+            try:
+                resp = self._call_proxy(prepared)
+            finally:
+                elapsed = time.monotonic() - start
+                raw_resp = _call_timing.response
+                _call_timing.timings = outer_timings
+                _call_timing.response = None
+            timings["total"] = elapsed
+            response_bytes = resp.get_response_bytes() or 0
+            call_span.set(
+                status=resp.response_code, response_bytes=response_bytes, **timings
+            )
+            self._log_if_slow(prepared, raw_resp, endpoint, timings, req_id)
+            if (
+                cache is not None
+                and cache_key is not None
+                and raw_resp is not None
+                and resp.is_ok()
+                and resp.data is not None
+            ):
+                cache.put(cache_key, raw_resp.content)
+        self._record_payload_sizes(endpoint, request_bytes, response_bytes)
+        get_registry().observe(
+            endpoint=endpoint,
+            jurisdiction=jurisdiction,
+            method=to_send.method,
+            status=resp.response_code,
+            seconds=elapsed,
+            request_bytes=request_bytes,
+            response_bytes=response_bytes,
+        )
+        return resp
+
+    def get_payload_sizes(self) -> Dict[str, Dict[str, Any]]:
+        """The request and response body sizes (in bytes) of the calls made so far,
+        keyed by endpoint template (see [endpoint_template](#endpoint_template))."""
+        if not hasattr(self, "payload_sizes"):
+            self.payload_sizes = {}
+        return self.payload_sizes
+
+    def _payload_stats(self, endpoint: str) -> Dict[str, Any]:
+        return self.get_payload_sizes().setdefault(
+            endpoint,
+            {
+                "calls": 0,
+                "request_bytes": 0,
+                "response_bytes": 0,
+                "max_request_bytes": 0,
+                "max_response_bytes": 0,
+            },
+        )
+
+    def _record_payload_sizes(
+        self, endpoint: str, request_bytes: int, response_bytes: int
+    ) -> None:
+        with _payload_sizes_lock:
+            stats = self._payload_stats(endpoint)
+            stats["calls"] += 1
+            stats["request_bytes"] += request_bytes
+            stats["response_bytes"] += response_bytes
+            stats["max_request_bytes"] = max(stats["max_request_bytes"], request_bytes)
+            stats["max_response_bytes"] = max(
+                stats["max_response_bytes"], response_bytes
+            )
+
+    def record_payload_breakdown(
+        self, endpoint: str, payload: Dict[str, Any], top_n: int = 10
+    ) -> List[Tuple[str, int]]:
+        """Saves (and logs) which top-level entries of a payload are the biggest, so
+        it's possible to tell why a particular request to `endpoint` is so large."""
+        breakdown = payload_breakdown(payload, top_n)
+        self._payload_stats(endpoint)["largest_fields"] = breakdown
+        self.get_logger().debug(f"Largest fields sent to {endpoint}: {breakdown}")
+        return breakdown
+
+    def get_payload_budgets(self) -> Dict[str, Tuple[int, bool]]:
+        if not hasattr(self, "payload_budgets"):
+            self.payload_budgets = {}
+        return self.payload_budgets
+
+    def set_payload_budget(
+        self,
+        max_bytes: Optional[int],
+        *,
+        endpoint: Optional[str] = None,
+        hard_limit: bool = False,
+    ) -> None:
+        """Sets the biggest request body (in bytes) that should be sent to an endpoint.
+
+        Requests over the budget are logged as a warning. If `hard_limit` is true, they
+        aren't sent at all, and get a 413 response instead.
+
+        Args:
+          max_bytes: the budget. `None` removes any existing budget
+          endpoint: the endpoint template the budget applies to, i.e.
+              `filingreview/courts/{court}/filings`. If not given, applies to all
+              endpoints that don't have their own budget
+          hard_limit: if true, refuse to send requests over budget
+        """
+        key = endpoint or "*"
+        if max_bytes is None:
+            self.get_payload_budgets().pop(key, None)
+        else:
+            self.get_payload_budgets()[key] = (max_bytes, hard_limit)
+
+    def _check_payload_budget(
+        self, endpoint: str, request_bytes: int, req_id: Union[UUID, str, None] = None
+    ) -> Optional[ApiResponse]:
+        """Returns an error response if the request shouldn't be sent at all"""
+        budgets = self.get_payload_budgets()
+        budget = budgets.get(endpoint) or budgets.get("*")
+        if not budget or request_bytes <= budget[0]:
+            return None
+        max_bytes, hard_limit = budget
+        msg = f"Request to {endpoint} is {request_bytes} bytes, over its budget of {max_bytes} bytes"
+        self.get_logger().warning(msg, extra={"req-id": str(req_id)})
+        if hard_limit:
+            return ApiResponse(
+                413,
+                msg,
+                None,
+                session_id=self.get_session_id(),
+                req_id=str(req_id) if req_id else None,
+            )
+        return None
+
+    def get_slow_call_threshold(self) -> Optional[float]:
+        if not hasattr(self, "slow_call_seconds"):
+            self.slow_call_seconds = None
+        return self.slow_call_seconds
+
+    def set_slow_call_threshold(self, seconds: Optional[float]) -> None:
+        """Logs a warning, with how long connecting, waiting for the first byte and
+        reading the body each took, for every call that takes longer than `seconds`.
+        `None` turns it off. See [set_slow_call_capture](#set_slow_call_capture) to
+        also keep a sample of the slow requests and responses."""
+        self.slow_call_seconds = seconds
+
+    def _log_if_slow(
+        self,
+        req: PreparedRequest,
+        resp: Optional[Response],
+        endpoint: str,
+        timings: Dict[str, float],
+        req_id: Union[UUID, str, None],
+    ) -> None:
+        threshold = self.get_slow_call_threshold()
+        if threshold is None or timings["total"] < threshold:
+            return
+        self.get_logger().warning(
+            f"Slow call: {req.method} on {endpoint} took {timings['total']:.2f}s "
+            f"(connect {timings.get('connect', 0.0):.2f}s, "
+            f"first byte {timings.get('ttfb', 0.0):.2f}s, "
+            f"body {timings.get('body', 0.0):.2f}s)",
+            extra={"req-id": str(req_id)},
+        )
+        capture = get_slow_call_capture()
+        if capture is not None:
+            try:
+                capture.capture(req, resp, endpoint=endpoint, timings=timings)
+            except Exception as ex:
+                self.get_logger().warning(f"Couldn't save the slow call: {ex}")
+
+    def batch(self, max_workers: int = 4) -> Batch:
+        """Returns a [Batch](#Batch), to make several independent calls at once.
+
+        Args:
+          max_workers: the most calls that will be in flight at the same time
+        """
+        return Batch(self, max_workers)
+
+    def flow(self, name: str, **attributes: Any) -> ContextManager[Span]:
+        """A span that every call made inside the `with` block is nested under, to tie
+        together all of the calls made for one interview page or action.
+
+        ```
+        with proxy_conn.flow("review screen", court_id=court_id):
+            proxy_conn.check_filing(...)
+            proxy_conn.calculate_filing_fees(...)
+        ```
+        """
+        return span(name, kind="flow", session_id=self.get_session_id(), **attributes)
+
+    def get_local_code_search(self) -> bool:
+        if not hasattr(self, "local_code_search"):
+            self.local_code_search = False
+        return self.local_code_search
+
+    def set_local_code_search(self, enabled: bool) -> None:
+        """Whether the `search_*` methods (like [search_case_types](#search_case_types))
+        answer from an index of all of the names, refreshed from the proxy twice a day,
+        instead of asking the proxy for each search. Off by default.
+
+        The index is made from what the proxy returns for an empty search, which is
+        assumed to be every name. Results can be ordered differently than the proxy's,
+        and also include names with a typo in one of the searched words."""
+        self.local_code_search = enabled
+
+    def get_transport(self) -> Transport:
+        """What sends requests to the proxy: a [RequestsTransport](#RequestsTransport)
+        with the `proxy_client` session, unless another [Transport](#Transport) was set.
+        """
+        transport = self.__dict__.get("_transport")
+        if transport is None:
+            return RequestsTransport(self.proxy_client)
+        return transport
+
+    def set_transport(self, transport: Optional[Transport]) -> None:
+        """Sends requests with `transport` instead of the `proxy_client` session, until
+        it's set back to `None`. Not saved when the connection is pickled."""
+        self._transport = transport
+
+    @contextmanager
+    def use_cassette(
+        self, path: str, *, record: bool = False, timing_scale: float = 0.0
+    ) -> Iterator[Union[CassetteRecorder, CassettePlayer]]:
+        """Records the calls made in the `with` block to a cassette file, or answers
+        them from one without calling the proxy. See [cassette](#cassette).
+
+        Args:
+          record: call the proxy, and save the masked requests and responses to `path`
+          timing_scale: when playing, wait this many times as long as the proxy took
+        """
+        previous = self.__dict__.get("_transport")
+        transport: Union[CassetteRecorder, CassettePlayer]
+        if record:
+            transport = CassetteRecorder(path, self.get_transport())
+        else:
+            transport = CassettePlayer(path, timing_scale=timing_scale)
+        self.set_transport(transport)
+        try:
+            yield transport
+        finally:
+            self.set_transport(previous)
+            if isinstance(transport, CassetteRecorder):
+                transport.save()
+
+    def _thread_context(self) -> Callable[[], None]:
+        """Called on the thread that runs a batch. Returns a function that sets up
+        each of the batch's worker threads."""
+        return lambda: None
+
+    def _on_unauthorized(self) -> None:
+        """Called on the thread that ran a batch if any of its calls got a 401"""
+        pass
 
     def get_session_id(self):
         if not hasattr(self, "session_id"):
@@ -202,6 +1134,40 @@ class EfspConnection:
             )
         return self.logger
 
+    def _make_token_manager(self) -> TokenManager:
+        return TokenManager(self)
+
+    def get_token_manager(self) -> TokenManager:
+        """The [TokenManager](#TokenManager) that saves and reuses this connection's Tyler tokens"""
+        if not hasattr(self, "token_manager"):
+            self.token_manager = self._make_token_manager()
+        return self.token_manager
+
+    def get_config_token_manager(self) -> TokenManager:
+        """A [TokenManager](#TokenManager) for logging in with the server's own configured
+        credentials, not the user's. Its tokens are kept apart from the user's own, and
+        shared with every connection to the same proxy in this process, so `ensure()`
+        only logs in again when the server's token is missing or about to expire."""
+        return TokenManager(
+            self,
+            _config_tokens,
+            lifetime=self.get_token_manager().lifetime,
+            refresh=self._config_login,
+            key_prefix=f"EFSP-CONFIG-{self.base_url}-",
+        )
+
+    def _config_login(self) -> ApiResponse:
+        resp = self.authenticate_user()
+        if resp.is_ok() and resp.data and resp.data.get("tokens"):
+            self.get_config_token_manager().save(resp.data["tokens"])
+        return resp
+
+    def get_court_info_store(self) -> CourtInfoStore:
+        """The [CourtInfoStore](#CourtInfoStore) that holds what this connection knows about each court"""
+        if not hasattr(self, "court_info_store"):
+            self.court_info_store = CourtInfoStore(self.get_court)
+        return self.court_info_store
+
     @staticmethod
     def verbose_logging(turn_on: bool) -> None:
         if turn_on:
@@ -270,15 +1236,22 @@ class EfspConnection:
                 "password": tyler_password,
             }
         try:
-            resp = self.proxy_client.post(
-                self.base_url + "authenticate",
-                json=auth_obj,
-                headers={"efsp-request-id": str(req_id)},
+            resp = self._timed_send(
+                self.proxy_client.prepare_request(
+                    Request(
+                        "POST",
+                        self.base_url + "authenticate",
+                        json=auth_obj,
+                        headers={"efsp-request-id": str(req_id)},
+                    )
+                )
             )
             if resp.status_code == requests.codes.ok:
                 all_tokens = resp.json().get("tokens", {})
                 for k, v in all_tokens.items():
                     self.proxy_client.headers[k] = v
+                if all_tokens:
+                    self.get_token_manager().save(all_tokens)
                 # self.authed_user_id = data['userID']
         except requests.ConnectionError as ex:
             return _user_visible_resp(
@@ -755,6 +1728,108 @@ class EfspConnection:
         req = Request("GET", url, params=params)
         return self._send(req)
 
+    def iter_filing_list_range(
+        self,
+        court_id: str,
+        start_date: datetime,
+        before_date: datetime,
+        user_id: str = None,
+        *,
+        window: Any = timedelta(days=31),
+        max_workers: int = 4,
+    ) -> Iterator[ApiResponse]:
+        """Gets the filings from `start_date` to before `before_date` a window of dates
+        at a time, with up to `max_workers` windows being fetched at once. Yields each
+        window's response as soon as it comes back, newest window first when they come
+        back together. Filings already yielded from an earlier window are left out of
+        the later ones.
+
+        Args:
+          window: how many dates to ask for in each call, as a `timedelta` or a
+              `relativedelta` (like `date_interval(months=1)` in an interview)
+        """
+        windows = date_windows(start_date, before_date, window)
+        batch = self.batch(max_workers)
+        # Submitted newest first, so with fewer workers than windows, recent filings
+        # come back first
+        for window_start, window_before in reversed(windows):
+            batch.get_filing_list(court_id, user_id, window_start, window_before)
+        seen: Set[str] = set()
+        for future in batch.as_completed():
+            resp = future.result()
+            if resp.is_ok() and isinstance(resp.data, list):
+                new_filings = []
+                for filing in resp.data:
+                    found_id = (
+                        get_filing_id(filing) if isinstance(filing, dict) else None
+                    )
+                    if found_id is not None:
+                        if found_id in seen:
+                            continue
+                        seen.add(found_id)
+                    new_filings.append(filing)
+                resp.data = new_filings
+            yield resp
+
+    def get_filing_list_range(
+        self,
+        court_id: str,
+        start_date: datetime,
+        before_date: datetime,
+        user_id: str = None,
+        *,
+        window: Any = timedelta(days=31),
+        max_workers: int = 4,
+    ) -> ApiResponse:
+        """Like [get_filing_list](#get_filing_list), but the dates are split into windows
+        that are fetched concurrently (see
+        [iter_filing_list_range](#iter_filing_list_range)), so long ranges take about as
+        long as one window. If any window fails, returns that window's response."""
+        merged: List[Any] = []
+        last_resp = None
+        for resp in self.iter_filing_list_range(
+            court_id,
+            start_date,
+            before_date,
+            user_id,
+            window=window,
+            max_workers=max_workers,
+        ):
+            if not resp.is_ok():
+                return resp
+            merged.extend(resp.data or [])
+            last_resp = resp
+        if last_resp is None:
+            return ApiResponse(200, None, [])
+        last_resp.data = merged
+        return last_resp
+
+    def get_filing_pages(
+        self,
+        court_id: str,
+        user_id: str = None,
+        start_date: datetime = None,
+        before_date: datetime = None,
+        window: Any = None,
+    ) -> ApiResponse:
+        """Like [get_filing_list](#get_filing_list), but the response's `data` is a
+        [FilingPages](#FilingPages) of the filings, newest first, if the call worked.
+        Every filing in the dates is still fetched; the pages are made from them after.
+
+        Args:
+          window: if given with both dates, the filings are fetched with
+              [get_filing_list_range](#get_filing_list_range) in windows this long
+        """
+        if window is not None and start_date and before_date:
+            resp = self.get_filing_list_range(
+                court_id, start_date, before_date, user_id, window=window
+            )
+        else:
+            resp = self.get_filing_list(court_id, user_id, start_date, before_date)
+        if resp.is_ok():
+            resp.data = FilingPages(resp.data)
+        return resp
+
     def get_filing(self, court_id: str, filing_id: str) -> ApiResponse:
         url = self.full_url(f"filingreview/courts/{court_id}/filings/{filing_id}")
         return self._send(Request("GET", url))
@@ -785,8 +1860,8 @@ class EfspConnection:
 
     def get_service_types(self, court_id: str, all_vars: dict = None) -> ApiResponse:
         """Checks the court info: if it has conditional service types, call a special API with all filing info so far to get service types"""
-        court_info = self.get_court(court_id)
-        if court_info.data.get("hasconditionalservicetypes") and all_vars:
+        court_info = self.get_court_info_store()
+        if court_info.has_conditional_service_types(court_id) and all_vars:
             url = self.full_url(f"filingreview/courts/{court_id}/filing/servicetypes")
             req = Request("GET", url, json=all_vars)
             return self._send(req)
@@ -908,9 +1983,37 @@ class EfspConnection:
         return self._send(Request("GET", url))
 
     def search_case_categories(self, search_term: Optional[str] = None) -> ApiResponse:
-        params = {"search": search_term}
-        url = self.full_url(f"codes/categories")
-        return self._send(Request("GET", url, params=params))
+        return self._search_codes("categories", search_term)
+
+    def _search_codes(self, codes: str, search_term: Optional[str]) -> ApiResponse:
+        """Searches the names of one type of code in the default jurisdiction. Answers
+        from a local [CodeSearchIndex](#CodeSearchIndex) if it's on and the proxy can
+        list all of the names, otherwise from the proxy."""
+        url = self.full_url(f"codes/{codes}")
+        if search_term and self.get_local_code_search():
+            index = get_code_search_store().get(url, lambda: self._all_code_names(url))
+            if index is not None:
+                with span("code_search", codes=codes, session_id=self.get_session_id()):
+                    return ApiResponse(
+                        200,
+                        None,
+                        index.search(search_term),
+                        session_id=self.get_session_id(),
+                    )
+        return self._send(Request("GET", url, params={"search": search_term}))
+
+    def refresh_cached_code(self, key: str) -> ApiResponse:
+        """Gets a code response again for the code cache, by its
+        [code_cache_key](#code_cache_key)"""
+        return self._send(Request("GET", self.base_url + key), refresh_cache=True)
+
+    def _all_code_names(self, url: str) -> Optional[List[str]]:
+        """Every name from a code search endpoint, which an empty search returns.
+        None if the proxy's answer isn't a list of names."""
+        resp = self._send(Request("GET", url, params={"search": ""}))
+        if not resp.is_ok() or not isinstance(resp.data, list):
+            return None
+        return [name for name in resp.data if isinstance(name, str)]
 
     def retrieve_case_categories(
         self, retrieve_name: Optional[str] = None
@@ -930,9 +2033,7 @@ class EfspConnection:
         return self._send(Request("GET", url))
 
     def search_case_types(self, search_term: Optional[str] = None) -> ApiResponse:
-        params = {"search": search_term}
-        url = self.full_url(f"codes/case_types")
-        return self._send(Request("GET", url, params=params))
+        return self._search_codes("case_types", search_term)
 
     def retrieve_case_types(self, retrieve_name: Optional[str] = None) -> ApiResponse:
         url = self.full_url(f"codes/case_types/{retrieve_name}")
@@ -956,9 +2057,7 @@ class EfspConnection:
         return self._send(Request("GET", url))
 
     def search_filing_types(self, search_term: Optional[str] = None) -> ApiResponse:
-        params = {"search": search_term}
-        url = self.full_url(f"codes/filing_types")
-        return self._send(Request("GET", url, params=params))
+        return self._search_codes("filing_types", search_term)
 
     def retrieve_filing_types(self, retrieve_name: Optional[str] = None) -> ApiResponse:
         url = self.full_url(f"codes/filing_types/{retrieve_name}")
@@ -980,9 +2079,7 @@ class EfspConnection:
         return self._send(Request("GET", url))
 
     def search_party_types(self, search_term: Optional[str] = None) -> ApiResponse:
-        params = {"search": search_term}
-        url = self.full_url(f"codes/party_types")
-        return self._send(Request("GET", url, params=params))
+        return self._search_codes("party_types", search_term)
 
     def retrieve_party_types(self, retrieve_name: Optional[str] = None) -> ApiResponse:
         url = self.full_url(f"codes/party_types/{retrieve_name}")
@@ -1020,9 +2117,7 @@ class EfspConnection:
     def search_optional_services(
         self, search_term: Optional[str] = None
     ) -> ApiResponse:
-        params = {"search": search_term}
-        url = self.full_url(f"codes/optional_services")
-        return self._send(Request("GET", url, params=params))
+        return self._search_codes("optional_services", search_term)
 
     def retrieve_optional_services(
         self, retrieve_name: Optional[str] = None
@@ -0,0 +1,127 @@
+"""
+Removes passwords, tokens, and other private details from requests and responses, so
+they can be written somewhere for later debugging.
+"""
+
+import json
+import re
+from typing import Any, Mapping, Optional, Pattern, Union
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+__all__ = [
+    "REDACTED",
+    "SENSITIVE_KEYS",
+    "SENSITIVE_HEADERS",
+    "PII_KEYS",
+    "redact_value",
+    "mask_value",
+    "redact_headers",
+    "redact_url",
+    "redact_body",
+]
+
+REDACTED = "[REDACTED]"
+
+# Field names in request / response bodies and query params whose values are never kept
+SENSITIVE_KEYS: Pattern = re.compile(
+    r"pass(word)?|pwd|token|secret|api_?key|card_?number|cvv|ssn|social_?security|"
+    r"birth|dob|tax_?id|account_?number|routing|signature",
+    re.IGNORECASE,
+)
+
+# Field names that hold personal details about filers and parties. Tyler's names are
+# like `personGivenName`, `contactMailingAddress` and `caseTitleText`. Interview
+# variables (`all_vars`) keep names in docassemble's IndividualName, as
+# `{"name": {"first": ..., "last": ...}}`. The parts are matched rather than `name`
+# itself, which Tyler uses for element types (`EntityPerson`) and code names.
+PII_KEYS: Pattern = re.compile(
+    r"(given|sur|middle|first|last|full|maiden|person|organization|business|firm|party)_?name|"
+    r"e_?mail|phone|address|street|city|zip|postal|case_?title|case_?parties|"
+    r"(person|contact|user)_?id$|^(first|middle|last|suffix)$",
+    re.IGNORECASE,
+)
+
+# Headers that authenticate with the proxy or Tyler
+SENSITIVE_HEADERS: Pattern = re.compile(
+    r"^(tyler-.*|x-api-key|authorization|cookie|set-cookie|proxy-authorization)$",
+    re.IGNORECASE,
+)
+
+
+def redact_value(value: Any, keys: Pattern = SENSITIVE_KEYS) -> Any:
+    """Copies a JSON-like value, replacing the values of any sensitive keys"""
+    if isinstance(value, dict):
+        return {
+            k: REDACTED if keys.search(str(k)) else redact_value(v, keys)
+            for k, v in value.items()
+        }
+    if isinstance(value, list):
+        return [redact_value(v, keys) for v in value]
+    return value
+
+
+def mask_value(value: Any, keys: Pattern = SENSITIVE_KEYS, masked: bool = False) -> Any:
+    """Like [redact_value](#redact_value), but keeps the shape of the sensitive values:
+    only the strings and numbers inside of them are replaced, so code that reads them
+    still works"""
+    if isinstance(value, dict):
+        return {
+            k: mask_value(v, keys, masked or bool(keys.search(str(k))))
+            for k, v in value.items()
+        }
+    if isinstance(value, list):
+        return [mask_value(v, keys, masked) for v in value]
+    if not masked or value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return 0
+    return REDACTED
+
+
+def redact_headers(headers: Optional[Mapping[str, Any]]) -> dict:
+    if not headers:
+        return {}
+    return {
+        k: REDACTED if SENSITIVE_HEADERS.match(k) else v for k, v in headers.items()
+    }
+
+
+def redact_url(url: Optional[str], keys: Pattern = SENSITIVE_KEYS) -> Optional[str]:
+    """Replaces sensitive query params in a URL"""
+    if not url:
+        return url
+    parts = urlsplit(url)
+    if not parts.query:
+        return url
+    query = [
+        (k, REDACTED if keys.search(k) else v)
+        for k, v in parse_qsl(parts.query, keep_blank_values=True)
+    ]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def redact_body(
+    body: Union[str, bytes, None],
+    max_bytes: Optional[int] = None,
+    keys: Pattern = SENSITIVE_KEYS,
+) -> Optional[str]:
+    """Redacts a body if it's JSON, and cuts it down to `max_bytes`.
+
+    Bodies that aren't JSON can't be redacted safely, so only their length is kept.
+    """
+    if body is None:
+        return None
+    if isinstance(body, bytes):
+        try:
+            body = body.decode("utf-8")
+        except UnicodeDecodeError:
+            return f"<{len(body)} bytes of binary data>"
+    if not body:
+        return body
+    try:
+        text = json.dumps(redact_value(json.loads(body), keys))
+    except ValueError:
+        return f"<{len(body)} characters of non-JSON data>"
+    if max_bytes is not None and len(text) > max_bytes:
+        return text[:max_bytes] + f"... <{len(text) - max_bytes} more characters>"
+    return text
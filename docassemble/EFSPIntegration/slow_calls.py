@@ -0,0 +1,109 @@
+"""
+Keeps evidence of calls to the E-file proxy server that took too long.
+
+Connections log every call over their slow call threshold (see
+[EfspConnection.set_slow_call_threshold](#set_slow_call_threshold)). If a capture
+file is set with [set_slow_call_capture](#set_slow_call_capture), a sample of those
+calls are also written there, redacted, with the request and the start of the response.
+Names, addresses, and other personal details are redacted along with credentials.
+"""
+
+import json
+import logging
+import random
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+from typing import Any, Callable, Dict, Optional
+
+from requests import PreparedRequest, Response
+
+from .cassette import CASSETTE_KEYS
+from .redaction import redact_body, redact_headers, redact_url
+
+__all__ = ["SlowCallCapture", "set_slow_call_capture", "get_slow_call_capture"]
+
+
+class SlowCallCapture:
+    """Writes redacted copies of slow calls to a rotating file, one JSON object per line.
+
+    Args:
+      path: the file to write to. Rotated to `path.1`, `path.2`, ... when it's full
+      sample_rate: the fraction (0 to 1) of slow calls to write
+      max_body_bytes: the most of each request and response body to keep
+      max_file_bytes: how big the file gets before it's rotated
+      backup_count: how many rotated files to keep
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        sample_rate: float = 0.1,
+        max_body_bytes: int = 2048,
+        max_file_bytes: int = 5 * 1024 * 1024,
+        backup_count: int = 3,
+        rand: Callable[[], float] = random.random,
+    ):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.max_body_bytes = max_body_bytes
+        self._rand = rand
+        self._handler = RotatingFileHandler(
+            path, maxBytes=max_file_bytes, backupCount=backup_count, delay=True
+        )
+        self._handler.setFormatter(logging.Formatter("%(message)s"))
+        self._lock = threading.Lock()
+
+    def capture(
+        self,
+        req: PreparedRequest,
+        resp: Optional[Response],
+        *,
+        endpoint: str,
+        timings: Dict[str, float],
+    ) -> bool:
+        """Writes the call, if it's sampled. Returns True if it was written."""
+        if self._rand() >= self.sample_rate:
+            return False
+        record: Dict[str, Any] = {
+            "time": time.time(),
+            "endpoint": endpoint,
+            "method": req.method,
+            "url": redact_url(req.url, CASSETTE_KEYS),
+            "timings": timings,
+            "request": {
+                "headers": redact_headers(req.headers),
+                "body": redact_body(req.body, self.max_body_bytes, CASSETTE_KEYS),
+            },
+        }
+        if resp is not None:
+            record["response"] = {
+                "status": resp.status_code,
+                "headers": redact_headers(resp.headers),
+                "body": redact_body(resp.content, self.max_body_bytes, CASSETTE_KEYS),
+            }
+        line = json.dumps(record, default=str)
+        with self._lock:
+            self._handler.handle(logging.makeLogRecord({"msg": line}))
+        return True
+
+    def close(self) -> None:
+        self._handler.close()
+
+
+_capture: Optional[SlowCallCapture] = None
+
+
+def set_slow_call_capture(path: Optional[str], **kwargs) -> None:
+    """Starts writing sampled slow calls from every connection in this process to
+    `path`. `None` stops writing them. Takes the same keyword arguments as
+    [SlowCallCapture](#SlowCallCapture)."""
+    global _capture
+    if _capture is not None:
+        _capture.close()
+    _capture = SlowCallCapture(path, **kwargs) if path else None
+
+
+def get_slow_call_capture() -> Optional[SlowCallCapture]:
+    return _capture
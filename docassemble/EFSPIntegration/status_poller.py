@@ -0,0 +1,303 @@
+"""
+Checks the status of many filings with [get_filing_status](#get_filing_status), so
+pending filings can be followed without someone checking them one at a time.
+
+Each filing is checked often right after it's submitted, and less often the longer its
+status stays the same. Filings stop being checked once they reach a final status.
+
+A poller can run in a loop with [run](#run), or be saved to a file and checked once
+per run of a scheduled job with [poll_once](#poll_once):
+
+```
+poller = FilingStatusPoller.load(proxy_conn, "/tmp/pending_filings.json")
+poller.add("adams", filing_id)
+for event in poller.poll_once():
+    log(f"{event.filing_id} is now {event.new_status}")
+poller.save("/tmp/pending_filings.json")
+```
+"""
+
+import json
+import os
+import time
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+from .py_efsp_client import ApiResponse, EfspConnection
+
+__all__ = [
+    "TERMINAL_STATUSES",
+    "FilingStatusEvent",
+    "PolledFiling",
+    "FilingStatusPoller",
+    "filing_status_code",
+]
+
+# Tyler's filing statuses that a filing doesn't move on from
+TERMINAL_STATUSES: FrozenSet[str] = frozenset(
+    ["accepted", "rejected", "cancelled", "failed", "served"]
+)
+
+# (court id, filing id)
+FilingKey = Tuple[str, str]
+
+
+def filing_status_code(data: Any) -> Optional[str]:
+    """The lowercased status code from a [get_filing_status](#get_filing_status)
+    response's data, like "submitted" or "accepted". None if it isn't there"""
+    if not isinstance(data, dict):
+        return None
+    status = data.get("filingStatus", data)
+    if not isinstance(status, dict):
+        return None
+    code = status.get("filingStatusCode") or status.get("statusText")
+    if isinstance(code, dict):
+        code = code.get("value")
+    return str(code).lower() if code else None
+
+
+class FilingStatusEvent(NamedTuple):
+    court_id: str
+    filing_id: str
+    old_status: Optional[str]
+    """None the first time a filing's status is found"""
+    new_status: str
+    response: ApiResponse
+
+
+class PolledFiling:
+    """The last known status of one filing, and when to check it next"""
+
+    def __init__(
+        self,
+        court_id: str,
+        filing_id: str,
+        *,
+        status: Optional[str] = None,
+        submitted_at: float = 0.0,
+        interval: float = 0.0,
+        next_check: float = 0.0,
+        checks: int = 0,
+        failures: int = 0,
+    ):
+        self.court_id = court_id
+        self.filing_id = filing_id
+        self.status = status
+        self.submitted_at = submitted_at
+        self.interval = interval
+        self.next_check = next_check
+        self.checks = checks
+        self.failures = failures
+
+    @property
+    def key(self) -> FilingKey:
+        return (self.court_id, self.filing_id)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.__dict__)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PolledFiling":
+        return cls(data.pop("court_id"), data.pop("filing_id"), **data)
+
+
+class FilingStatusPoller:
+    """Checks the status of many filings, a few at a time.
+
+    Args:
+      conn: the connection to check with. It needs to already be logged in to Tyler
+      on_change: called with a [FilingStatusEvent](#FilingStatusEvent) each time a
+          filing's status changes, on the thread that's polling
+      max_workers: the most status checks in flight at the same time
+      min_interval: seconds between checks of a filing whose status just changed
+      max_interval: the most seconds between checks of a filing
+      backoff: how much longer to wait after each check that finds the same status
+      age_fraction: an unchanged filing also waits at least this fraction of the time
+          since it was submitted, so old filings aren't checked as often as new ones
+      terminal_statuses: statuses that stop a filing from being checked again
+      clock: returns the current time in seconds; `time.time` by default
+    """
+
+    def __init__(
+        self,
+        conn: EfspConnection,
+        on_change: Optional[Callable[[FilingStatusEvent], None]] = None,
+        *,
+        max_workers: int = 4,
+        min_interval: float = 60.0,
+        max_interval: float = 60.0 * 60,
+        backoff: float = 2.0,
+        age_fraction: float = 0.1,
+        terminal_statuses: Iterable[str] = TERMINAL_STATUSES,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.conn = conn
+        self.on_change = on_change
+        self.max_workers = max_workers
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.backoff = max(1.0, backoff)
+        self.age_fraction = age_fraction
+        self.terminal_statuses = frozenset(s.lower() for s in terminal_statuses)
+        self.clock = clock
+        self.filings: Dict[FilingKey, PolledFiling] = {}
+
+    def add(
+        self,
+        court_id: str,
+        filing_id: str,
+        *,
+        submitted_at: Optional[float] = None,
+        status: Optional[str] = None,
+    ) -> PolledFiling:
+        """Starts following a filing, checking it right away. Filings already being
+        followed are left as they are."""
+        key = (court_id, filing_id)
+        if key not in self.filings:
+            now = self.clock()
+            self.filings[key] = PolledFiling(
+                court_id,
+                filing_id,
+                status=status.lower() if status else None,
+                submitted_at=now if submitted_at is None else submitted_at,
+                next_check=now,
+            )
+        return self.filings[key]
+
+    def remove(self, court_id: str, filing_id: str) -> None:
+        self.filings.pop((court_id, filing_id), None)
+
+    def pending(self) -> List[PolledFiling]:
+        """The filings that haven't reached a final status"""
+        return [f for f in self.filings.values() if not self.is_done(f)]
+
+    def is_done(self, filing: PolledFiling) -> bool:
+        return filing.status in self.terminal_statuses
+
+    def due(self, now: Optional[float] = None) -> List[PolledFiling]:
+        """The pending filings that should be checked now, the most overdue first"""
+        now = self.clock() if now is None else now
+        return sorted(
+            (f for f in self.pending() if f.next_check <= now),
+            key=lambda f: f.next_check,
+        )
+
+    def next_check_in(self) -> Optional[float]:
+        """Seconds until the next pending filing should be checked. None if there
+        aren't any"""
+        pending = self.pending()
+        if not pending:
+            return None
+        return max(0.0, min(f.next_check for f in pending) - self.clock())
+
+    def _next_interval(self, filing: PolledFiling, changed: bool, now: float) -> float:
+        if changed:
+            return self.min_interval
+        interval = max(
+            self.min_interval,
+            filing.interval * self.backoff,
+            (now - filing.submitted_at) * self.age_fraction,
+        )
+        return min(self.max_interval, interval)
+
+    def _record(
+        self, filing: PolledFiling, resp: ApiResponse, now: float
+    ) -> Optional[FilingStatusEvent]:
+        filing.checks += 1
+        new_status = filing_status_code(resp.data) if resp.is_ok() else None
+        if new_status is None:
+            # Errors back off like an unchanged status does
+            filing.failures += 1
+            filing.interval = self._next_interval(filing, False, now)
+            filing.next_check = now + filing.interval
+            return None
+        changed = new_status != filing.status
+        event = None
+        if changed:
+            event = FilingStatusEvent(
+                filing.court_id, filing.filing_id, filing.status, new_status, resp
+            )
+            filing.status = new_status
+        filing.failures = 0
+        filing.interval = self._next_interval(filing, changed, now)
+        filing.next_check = now + filing.interval
+        return event
+
+    def poll_once(self, limit: Optional[int] = None) -> List[FilingStatusEvent]:
+        """Checks every filing that's due (at most `limit` of them), once, and returns
+        the status changes. Doesn't wait for filings that aren't due yet, so it can be
+        called from a scheduled job."""
+        due = self.due()[:limit]
+        if not due:
+            return []
+        batch = self.conn.batch(self.max_workers)
+        futures = {
+            batch.get_filing_status(filing.court_id, filing.filing_id): filing
+            for filing in due
+        }
+        events = []
+        for future in batch.as_completed():
+            filing = futures[future]
+            try:
+                resp = future.result()
+            except Exception as ex:
+                resp = ApiResponse(-1, str(ex), None)
+            event = self._record(filing, resp, self.clock())
+            if event:
+                events.append(event)
+                if self.on_change:
+                    self.on_change(event)
+        return events
+
+    def run(
+        self,
+        *,
+        timeout: Optional[float] = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> List[FilingStatusEvent]:
+        """Keeps checking until every filing reaches a final status, or `timeout`
+        seconds pass. Returns all of the status changes."""
+        deadline = None if timeout is None else self.clock() + timeout
+        events = []
+        while True:
+            events.extend(self.poll_once())
+            wait = self.next_check_in()
+            if wait is None:
+                return events
+            if deadline is not None:
+                if self.clock() + wait > deadline:
+                    return events
+            sleep(wait)
+
+    def save(self, path: str) -> None:
+        """Writes the followed filings to a JSON file, for the next [load](#load)"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump([filing.to_dict() for filing in self.filings.values()], f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(
+        cls, conn: EfspConnection, path: str, **kwargs: Any
+    ) -> "FilingStatusPoller":
+        """A poller following the filings saved at `path`, if there are any. Takes the
+        same keyword arguments as the constructor."""
+        poller = cls(conn, **kwargs)
+        try:
+            with open(path) as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            saved = []
+        for data in saved:
+            filing = PolledFiling.from_dict(data)
+            poller.filings[filing.key] = filing
+        return poller
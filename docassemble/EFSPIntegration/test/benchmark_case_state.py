@@ -0,0 +1,136 @@
+# do not pre-load
+
+"""
+Measures how much a party name search adds to the interview's saved state, with a
+real Peoria case (in `temp2.json`) copied as many times as there are results:
+
+```
+python -m docassemble.EFSPIntegration.test.benchmark_case_state --cases 100
+```
+
+* `raw`: what each found case used to keep: the search result's JSON, and the full
+  case details for the first few, whose details were fetched
+* `compact`: the same cases as [CaseSummary](case_model#CaseSummary)s, like
+  [parse_found_case](conversions#parse_found_case) keeps them. No one has opened
+  them, so the fetched cases keep the raw JSON of their parties
+* `parties read`: the same, after each fetched case's parties were read, which saves
+  just the parties. This is what `compact` would be if the parties were read up front,
+  and what it is for a case once someone opens it
+
+It also times reading the found cases, with and without reading their parties, which
+is the time that keeping the raw JSON saves.
+
+Both leave out the `DAObject` that each found case is kept in, which is the same
+either way; the old participant and attorney `ALIndividual`s would have made `raw`
+bigger still.
+"""
+
+import argparse
+import copy
+import json
+import pickle
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..case_model import CaseSummary, add_case_details, parse_case_entry
+
+__all__ = ["load_search_results", "run_benchmarks", "format_report"]
+
+FIXTURE_DIR = Path(__file__).parent
+
+# How many results have their details fetched up front (`num_case_choices()`)
+FETCHED = 8
+
+_HEADER = ["court_id", "title", "tracking_id", "docket_number", "category"]
+
+
+def load_search_results(cases: int) -> List[Tuple[Dict, Dict]]:
+    """`cases` different copies of one case's (search result, details)"""
+    with open(FIXTURE_DIR / "temp2.json") as f:
+        case = json.load(f)["selected_existing_case"]
+    results = []
+    for idx in range(cases):
+        entry = copy.deepcopy(case["details"])
+        entry["value"]["caseTrackingID"]["value"] = f"case-{idx}"
+        results.append((entry, copy.deepcopy(case["case_details"])))
+    return results
+
+
+def raw_state(results: List[Tuple[Dict, Dict]]) -> List[Dict[str, Any]]:
+    state = []
+    for idx, (entry, details) in enumerate(results):
+        summary = parse_case_entry(entry, "peoria")
+        found: Dict[str, Any] = {attr: getattr(summary, attr) for attr in _HEADER}
+        found["details"] = entry
+        if idx < FETCHED:
+            found["case_details"] = details
+        state.append(found)
+    return state
+
+
+def compact_state(
+    results: List[Tuple[Dict, Dict]], *, parties: bool = False
+) -> List[Dict[str, Any]]:
+    state = []
+    for idx, (entry, details) in enumerate(results):
+        summary = parse_case_entry(entry, "peoria")
+        if idx < FETCHED:
+            add_case_details(summary, details)
+            if parties:
+                summary.participants
+        found: Dict[str, Any] = {attr: getattr(summary, attr) for attr in _HEADER}
+        found["case_summary"] = summary
+        state.append(found)
+    return state
+
+
+def run_benchmarks(*, cases: int = 100) -> Dict[str, Any]:
+    results = load_search_results(cases)
+    start = time.perf_counter()
+    compact = compact_state(results)
+    header_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    with_parties = compact_state(results, parties=True)
+    parties_seconds = time.perf_counter() - start
+    return {
+        "cases": cases,
+        "fetched": min(cases, FETCHED),
+        "raw_bytes": len(pickle.dumps(raw_state(results))),
+        "compact_bytes": len(pickle.dumps(compact)),
+        "parties_read_bytes": len(pickle.dumps(with_parties)),
+        "header_seconds": header_seconds,
+        "parties_seconds": parties_seconds,
+    }
+
+
+def format_report(results: Dict[str, Any]) -> str:
+    return "\n".join(
+        [
+            f"{results['cases']} found cases ({results['fetched']} with details), "
+            "pickled:",
+            f"  raw           {results['raw_bytes'] / 1024:>10.1f} KiB",
+            f"  compact       {results['compact_bytes'] / 1024:>10.1f} KiB"
+            f"{results['raw_bytes'] / results['compact_bytes']:>8.1f}x smaller",
+            f"  parties read  {results['parties_read_bytes'] / 1024:>10.1f} KiB"
+            f"{results['raw_bytes'] / results['parties_read_bytes']:>8.1f}x smaller",
+            f"reading them took {results['header_seconds'] * 1000:.1f} ms, "
+            f"{results['parties_seconds'] * 1000:.1f} ms with their parties",
+        ]
+    )
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--cases", type=int, default=100)
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    parsed = parser.parse_args(args)
+    results = run_benchmarks(cases=parsed.cases)
+    if parsed.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(format_report(results))
+
+
+if __name__ == "__main__":
+    main()
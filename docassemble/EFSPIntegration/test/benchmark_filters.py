@@ -0,0 +1,148 @@
+# do not pre-load
+
+"""
+Times picking codes out of a real court's filing type list (Illinois, in
+`filing_types.json`) the way the interviews do, many filters against the same list:
+
+```
+python -m docassemble.EFSPIntegration.test.benchmark_filters --scale 5 --repeat 200
+```
+
+Compares the filters being re-made and every label being lowercased again for each
+filter (how `filter_codes` used to work) with [select_codes](#select_codes), both
+indexing the list again each time and on the same list again (where its index is
+reused).
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..code_filters import CodeIndex, CodeType, ContainAny, select_codes
+
+__all__ = ["FILTER_SETS", "load_filing_types", "run_benchmarks", "format_report"]
+
+FIXTURE_DIR = Path(__file__).parent
+
+# (filters, exclude) for some of the filings on one page, like the interviews' defaults
+FILTER_SETS: List[Tuple[List[Any], Any]] = [
+    (
+        ["Appearance"],
+        ContainAny(["Limited Scope", "Limited Entry-Local Counsel", "No Fee"]),
+    ),
+    (["Motion to Vacate", ContainAny(["vacate"])], None),
+    ([CodeType("143184")], None),
+    ([["Answer", "$2,500"], "Answer"], None),
+    (["Proof of Service", "Proof"], ContainAny(["Delivery"])),
+    (["Not a real filing type"], None),
+]
+
+
+def load_filing_types(scale: int = 1) -> List[Tuple[str, str]]:
+    """The Illinois filing types, repeated `scale` times with new codes, to act like a
+    court with more of them"""
+    with open(FIXTURE_DIR / "filing_types.json") as f:
+        options = [tuple(opt) for opt in json.load(f)]
+    return [
+        (f"{code}{copy or ''}", name) for copy in range(scale) for code, name in options
+    ]
+
+
+def _legacy_filter(search: Any) -> Callable[[Any], bool]:
+    if not search:
+        return lambda opt: False
+    if callable(search):
+        return search
+    if isinstance(search, CodeType):
+        return lambda opt: opt[0] == search
+    if isinstance(search, str):
+        return lambda opt: (opt[1] or "").lower().strip() == search.lower().strip()
+    if isinstance(search, ContainAny):
+        return lambda opt: any(
+            [item.lower() in (opt[1] or "").lower() for item in search]
+        )
+    return lambda opt: all([item.lower() in (opt[1] or "").lower() for item in search])
+
+
+def legacy_select(options: List[Any], filters: List[Any], exclude: Any) -> List[Any]:
+    """How `filter_codes` picked codes before `code_filters`, for comparison"""
+    filter_fns = [_legacy_filter(search) for search in filters] + [
+        (lambda opt, s=search: s.lower() in (opt[1] or "").lower())
+        for search in filters
+        if isinstance(search, str) and not isinstance(search, CodeType)
+    ]
+    exclude_fn = _legacy_filter(exclude)
+    codes: List[Any] = []
+    for filter_fn in filter_fns:
+        if codes:
+            break
+        codes = [
+            opt
+            for opt in options
+            if filter_fn(opt) and (not exclude or not exclude_fn(opt))
+        ]
+    return sorted(codes, key=lambda option: option[1] + str(option[0]))
+
+
+def _time_page(select: Callable, options: Callable[[], Any], repeat: int) -> float:
+    """Seconds for filtering every filter set against the same list, per page"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        page_options = options()
+        for filters, exclude in FILTER_SETS:
+            select(page_options, filters, exclude)
+    return (time.perf_counter() - start) / repeat
+
+
+def run_benchmarks(*, scale: int = 1, repeat: int = 100) -> Dict[str, Any]:
+    options = load_filing_types(scale)
+    for filters, exclude in FILTER_SETS:
+        assert legacy_select(options, filters, exclude) == select_codes(
+            options, filters, exclude
+        ), filters
+    return {
+        "options": len(options),
+        "filter_sets": len(FILTER_SETS),
+        "legacy_seconds": _time_page(legacy_select, lambda: options, repeat),
+        "new_list_seconds": _time_page(
+            select_codes, lambda: CodeIndex(options), repeat
+        ),
+        "same_list_seconds": _time_page(select_codes, lambda: options, repeat),
+    }
+
+
+def format_report(results: Dict[str, Any]) -> str:
+    legacy = results["legacy_seconds"]
+    lines = [
+        f"{results['filter_sets']} filter sets against {results['options']} options, "
+        "per page:"
+    ]
+    for label, key in [
+        ("re-made filters", "legacy_seconds"),
+        ("new index", "new_list_seconds"),
+        ("index, same list", "same_list_seconds"),
+    ]:
+        lines.append(
+            f"  {label:<18}{results[key] * 1000:>9.3f} ms"
+            f"{legacy / results[key]:>8.1f}x"
+        )
+    return "\n".join(lines)
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    parsed = parser.parse_args(args)
+    results = run_benchmarks(scale=parsed.scale, repeat=parsed.repeat)
+    if parsed.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(format_report(results))
+
+
+if __name__ == "__main__":
+    main()
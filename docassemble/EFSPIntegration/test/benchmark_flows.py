@@ -0,0 +1,140 @@
+# do not pre-load
+
+"""
+Times real flows of proxy calls through EfspConnection, against the local
+[MockProxyServer](#MockProxyServer).
+
+Run it with:
+
+```
+python -m docassemble.EFSPIntegration.test.benchmark_flows --latency 0.05 --jitter 0.02
+```
+
+Each flow mirrors the calls that an interview makes:
+
+* `court_codes`: loading a court's info and the codes for an initial filing
+* `search_case_by_name`: a party name search, then the full details of the first
+  cases (like `interview_logic.search_case_by_name`)
+* `review_preview`: the checks made before showing the review screen
+"""
+
+import argparse
+import json
+import statistics
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from ..py_efsp_client import EfspConnection
+from .mock_proxy_server import MockProxyServer, review_vars
+
+__all__ = ["FLOWS", "run_benchmarks", "format_report"]
+
+COURT = "adams"
+# Same as `interview_logic.num_case_choices`, which needs docassemble to import
+NUM_CASE_CHOICES = 8
+
+
+def court_codes(conn: EfspConnection) -> None:
+    conn.get_courts(fileable_only=True, with_names=True)
+    conn.get_court_info_store().get(COURT)
+    conn.get_case_categories(COURT, fileable_only=True, timing="Initial")
+    conn.get_case_types(COURT, "1000", timing="Initial")
+    conn.get_filing_types(COURT, "1000", "1000", True)
+    conn.get_party_types(COURT, "1000")
+    conn.get_filer_types(COURT)
+    conn.get_service_type_codes(COURT)
+    conn.get_optional_services(COURT, "1000")
+    conn.get_document_types(COURT, "1000")
+    conn.get_datafield(COURT, "GlobalPassword")
+
+
+def search_case_by_name(conn: EfspConnection) -> None:
+    resp = conn.get_cases_raw(
+        COURT, person_name={"first": "Brenda", "middle": None, "last": "Bart"}
+    )
+    for entry in list(reversed(resp.data or []))[:NUM_CASE_CHOICES]:
+        tracking_id = entry["value"]["caseTrackingID"]["value"]
+        conn.get_case(COURT, tracking_id)
+
+
+def review_preview(conn: EfspConnection) -> None:
+    all_vars = review_vars()
+    conn.check_filing(COURT, all_vars)
+    conn.get_service_types(COURT, all_vars)
+    conn.calculate_filing_fees(COURT, all_vars)
+
+
+FLOWS: Dict[str, Callable[[EfspConnection], None]] = {
+    "court_codes": court_codes,
+    "search_case_by_name": search_case_by_name,
+    "review_preview": review_preview,
+}
+
+
+def run_benchmarks(
+    server: MockProxyServer,
+    *,
+    repeat: int = 5,
+    flows: Optional[List[str]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """Runs each flow `repeat` times, each time with a new connection (like a new
+    interview session). Returns each flow's wall times and the calls it made."""
+    results: Dict[str, Dict[str, Any]] = {}
+    for name in flows or list(FLOWS):
+        flow = FLOWS[name]
+        times: List[float] = []
+        calls: Dict[str, int] = {}
+        for _ in range(repeat):
+            conn = EfspConnection(
+                url=server.url, api_key="benchmark", default_jurisdiction="illinois"
+            )
+            conn.authenticate_user()
+            server.reset_counts()
+            start = time.perf_counter()
+            flow(conn)
+            times.append(time.perf_counter() - start)
+            calls = dict(server.call_counts)
+            conn.proxy_client.close()
+        results[name] = {
+            "runs": repeat,
+            "calls": sum(calls.values()),
+            "calls_by_endpoint": calls,
+            "min_seconds": min(times),
+            "median_seconds": statistics.median(times),
+            "max_seconds": max(times),
+        }
+    return results
+
+
+def format_report(results: Dict[str, Dict[str, Any]]) -> str:
+    lines = [
+        f"{'flow':<22}{'calls':>6}{'min (s)':>10}{'median (s)':>12}{'max (s)':>10}"
+    ]
+    for name, result in results.items():
+        lines.append(
+            f"{name:<22}{result['calls']:>6}{result['min_seconds']:>10.3f}"
+            f"{result['median_seconds']:>12.3f}{result['max_seconds']:>10.3f}"
+        )
+    return "\n".join(lines)
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--flow", action="append", choices=list(FLOWS))
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    parsed = parser.parse_args(args)
+    with MockProxyServer(
+        latency=parsed.latency, jitter=parsed.jitter, seed=0
+    ) as server:
+        results = run_benchmarks(server, repeat=parsed.repeat, flows=parsed.flow)
+    if parsed.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(format_report(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# do not pre-load
+
+"""
+Measures how long importing this package's modules takes in a fresh interpreter, with
+`python -X importtime`, and checks that none of them load the dependencies that are
+only needed once something is filed:
+
+```
+python -m docassemble.EFSPIntegration.test.benchmark_imports --repeat 5
+python -m docassemble.EFSPIntegration.test.benchmark_imports --check
+```
+
+`--check` exits with an error if a module loads one of `LAZY_MODULES`. Modules that
+can't be imported (like `efm_client` without docassemble installed) are skipped.
+"""
+
+import argparse
+import json
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+__all__ = [
+    "MODULES",
+    "LAZY_MODULES",
+    "import_times",
+    "run_benchmarks",
+    "format_report",
+]
+
+PACKAGE_ROOT = Path(__file__).parents[3]
+
+MODULES = [
+    "docassemble.EFSPIntegration.us_states",
+    "docassemble.EFSPIntegration.py_efsp_client",
+    "docassemble.EFSPIntegration.efm_client",
+    "docassemble.EFSPIntegration.conversions",
+]
+
+# Only imported when they're used
+LAZY_MODULES = ["pycountry", "dateutil.parser"]
+
+_IMPORT_TIME = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def import_times(module: str) -> Optional[Dict[str, Tuple[int, int]]]:
+    """The (self, cumulative) microseconds of every module loaded by importing `module`
+    in a new interpreter. None if it can't be imported."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PACKAGE_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        return None
+    times: Dict[str, Tuple[int, int]] = {}
+    for line in result.stderr.splitlines():
+        match = _IMPORT_TIME.match(line)
+        if match:
+            times[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+    return times
+
+
+def run_benchmarks(
+    modules: Optional[List[str]] = None, *, repeat: int = 3
+) -> Dict[str, Any]:
+    """The fastest of `repeat` imports of each module, with what it loaded that it
+    shouldn't have"""
+    results: Dict[str, Any] = {}
+    for module in modules or MODULES:
+        runs = [import_times(module) for _ in range(repeat)]
+        loaded = [times for times in runs if times is not None]
+        if not loaded:
+            results[module] = None
+            continue
+        results[module] = {
+            "seconds": min(times[module][1] for times in loaded) / 1_000_000,
+            "modules_loaded": len(loaded[0]),
+            "eager": [name for name in LAZY_MODULES if name in loaded[0]],
+        }
+    return results
+
+
+def format_report(results: Dict[str, Any]) -> str:
+    lines = []
+    for module, result in results.items():
+        name = module.rsplit(".", 1)[-1]
+        if result is None:
+            lines.append(f"  {name:<16}    can't be imported")
+            continue
+        lines.append(
+            f"  {name:<16}{result['seconds'] * 1000:>9.1f} ms"
+            f"{result['modules_loaded']:>6} modules"
+            + (f"  loads {', '.join(result['eager'])}" if result["eager"] else "")
+        )
+    return "\n".join(lines)
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("modules", nargs="*", help=f"defaults to {MODULES}")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    parser.add_argument(
+        "--check", action="store_true", help="fail if a lazy module is imported"
+    )
+    parsed = parser.parse_args(args)
+    results = run_benchmarks(parsed.modules, repeat=parsed.repeat)
+    if parsed.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(format_report(results))
+    eager = {
+        module: result["eager"]
+        for module, result in results.items()
+        if result and result["eager"]
+    }
+    if parsed.check and eager:
+        sys.exit(f"Imported too early: {eager}")
+
+
+if __name__ == "__main__":
+    main()
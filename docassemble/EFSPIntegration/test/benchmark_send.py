@@ -0,0 +1,137 @@
+# do not pre-load
+
+"""
+Measures how much time EfspConnection itself adds to each call, with a
+[FakeTransport](#FakeTransport) in place of the network:
+
+```
+python -m docassemble.EFSPIntegration.test.benchmark_send --iterations 2000
+```
+
+* `transport_only`: the fake transport on its own, as a baseline
+* `send`: a full call (`get_court`), i.e. building the request, timing, tracing,
+  metrics and making the `ApiResponse`
+* `cached_court_info`: a court's info from the [CourtInfoStore](#CourtInfoStore)
+* `retry_after_401`: a call that gets a 401, re-authenticates and is sent again
+"""
+
+import argparse
+import json
+import time
+from typing import Callable, Dict, List, Optional
+
+from requests import Request
+
+from ..py_efsp_client import EfspConnection
+from ..transports import FakeTransport
+from .mock_proxy_server import default_fixtures
+
+__all__ = ["BENCHMARKS", "run_benchmarks", "format_report"]
+
+COURT = "adams"
+
+
+def _connection(transport: FakeTransport) -> EfspConnection:
+    conn = EfspConnection(
+        url="http://fake-proxy/",
+        api_key="benchmark",
+        default_jurisdiction="illinois",
+        transport=transport,
+    )
+    conn.authenticate_user()
+    return conn
+
+
+def transport_only(iterations: int) -> None:
+    transport = FakeTransport(default_fixtures())
+    conn = _connection(transport)
+    prepared = conn.proxy_client.prepare_request(
+        Request(
+            "GET", f"{conn.base_url}jurisdictions/illinois/codes/courts/{COURT}/codes"
+        )
+    )
+    for _ in range(iterations):
+        transport.send(prepared).content
+
+
+def send(iterations: int) -> None:
+    conn = _connection(FakeTransport(default_fixtures()))
+    for _ in range(iterations):
+        conn.get_court(COURT)
+
+
+def cached_court_info(iterations: int) -> None:
+    conn = _connection(FakeTransport(default_fixtures()))
+    store = conn.get_court_info_store()
+    for _ in range(iterations):
+        store.get(COURT)
+
+
+def retry_after_401(iterations: int) -> None:
+    fixtures = default_fixtures()
+    court = fixtures["GET codes/courts/{court}/codes"]
+    calls = [0]
+
+    def every_other_401(path, query, body):
+        calls[0] += 1
+        return (401, {"error": "expired"}) if calls[0] % 2 else (200, court)
+
+    fixtures["GET codes/courts/{court}/codes"] = every_other_401
+    conn = _connection(FakeTransport(fixtures))
+    conn.reauthenticate_on_401 = True
+    token_manager = conn.get_token_manager()
+    token_manager.can_refresh = True
+    token_manager.refresh = conn.authenticate_user
+    for _ in range(iterations):
+        conn.get_court(COURT)
+
+
+BENCHMARKS: Dict[str, Callable[[int], None]] = {
+    "transport_only": transport_only,
+    "send": send,
+    "cached_court_info": cached_court_info,
+    "retry_after_401": retry_after_401,
+}
+
+
+def run_benchmarks(
+    *, iterations: int = 1000, benchmarks: Optional[List[str]] = None
+) -> Dict[str, Dict[str, float]]:
+    """Runs each benchmark for `iterations` calls. Returns the microseconds per call."""
+    results: Dict[str, Dict[str, float]] = {}
+    for name in benchmarks or list(BENCHMARKS):
+        start = time.perf_counter()
+        BENCHMARKS[name](iterations)
+        elapsed = time.perf_counter() - start
+        results[name] = {
+            "iterations": iterations,
+            "seconds": elapsed,
+            "us_per_call": elapsed / iterations * 1_000_000,
+        }
+    return results
+
+
+def format_report(results: Dict[str, Dict[str, float]]) -> str:
+    lines = [f"{'benchmark':<20}{'calls':>8}{'us / call':>12}"]
+    for name, result in results.items():
+        lines.append(
+            f"{name:<20}{result['iterations']:>8}{result['us_per_call']:>12.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--benchmark", action="append", choices=list(BENCHMARKS))
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    parsed = parser.parse_args(args)
+    results = run_benchmarks(iterations=parsed.iterations, benchmarks=parsed.benchmark)
+    if parsed.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(format_report(results))
+
+
+if __name__ == "__main__":
+    main()
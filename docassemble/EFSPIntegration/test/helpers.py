@@ -0,0 +1,17 @@
+# do not pre-load
+
+"""Small helpers shared by the tests that fake the proxy's HTTP responses"""
+
+import json
+from requests import Response
+
+__all__ = ["make_response"]
+
+
+def make_response(req, status_code=200, data=None) -> Response:
+    """A `requests` Response to `req`, with `data` as its JSON body"""
+    resp = Response()
+    resp.status_code = status_code
+    resp._content = json.dumps(data).encode("utf-8")
+    resp.request = req
+    return resp
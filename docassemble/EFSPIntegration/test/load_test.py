@@ -0,0 +1,233 @@
+# do not pre-load
+
+"""
+Simulates many interview sessions filing at once, to see how many one worker can
+handle before calls to the proxy slow down.
+
+Each session has its own EfspConnection, and runs a scripted filing flow against the
+local [MockProxyServer](#MockProxyServer):
+
+```
+python -m docassemble.EFSPIntegration.test.load_test --sessions 50 --iterations 3 --latency 0.05
+```
+
+Reports throughput, the p50 / p95 / p99 latency of each step, how many connections
+were made to the proxy, and how much the process' memory grew.
+"""
+
+import argparse
+import json
+import resource
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..metrics import get_registry
+from ..py_efsp_client import EfspConnection, set_connection_pool_size
+from .benchmark_flows import COURT, court_codes, review_preview, search_case_by_name
+from .mock_proxy_server import MockProxyServer, review_vars
+
+__all__ = ["FILING_STEPS", "run_load_test", "percentile", "format_report"]
+
+
+def login(conn: EfspConnection) -> None:
+    conn.authenticate_user()
+
+
+def file_for_review(conn: EfspConnection) -> None:
+    conn.file_for_review(COURT, review_vars())
+
+
+def filing_list(conn: EfspConnection) -> None:
+    today = datetime.now()
+    conn.get_filing_list(COURT, None, today - timedelta(days=7), today)
+
+
+# The steps of one filing, in order
+FILING_STEPS: List[Tuple[str, Callable[[EfspConnection], None]]] = [
+    ("login", login),
+    ("court_codes", court_codes),
+    ("case_search", search_case_by_name),
+    ("review_preview", review_preview),
+    ("file_for_review", file_for_review),
+    ("filing_list", filing_list),
+]
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """The nearest-rank percentile (0 to 100) of `values`"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered) + 0.4999)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def _rss_bytes() -> int:
+    """The resident memory of this process, or its peak where the current isn't known"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        # Linux reports this in KB, macOS in bytes
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def run_load_test(
+    server: MockProxyServer,
+    *,
+    sessions: int = 10,
+    iterations: int = 1,
+    ramp_up: float = 0.0,
+    think_time: float = 0.0,
+    steps: Optional[List[Tuple[str, Callable[[EfspConnection], None]]]] = None,
+) -> Dict[str, Any]:
+    """Runs `sessions` sessions at once, each filing `iterations` times.
+
+    Args:
+      ramp_up: seconds over which the sessions are started, instead of all at once
+      think_time: seconds each session waits between steps, like a user reading a page
+    """
+    steps = steps or FILING_STEPS
+    latencies: Dict[str, List[float]] = {name: [] for name, _ in steps}
+    lock = threading.Lock()
+    failures: List[str] = []
+    connections: List[EfspConnection] = []
+
+    def session(idx: int) -> None:
+        if ramp_up:
+            time.sleep(ramp_up * idx / sessions)
+        conn = EfspConnection(
+            url=server.url,
+            api_key="load-test",
+            default_jurisdiction="illinois",
+            interview_name=f"load-test-{idx}",
+        )
+        with lock:
+            connections.append(conn)
+        for _ in range(iterations):
+            for name, step in steps:
+                start = time.perf_counter()
+                try:
+                    step(conn)
+                except Exception as ex:
+                    with lock:
+                        failures.append(f"{name}: {ex!r}")
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies[name].append(elapsed)
+                if think_time:
+                    time.sleep(think_time)
+
+    get_registry().reset()
+    server.reset_counts()
+    rss_before = _rss_bytes()
+    threads = [
+        threading.Thread(target=session, args=(idx,), daemon=True)
+        for idx in range(sessions)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    rss_after = _rss_bytes()
+
+    statuses = get_registry().statuses
+    requests_made = sum(statuses.values())
+    error_responses = sum(
+        count for labels, count in statuses.items() if not labels[3].startswith("2")
+    )
+    for conn in connections:
+        conn.proxy_client.close()
+
+    return {
+        "sessions": sessions,
+        "iterations": iterations,
+        "wall_seconds": wall,
+        "filings": sessions * iterations,
+        "filings_per_second": sessions * iterations / wall,
+        "requests": requests_made,
+        "requests_per_second": requests_made / wall,
+        "error_responses": error_responses,
+        "exceptions": failures,
+        "steps": {
+            name: {
+                "count": len(values),
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "p99": percentile(values, 99),
+                "max": max(values) if values else None,
+            }
+            for name, values in latencies.items()
+        },
+        "connections_opened": server.connections_opened,
+        "max_open_connections": server.max_open_connections,
+        "rss_before_bytes": rss_before,
+        "rss_after_bytes": rss_after,
+        "rss_growth_per_session_bytes": (rss_after - rss_before) / sessions,
+    }
+
+
+def format_report(results: Dict[str, Any]) -> str:
+    def ms(value: Optional[float]) -> str:
+        return "-" if value is None else f"{value * 1000:.0f}"
+
+    lines = [
+        f"{results['sessions']} sessions x {results['iterations']} filings "
+        f"in {results['wall_seconds']:.2f}s",
+        f"throughput: {results['filings_per_second']:.2f} filings/s, "
+        f"{results['requests_per_second']:.1f} requests/s",
+        f"error responses: {results['error_responses']}, "
+        f"exceptions: {len(results['exceptions'])}",
+        f"connections to the proxy: {results['connections_opened']} opened, "
+        f"at most {results['max_open_connections']} open at once",
+        f"memory: {results['rss_before_bytes'] / 2**20:.1f}MB -> "
+        f"{results['rss_after_bytes'] / 2**20:.1f}MB "
+        f"({results['rss_growth_per_session_bytes'] / 1024:.0f}KB per session)",
+        "",
+        f"{'step':<18}{'count':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}",
+    ]
+    for name, step in results["steps"].items():
+        lines.append(
+            f"{name:<18}{step['count']:>7}{ms(step['p50']):>9}{ms(step['p95']):>9}"
+            f"{ms(step['p99']):>9}{ms(step['max']):>9}"
+        )
+    return "\n".join(lines)
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--iterations", type=int, default=1)
+    parser.add_argument("--ramp-up", type=float, default=0.0)
+    parser.add_argument("--think-time", type=float, default=0.0)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument(
+        "--pool-size", type=int, help="connections kept open to the proxy"
+    )
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    parsed = parser.parse_args(args)
+    if parsed.pool_size:
+        set_connection_pool_size(parsed.pool_size)
+    with MockProxyServer(
+        latency=parsed.latency, jitter=parsed.jitter, seed=0
+    ) as server:
+        results = run_load_test(
+            server,
+            sessions=parsed.sessions,
+            iterations=parsed.iterations,
+            ramp_up=parsed.ramp_up,
+            think_time=parsed.think_time,
+        )
+    if parsed.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(format_report(results))
+
+
+if __name__ == "__main__":
+    main()
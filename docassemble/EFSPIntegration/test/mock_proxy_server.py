@@ -0,0 +1,285 @@
+# do not pre-load
+
+"""
+A local stand-in for the EfileProxyServer, for measuring the client without a real proxy.
+
+It serves canned but realistically shaped responses for the codes, cases, filingreview
+and adminusers endpoints, and can wait before each response to act like a real network:
+
+```
+with MockProxyServer(latency=0.1, jitter=0.05) as server:
+    conn = EfspConnection(url=server.url, api_key="any", default_jurisdiction="illinois")
+    conn.get_court("adams")
+    print(server.call_counts)
+```
+"""
+
+import json
+import random
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from ..py_efsp_client import endpoint_template
+
+__all__ = ["MockProxyServer", "default_fixtures", "review_vars"]
+
+FIXTURE_DIR = Path(__file__).parent
+
+COURTS = ["adams", "cook", "peoria", "peoriacr", "champaign", "dupage"]
+
+
+def _codes(prefix: str, count: int, **extra: Any) -> List[Dict[str, Any]]:
+    return [
+        {"code": str(1000 + idx), "name": f"{prefix} {idx}", **extra}
+        for idx in range(count)
+    ]
+
+
+def _case() -> Dict[str, Any]:
+    with open(FIXTURE_DIR / "peoria_to_cr.json") as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=1)
+def review_vars() -> Dict[str, Any]:
+    """Interview variables to send to the filingreview endpoints. Don't change them;
+    they're shared."""
+    with open(FIXTURE_DIR / "vars.json") as f:
+        return json.load(f).get("variables", {})
+
+
+def default_fixtures(num_cases: int = 12) -> Dict[str, Any]:
+    """The response data for each `METHOD endpoint-template`. Lists of codes are sized
+    like Illinois' larger courts."""
+    case = _case()
+    return {
+        "POST authenticate": {
+            "tokens": {
+                "TYLER-TOKEN-ILLINOIS": "mock-token",
+                "TYLER-ID-ILLINOIS": "mock-user-id",
+            }
+        },
+        "GET codes/courts": COURTS,
+        "GET codes/courts/{court}/codes": {
+            "code": "adams",
+            "name": "Adams County",
+            "efmType": "ecf",
+            "initial": True,
+            "subsequent": True,
+            "allowfilingintononindexedcase": False,
+            "allowreturndate": False,
+            "hasconditionalservicetypes": False,
+            "allowablecardtypes": ["VISA", "MASTERCARD"],
+        },
+        "GET codes/courts/{court}/categories": _codes(
+            "Case category",
+            40,
+            ecfcasetype="CivilCase",
+            procedureremedyinitial="Not Available",
+        ),
+        "GET codes/courts/{court}/case_types": _codes(
+            "Case type", 120, category="1000", initial="True", fee="0.00"
+        ),
+        "GET codes/courts/{court}/filing_types": _codes(
+            "Filing type", 250, fee="0.00", iscourtuseonly="False", useduedate="False"
+        ),
+        "GET codes/courts/{court}/party_types": _codes(
+            "Party type", 60, isavailablefornewparties="True", isrequired="False"
+        ),
+        "GET codes/courts/{court}/case_types/{case_type}/party_types": _codes(
+            "Party type", 60, isavailablefornewparties="True", isrequired="False"
+        ),
+        "GET codes/courts/{court}/filer_types": _codes(
+            "Filer type", 8, default="False"
+        ),
+        "GET codes/courts/{court}/service_types": _codes("Service type", 6, fee="0.00"),
+        "GET codes/courts/{court}/filing_types/{filing_type}/optional_services": _codes(
+            "Optional service", 15, fee="0.00", multiplier="False"
+        ),
+        "GET codes/courts/{court}/filing_types/{filing_type}/document_types": _codes(
+            "Document type", 20, isdefault="False", isconfidential="False"
+        ),
+        "GET codes/courts/{court}/datafields/{field_name}": {
+            "code": "GlobalPassword",
+            "isvisible": True,
+            "isrequired": False,
+            "regularexpression": "^.{8,}$",
+            "validationmessage": "Must be at least 8 characters",
+        },
+        "GET cases/courts/{court}/cases": [case] * num_cases,
+        "GET cases/courts/{court}/cases/{case}": case,
+        "GET filingreview/courts/{court}/filing/check": {"errors": [], "warnings": []},
+        "POST filingreview/courts/{court}/filing/fees": {
+            "feesCalculationAmount": {"value": 337.0, "currencyID": "USD"},
+            "allowanceCharge": [
+                {"amount": {"value": 337.0}, "allowanceChargeReason": "Filing fee"}
+            ],
+        },
+        "GET filingreview/courts/{court}/filing/servicetypes": _codes(
+            "Service type", 6, fee="0.00"
+        ),
+        "POST filingreview/courts/{court}/filings": ["mock-filing-id"],
+        "GET filingreview/courts/{court}/filings": [],
+        "GET adminusers/user": {
+            "userID": "mock-user-id",
+            "email": "filer@example.com",
+            "firstName": "Mock",
+            "lastName": "Filer",
+        },
+        "GET adminusers/users": [
+            {"userID": f"user-{idx}", "email": f"user{idx}@example.com"}
+            for idx in range(25)
+        ],
+        "GET firmattorneyservice/firm": {"firmName": "Mock Firm", "isIndividual": True},
+        "GET firmattorneyservice/attorneys": [],
+    }
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default of 5 refuses connections when many sessions connect at once
+    request_queue_size = 128
+
+
+class MockProxyServer:
+    """A threaded HTTP server that acts like the EfileProxyServer.
+
+    Args:
+      latency: seconds to wait before every response
+      jitter: up to this many seconds are randomly added to or taken away from `latency`
+      fixtures: responses that replace or add to [default_fixtures](#default_fixtures),
+          keyed like `"GET codes/courts/{court}/codes"`. Values can also be functions
+          that take the request's path, query params and JSON body, and return the data
+          (or a `(status, data)` tuple)
+      seed: makes the jitter repeatable
+    """
+
+    def __init__(
+        self,
+        *,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        fixtures: Optional[Dict[str, Any]] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.fixtures = default_fixtures()
+        self.fixtures.update(fixtures or {})
+        self.call_counts: Counter = Counter()
+        # TCP connections from clients: how many were opened in total, how many are
+        # open now, and the most that were open at once
+        self.connections_opened = 0
+        self.open_connections = 0
+        self.max_open_connections = 0
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._server = _Server((host, port), self._handler_class())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host!s}:{port}/"
+
+    def start(self) -> "MockProxyServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "MockProxyServer":
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def reset_counts(self) -> None:
+        with self._lock:
+            self.call_counts.clear()
+            self.connections_opened = 0
+            self.max_open_connections = self.open_connections
+
+    def _connection_change(self, change: int) -> None:
+        with self._lock:
+            if change > 0:
+                self.connections_opened += change
+            self.open_connections += change
+            self.max_open_connections = max(
+                self.max_open_connections, self.open_connections
+            )
+
+    def _delay(self) -> float:
+        with self._lock:
+            offset = self._random.uniform(-self.jitter, self.jitter)
+        return max(0.0, self.latency + offset)
+
+    def respond(
+        self, method: str, path: str, query: Dict[str, List[str]], body: Any
+    ) -> Tuple[int, Any]:
+        key = f"{method} {endpoint_template(path)}"
+        with self._lock:
+            self.call_counts[key] += 1
+        if key not in self.fixtures:
+            return 404, {"error": f"The mock proxy doesn't serve {key}"}
+        fixture = self.fixtures[key]
+        if callable(fixture):
+            result = fixture(path, query, body)
+            if isinstance(result, tuple):
+                return result
+            return 200, result
+        return 200, fixture
+
+    def _handler_class(self) -> Callable[..., BaseHTTPRequestHandler]:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Otherwise the headers and body go out in separate packets, and the
+            # client's delayed ACK adds ~40ms to every call
+            disable_nagle_algorithm = True
+
+            def setup(self) -> None:
+                super().setup()
+                server._connection_change(1)
+
+            def finish(self) -> None:
+                server._connection_change(-1)
+                super().finish()
+
+            def _handle(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                raw_body = self.rfile.read(length) if length else b""
+                try:
+                    body = json.loads(raw_body) if raw_body else None
+                except ValueError:
+                    body = raw_body.decode("utf-8", errors="replace")
+                parts = urlsplit(self.path)
+                time.sleep(server._delay())
+                status, data = server.respond(
+                    self.command, parts.path, parse_qs(parts.query), body
+                )
+                payload = json.dumps(data).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _handle
+
+            def log_message(self, *args) -> None:
+                pass
+
+        return Handler
@@ -0,0 +1,128 @@
+# do not pre-load
+
+import json
+import pickle
+import unittest
+from pathlib import Path
+from ..case_model import add_case_details, parse_case_entry
+from .benchmark_case_state import format_report, run_benchmarks
+
+FIXTURE_DIR = Path(__file__).parent
+
+
+def load_fixture(name):
+    with open(FIXTURE_DIR / name) as f:
+        return json.load(f)
+
+
+class TestCaseModel(unittest.TestCase):
+    def test_header_only(self):
+        my_var = load_fixture("vars.json")["variables"]["my_var"]["data"]
+        case = parse_case_entry(my_var, "adams")
+        self.assertEqual(
+            (case.docket_number, case.category, case.fetched),
+            ("2020SC12", "6198", False),
+        )
+        self.assertEqual(case.participants, [])
+        self.assertIsNone(parse_case_entry(None, "peoria").tracking_id)
+
+    def test_participants(self):
+        my_var = load_fixture("vars.json")["variables"]["my_var"]["data"]
+        case = add_case_details(parse_case_entry(my_var, "adams"), my_var)
+        self.assertTrue(case.fetched)
+        self.assertEqual(len(case.participants), 2)
+        person, business = case.participants
+        self.assertEqual(person.person_type, "ALIndividual")
+        # All caps names are made title case
+        self.assertEqual((person.first, person.last), ("John", "Brown"))
+        self.assertEqual((person.address.city, person.address.zip), ("RADOM", "62876"))
+        self.assertIsNone(person.phone_number)
+        self.assertIsNone(person.email)
+        self.assertEqual(business.person_type, "business")
+        self.assertIsNone(business.last)
+        for partip in case.participants:
+            self.assertIsNotNone(partip.tyler_id)
+            self.assertFalse(partip.is_redacted)
+        self.assertGreater(case.date_ms, 0)
+
+    def test_switched_court(self):
+        peoria = load_fixture("peoria_to_cr.json")
+        case = add_case_details(parse_case_entry(peoria, "peoria"), peoria)
+        self.assertEqual(case.court_id, "peoriacr")
+        self.assertEqual(case.docket_number, "02-CM-02778-1")
+
+    def test_attorneys(self):
+        found = load_fixture("temp2.json")["selected_existing_case"]
+        case = add_case_details(
+            parse_case_entry(found["details"], "peoria"), found["case_details"]
+        )
+        self.assertEqual(
+            set(case.attorneys),
+            {
+                "e650827f-3a2b-4550-b76c-f7d22ed479ff",
+                "7ff43f9b-53ff-4e6d-9253-e393318549d0",
+            },
+        )
+        # Attorneys aren't participants
+        self.assertEqual(len(case.participants), 3)
+        represented = [p for p in case.participants if p.attorney_ids]
+        self.assertEqual(len(represented), 2)
+        for partip in represented:
+            self.assertEqual(
+                case.party_to_attorneys[partip.tyler_id], partip.attorney_ids
+            )
+        self.assertEqual(case.case_type, found["efile_case_type"])
+        self.assertEqual(case.title, found["title"])
+
+    def test_pickles_small(self):
+        found = load_fixture("temp2.json")["selected_existing_case"]
+        case = add_case_details(
+            parse_case_entry(found["details"], "peoria"), found["case_details"]
+        )
+        tyler_ids = [p.tyler_id for p in case.participants]
+        loaded = pickle.loads(pickle.dumps(case))
+        self.assertEqual([p.tyler_id for p in loaded.participants], tyler_ids)
+        self.assertFalse(hasattr(case, "__dict__"))
+
+    def test_lazy_parties(self):
+        found = load_fixture("temp2.json")["selected_existing_case"]
+        case = add_case_details(
+            parse_case_entry(found["details"], "peoria"), found["case_details"]
+        )
+        self.assertIsNone(case._parties)
+        self.assertIsNotNone(case._party_xml)
+        self.assertIs(case.participants, case.participants)
+        self.assertIsNone(case._party_xml)
+
+    def test_pickled_before_read(self):
+        found = load_fixture("temp2.json")["selected_existing_case"]
+        case = add_case_details(
+            parse_case_entry(found["details"], "peoria"), found["case_details"]
+        )
+        # Like a search result saved by a background task, before anyone looked at it
+        loaded = pickle.loads(pickle.dumps(case))
+        self.assertIsNone(case._parties)
+        self.assertIsNone(loaded._parties)
+        self.assertIsNotNone(loaded._party_xml)
+        self.assertEqual(len(loaded.participants), 3)
+        self.assertIsNone(loaded._party_xml)
+        self.assertEqual(len(loaded.attorneys), 2)
+        represented = [p for p in loaded.participants if p.attorney_ids]
+        self.assertEqual(
+            loaded.party_to_attorneys[represented[0].tyler_id],
+            represented[0].attorney_ids,
+        )
+        self.assertEqual(
+            [p.full_name() for p in loaded.participants],
+            [p.full_name() for p in case.participants],
+        )
+
+    def test_benchmark(self):
+        results = run_benchmarks(cases=20)
+        self.assertLess(results["compact_bytes"], results["raw_bytes"])
+        self.assertLess(results["parties_read_bytes"] * 5, results["compact_bytes"])
+        self.assertIn("compact", format_report(results))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+# do not pre-load
+
+import json
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from ..cassette import CassettePlayer
+from ..py_efsp_client import EfspConnection
+from ..redaction import REDACTED, PII_KEYS, mask_value
+from .mock_proxy_server import MockProxyServer
+
+
+class TestMaskValue(unittest.TestCase):
+    def test_keeps_shape(self):
+        value = {
+            "personGivenName": {"value": "Brenda"},
+            "caseTitleText": "People v. Bart",
+            "phone": [5551234],
+            "caseCategory": "7",
+        }
+        self.assertEqual(
+            mask_value(value, PII_KEYS),
+            {
+                "personGivenName": {"value": REDACTED},
+                "caseTitleText": REDACTED,
+                "phone": [0],
+                "caseCategory": "7",
+            },
+        )
+
+
+class TestCassette(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "cassette.json")
+        self.server = MockProxyServer(latency=0.05).start()
+        self.conn = EfspConnection(
+            url=self.server.url, api_key="secret-key", default_jurisdiction="illinois"
+        )
+
+    def tearDown(self):
+        self.conn.proxy_client.close()
+        self.server.stop()
+        self.tmp.cleanup()
+
+    def record(self):
+        with self.conn.use_cassette(self.path, record=True):
+            self.conn.authenticate_user(tyler_email="a@b.com", tyler_password="hunter2")
+            self.conn.get_court("adams")
+            self.conn.get_cases_raw(
+                "adams", person_name={"first": "Brenda", "middle": None, "last": "Bart"}
+            )
+            return self.conn.get_case("adams", "abc")
+
+    def test_masks_secrets_and_pii(self):
+        self.record()
+        with open(self.path) as f:
+            text = f.read()
+        for secret in ["secret-key", "hunter2", "mock-token", "Brenda", "BRENDA"]:
+            self.assertNotIn(secret, text)
+        cassette = json.loads(text)
+        self.assertEqual(len(cassette["interactions"]), 4)
+        auth = cassette["interactions"][0]
+        self.assertEqual(auth["request"]["key"], "POST /authenticate")
+        self.assertEqual(
+            auth["response"]["body"]["json"]["tokens"]["TYLER-TOKEN-ILLINOIS"], REDACTED
+        )
+        self.assertGreaterEqual(auth["elapsed"], 0.05)
+
+    def test_replays_offline(self):
+        recorded = self.record()
+        conn = EfspConnection(
+            url="http://not-a-proxy.invalid/",
+            api_key="other-key",
+            default_jurisdiction="illinois",
+        )
+        with conn.use_cassette(self.path) as player:
+            self.assertTrue(conn.authenticate_user().is_ok())
+            self.assertEqual(conn.tyler_token(), REDACTED)
+            self.assertEqual(conn.get_court("adams").data["name"], "Adams County")
+            cases = conn.get_cases_raw(
+                "adams", person_name={"first": "Other", "middle": None, "last": "Name"}
+            )
+            self.assertEqual(len(cases.data), 12)
+            case = conn.get_case("adams", "abc")
+            self.assertEqual(player.unplayed(), [])
+            missing = conn.get_court("cook")
+        self.assertEqual(case.response_code, recorded.response_code)
+        self.assertEqual(
+            case.data["value"]["caseDocketID"], recorded.data["value"]["caseDocketID"]
+        )
+        self.assertEqual(missing.response_code, -1)
+        self.assertIn("no response for GET", missing.error_msg)
+        self.assertIsNone(conn.__dict__.get("_transport"))
+
+    def test_masks_all_vars_names(self):
+        with open(Path(__file__).parent / "opening_affidavit_adams.json") as f:
+            all_vars = json.load(f)
+        with self.conn.use_cassette(self.path, record=True):
+            recorded = self.conn.calculate_filing_fees("adams", all_vars)
+        with open(self.path) as f:
+            text = f.read()
+        for name in ["Bryce", "Willey", "Bob Bad"]:
+            self.assertNotIn(name, text)
+        sent = json.loads(text)["interactions"][0]["request"]["body"]["json"]
+        user_name = sent["users"]["elements"][0]["name"]
+        self.assertEqual(user_name["first"], REDACTED)
+        self.assertEqual(user_name["last"], REDACTED)
+        self.assertEqual(user_name["instanceName"], "users[0].name")
+
+        conn = EfspConnection(
+            url="http://not-a-proxy.invalid/",
+            api_key="other-key",
+            default_jurisdiction="illinois",
+        )
+        with conn.use_cassette(self.path) as player:
+            fees = conn.calculate_filing_fees("adams", all_vars)
+            self.assertEqual(player.unplayed(), [])
+        self.assertEqual(fees.data, recorded.data)
+
+    def test_timing_scale(self):
+        self.record()
+        player = CassettePlayer(self.path, timing_scale=0.0)
+        self.conn.set_transport(player)
+        start = time.perf_counter()
+        self.conn.get_court("adams")
+        self.assertLess(time.perf_counter() - start, 0.04)
+        player.timing_scale = 2.0
+        start = time.perf_counter()
+        self.conn.get_court("adams")
+        self.assertGreaterEqual(time.perf_counter() - start, 0.1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,188 @@
+# do not pre-load
+
+import gzip
+import os
+import tempfile
+import unittest
+from ..code_cache import (
+    CodeCache,
+    SnapshotError,
+    code_cache_key,
+    get_code_cache,
+    load_code_snapshot,
+    open_snapshot,
+    set_code_cache,
+    write_snapshot,
+)
+from ..code_snapshot import export_codes
+from ..py_efsp_client import EfspConnection
+from ..transports import FakeTransport
+from .mock_proxy_server import default_fixtures
+
+BASE_URL = "http://fake-proxy/"
+
+
+def small_fixtures():
+    fixtures = default_fixtures()
+    fixtures["GET codes/courts"] = ["adams", "cook"]
+    for key, count in [
+        ("GET codes/courts/{court}/categories", 2),
+        ("GET codes/courts/{court}/case_types", 3),
+        ("GET codes/courts/{court}/filing_types", 4),
+    ]:
+        fixtures[key] = fixtures[key][:count]
+    return fixtures
+
+
+class CodeCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.previous_cache = get_code_cache()
+        set_code_cache(None)
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "codes.snapshot.gz")
+
+    def tearDown(self):
+        set_code_cache(self.previous_cache)
+        self.tmp_dir.cleanup()
+
+    def connect(self, transport):
+        return EfspConnection(
+            url=BASE_URL,
+            api_key="any",
+            default_jurisdiction="illinois",
+            transport=transport,
+        )
+
+
+class TestCodeCache(CodeCacheTestCase):
+    def test_keys(self):
+        url = BASE_URL + "jurisdictions/illinois/codes/courts/adams/categories?timing="
+        self.assertEqual(
+            code_cache_key("GET", url, BASE_URL),
+            "jurisdictions/illinois/codes/courts/adams/categories?timing=",
+        )
+        self.assertIsNone(code_cache_key("POST", url, BASE_URL))
+        # Policies are fetched from Tyler as the logged in user
+        self.assertIsNone(
+            code_cache_key(
+                "GET",
+                BASE_URL + "jurisdictions/illinois/filingreview/courts/adams/policy",
+                BASE_URL,
+            )
+        )
+        self.assertIsNone(
+            code_cache_key(
+                "GET",
+                BASE_URL + "jurisdictions/illinois/filingreview/courts/adams/filings",
+                BASE_URL,
+            )
+        )
+
+    def test_ttl_and_size(self):
+        cache = CodeCache(ttl=60, max_entries=2)
+        cache.put("old", b"1", stored_at=0)
+        self.assertIsNone(cache.get("old"))
+        cache.put("a", b"a")
+        cache.put("b", b"b")
+        cache.get("a")
+        cache.put("c", b"c")
+        self.assertEqual([key for key, _ in cache.items()], ["a", "c"])
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_connection_uses_cache(self):
+        transport = FakeTransport(small_fixtures())
+        conn = self.connect(transport)
+        conn.get_case_categories("adams")
+        self.assertEqual(len(transport.requests), 1)
+
+        set_code_cache(CodeCache())
+        first = conn.get_case_categories("adams")
+        second = conn.get_case_categories("adams")
+        self.assertEqual(len(transport.requests), 2)
+        self.assertEqual(first.data, second.data)
+        self.assertIsNot(first.data, second.data)
+        self.assertEqual(second.get_response_bytes(), first.get_response_bytes())
+        # Different params, failures and non-code calls aren't shared
+        conn.get_case_categories("adams", fileable_only=True)
+        conn.get_case_subtypes("adams", "1000")
+        conn.get_case_subtypes("adams", "1000")
+        conn.get_filing_list("adams")
+        conn.get_filing_list("adams")
+        self.assertEqual(len(transport.requests), 7)
+
+
+class TestSnapshots(CodeCacheTestCase):
+    def test_round_trip(self):
+        count = write_snapshot(
+            self.path, [("a", b'{"x": 1}'), ("b", "[é]".encode())], note="hi"
+        )
+        self.assertEqual(count, 2)
+        with open_snapshot(self.path) as (header, entries):
+            self.assertEqual((header["version"], header["note"]), (1, "hi"))
+            self.assertEqual(dict(entries)["b"], "[é]".encode())
+
+    def test_bad_files(self):
+        with gzip.open(self.path, "wt") as f:
+            f.write('{"format": "efsp-code-snapshot", "version": 99}\n')
+        with self.assertRaises(SnapshotError):
+            load_code_snapshot(self.path)
+        with open(self.path, "w") as f:
+            f.write("not gzipped")
+        with self.assertRaises(SnapshotError):
+            load_code_snapshot(self.path)
+
+    def test_max_age(self):
+        write_snapshot(self.path, [("a", b"1")], created_at=0)
+        self.assertEqual(load_code_snapshot(self.path, max_age=60), 0)
+        self.assertIsNone(get_code_cache())
+
+    def test_skips_per_user_entries(self):
+        codes = "jurisdictions/illinois/codes/courts/adams/codes"
+        policy = "jurisdictions/illinois/filingreview/courts/adams/policy"
+        write_snapshot(self.path, [(codes, b"{}"), (policy, b"{}")])
+        self.assertEqual(load_code_snapshot(self.path), 1)
+        self.assertEqual([key for key, _ in get_code_cache().items()], [codes])
+
+    def test_export_and_load(self):
+        transport = FakeTransport(small_fixtures())
+        progress = []
+        header = export_codes(
+            self.connect(transport),
+            self.path,
+            progress=lambda court, calls: progress.append(court),
+        )
+        self.assertEqual(progress, ["adams", "cook"])
+        self.assertIsNone(get_code_cache())
+        # Repeated calls (like party types of the same case type) are only made once
+        urls = [req.url for req in transport.requests]
+        self.assertEqual(len(set(urls)), len(urls))
+        # The endpoints the fixtures don't have aren't in the snapshot
+        self.assertLess(header["entries"], len(urls))
+        self.assertEqual(
+            transport.call_counts[
+                "GET codes/courts/{court}/filing_types/{filing_type}/document_types"
+            ],
+            2 * 4,
+        )
+
+        self.assertEqual(load_code_snapshot(self.path), header["entries"])
+        offline = FakeTransport()
+        conn = self.connect(offline)
+        self.assertTrue(conn.get_court("cook").is_ok())
+        resp = conn.get_filing_types("adams", "1001", "1002", True)
+        self.assertEqual(len(resp.data), 4)
+        self.assertTrue(conn.get_document_types("adams", "1003").is_ok())
+        self.assertEqual(len(offline.requests), 0)
+
+    def test_depth(self):
+        transport = FakeTransport(small_fixtures())
+        export_codes(self.connect(transport), self.path, ["adams"], depth="court")
+        self.assertEqual(
+            transport.call_counts["GET codes/courts/{court}/case_types"], 0
+        )
+        with self.assertRaises(ValueError):
+            export_codes(self.connect(transport), self.path, depth="everything")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+# do not pre-load
+
+import unittest
+from ..code_filters import (
+    CodeIndex,
+    CodeType,
+    ContainAny,
+    code_index,
+    make_filter,
+    make_filters,
+    select_codes,
+)
+from .benchmark_filters import (
+    FILTER_SETS,
+    format_report,
+    legacy_select,
+    load_filing_types,
+    run_benchmarks,
+)
+
+
+class TestCodeFilters(unittest.TestCase):
+    def setUp(self):
+        self.options = load_filing_types()
+
+    def test_same_as_before(self):
+        filter_sets = FILTER_SETS + [
+            (["  APPEARANCE - (up to $2,500) "], None),
+            ([ContainAny([]), []], None),
+            ([lambda opt: opt[0].startswith("1432")], ContainAny(["summons"])),
+        ]
+        options = self.options + [("1", None), ("2", "Two\nlines"), ("3", "")]
+        for filters, exclude in filter_sets:
+            self.assertEqual(
+                select_codes(options, filters, exclude),
+                legacy_select(options, filters, exclude),
+                filters,
+            )
+
+    def test_filters_are_callable(self):
+        filters = make_filters(["Proof", CodeType("143184")])
+        self.assertEqual(len(filters), 3)
+        self.assertTrue(filters[0](("x", " proof ")))
+        self.assertTrue(filters[1](("143184", "Oath")))
+        self.assertTrue(filters[2](("x", "Proof of Delivery")))
+        self.assertFalse(make_filter(None)(("x", "anything")))
+        # Compiled filters can be compiled again
+        self.assertEqual(make_filters(filters)[:3], filters)
+
+    def test_index_reused(self):
+        index = code_index(self.options)
+        self.assertIs(code_index(self.options), index)
+        self.assertIs(code_index(index), index)
+        self.assertIs(code_index(list(self.options)), index)
+        self.options.append(("1", "New"))
+        self.assertEqual(len(code_index(self.options)), len(index) + 1)
+        # Changes in the middle of the list are noticed too
+        self.options[1] = (self.options[1][0], "Renamed")
+        self.assertEqual(code_index(self.options).labels[1], "renamed")
+        unhashable = [["1", "A", {"extra": 1}]]
+        self.assertIsNot(code_index(unhashable), code_index(unhashable))
+
+    def test_containing(self):
+        index = CodeIndex([("1", "Ab"), ("2", "b"), ("3", "abab"), ("4", None)])
+        self.assertEqual(index.containing("b"), [0, 1, 2])
+        self.assertEqual(index.containing("ab"), [0, 2])
+        self.assertEqual(index.containing("ab", [2, 3]), [2])
+        self.assertEqual(index.containing(""), [0, 1, 2, 3])
+
+    def test_benchmark(self):
+        results = run_benchmarks(repeat=2)
+        self.assertEqual(results["options"], len(self.options))
+        self.assertIn("same list", format_report(results))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+# do not pre-load
+
+import unittest
+from ..code_search import CodeSearchIndex, CodeSearchStore, get_code_search_store
+from ..py_efsp_client import EfspConnection
+from ..transports import FakeTransport
+from .benchmark_filters import load_filing_types
+
+NAMES = [name for _, name in load_filing_types()]
+
+
+class TestCodeSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = CodeSearchIndex(NAMES + ["Motion", "Motion"])
+
+    def test_ranked(self):
+        results = self.index.search("motion")
+        self.assertEqual(results[0], "Motion")
+        self.assertEqual(results.count("Motion"), 1)
+        self.assertTrue(all("motion" in name.lower() for name in results))
+        self.assertEqual(self.index.search("motion to vacate")[0], "Motion to Vacate")
+
+    def test_prefix(self):
+        self.assertEqual(
+            self.index.search("summ ret"),
+            ["Summons (Returned)", "Alias Summons (Returned)"],
+        )
+        self.assertIn("Appearance - (Up to $2,500)", self.index.search("appear 2,500"))
+
+    def test_typos(self):
+        self.assertEqual(self.index.search("interpelader"), ["Interpleader"])
+        self.assertEqual(self.index.search("Withdrawl")[0], "Withdrawal")
+        self.assertEqual(self.index.search("zzzz"), [])
+        # Short words have to be right
+        self.assertEqual(self.index.search("oaht"), ["Oath"])
+        self.assertEqual(self.index.search("lie"), ["Lien"])
+
+    def test_empty(self):
+        self.assertEqual(len(self.index.search("")), len(set(NAMES + ["Motion"])))
+        self.assertEqual(self.index.search("", limit=2), sorted(self.index.names)[:2])
+
+
+class TestCodeSearchStore(unittest.TestCase):
+    def test_loads_once(self):
+        loads = []
+        store = CodeSearchStore()
+        for _ in range(3):
+            index = store.get("key", lambda: loads.append(1) or ["A"])
+        self.assertEqual(len(loads), 1)
+        self.assertEqual(index.search("a"), ["A"])
+
+    def test_failures_retried_later(self):
+        store = CodeSearchStore(retry_after=0)
+        self.assertIsNone(store.get("key", lambda: None))
+        self.assertIsNotNone(store.get("key", lambda: ["A"]))
+
+
+class TestLocalSearch(unittest.TestCase):
+    def setUp(self):
+        get_code_search_store().invalidate()
+        self.transport = FakeTransport(
+            {
+                "GET codes/filing_types": lambda path, query, body: [
+                    name
+                    for name in NAMES
+                    if query.get("search", [""])[0].lower() in name.lower()
+                ]
+            }
+        )
+        self.conn = EfspConnection(
+            url="http://fake-proxy/",
+            api_key="any",
+            default_jurisdiction="illinois",
+            transport=self.transport,
+        )
+        self.conn.set_local_code_search(True)
+
+    def tearDown(self):
+        get_code_search_store().invalidate()
+
+    def test_matches_remote(self):
+        for search in ["summons", "motion", "appearance", "lien", "proof of service"]:
+            local = self.conn.search_filing_types(search).data
+            self.conn.set_local_code_search(False)
+            remote = self.conn.search_filing_types(search).data
+            self.conn.set_local_code_search(True)
+            self.assertTrue(remote, search)
+            self.assertEqual(sorted(local), sorted(remote), search)
+        # One call for the index, then one for each remote search
+        self.assertEqual(self.transport.call_counts["GET codes/filing_types"], 6)
+
+    def test_one_call(self):
+        self.assertIn("Summons (Issued)", self.conn.search_filing_types("summons").data)
+        resp = self.conn.search_filing_types("sumons iss")
+        self.assertTrue(resp.is_ok())
+        self.assertEqual(resp.data, ["Summons (Issued)", "Alias Summons (Issued)"])
+        self.assertEqual(self.transport.call_counts["GET codes/filing_types"], 1)
+        self.assertEqual(self.transport.requests[0].url.split("?")[1], "search=")
+
+    def test_off(self):
+        self.assertFalse(
+            EfspConnection(
+                url="http://fake-proxy/", api_key="any"
+            ).get_local_code_search()
+        )
+        self.conn.set_local_code_search(False)
+        self.assertEqual(self.conn.search_filing_types("sumons").data, [])
+        self.conn.search_filing_types("summons")
+        self.assertEqual(self.transport.call_counts["GET codes/filing_types"], 2)
+
+    def test_falls_back(self):
+        self.transport.handlers["GET codes/filing_types"] = lambda path, query, body: (
+            (404, {"error": "no"}) if query.get("search") is None else ["Lien"]
+        )
+        self.assertEqual(self.conn.search_filing_types("lien").data, ["Lien"])
+        self.assertEqual(self.transport.call_counts["GET codes/filing_types"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+# do not pre-load
+
+import os
+import tempfile
+import time
+import unittest
+from ..code_cache import (
+    CodeCache,
+    get_code_cache,
+    open_snapshot,
+    set_code_cache,
+    write_snapshot,
+)
+from ..code_warmer import CodeCacheWarmer, code_combination, warm_snapshot
+from ..py_efsp_client import EfspConnection
+from ..transports import FakeTransport
+from .mock_proxy_server import default_fixtures
+
+BASE_URL = "http://fake-proxy/"
+CATEGORIES = "jurisdictions/illinois/codes/courts/adams/categories?timing="
+CASE_TYPES = "jurisdictions/illinois/codes/courts/cook/case_types?category_id=7"
+DOCUMENT_TYPES = (
+    "jurisdictions/illinois/codes/courts/adams/filing_types/1003/document_types"
+)
+MISSING = "jurisdictions/illinois/codes/courts/adams/case_types/5/case_subtypes"
+
+
+class TestCodeCacheWarmer(unittest.TestCase):
+    def setUp(self):
+        self.previous_cache = get_code_cache()
+        self.cache = CodeCache(ttl=60 * 60)
+        set_code_cache(self.cache)
+        self.transport = FakeTransport(default_fixtures())
+        self.conn = EfspConnection(
+            url=BASE_URL,
+            api_key="any",
+            default_jurisdiction="illinois",
+            transport=self.transport,
+        )
+
+    def tearDown(self):
+        set_code_cache(self.previous_cache)
+
+    def test_code_combination(self):
+        self.assertEqual(tuple(code_combination(CASE_TYPES)), ("cook", "7", None, None))
+        self.assertEqual(code_combination(DOCUMENT_TYPES).filing_type, "1003")
+        self.assertEqual(code_combination(MISSING).case_type, "5")
+
+    def test_refreshes_hottest_expiring(self):
+        old = time.time() - 50 * 60
+        for key in [CATEGORIES, CASE_TYPES, DOCUMENT_TYPES]:
+            self.cache.put(key, b"[]", stored_at=old)
+        self.cache.put("jurisdictions/illinois/codes/courts/fresh/categories", b"[]")
+        for _ in range(3):
+            self.cache.get(CASE_TYPES)
+        self.cache.get(CATEGORIES)
+
+        warmer = CodeCacheWarmer(self.conn, refresh_before=15 * 60, max_refreshes=1)
+        self.assertEqual(self.cache.expiring(15 * 60)[:2], [CASE_TYPES, CATEGORIES])
+        self.assertEqual(warmer.due(), [CASE_TYPES])
+        result = warmer.warm_once()
+        self.assertEqual((result["refreshed"], result["failed"]), (1, 0))
+        self.assertEqual(result["hottest"][0].court, "cook")
+        self.assertEqual(len(self.transport.requests), 1)
+        self.assertGreater(self.cache.stored_at(CASE_TYPES), old)
+        self.assertNotEqual(self.cache.get(CASE_TYPES), b"[]")
+        self.assertEqual(warmer.due(), [CATEGORIES])
+        warmer.warm_once()
+        self.assertEqual(len(self.transport.requests), 2)
+        # Popular keys stay hot between cycles, even if no one asked for them again
+        self.assertAlmostEqual(self.cache.uses[CASE_TYPES], 4, places=2)
+
+    def test_uses_fade_daily(self):
+        start = time.time()
+        self.cache.uses.update({CASE_TYPES: 8, CATEGORIES: 1})
+        self.cache.decay_uses(now=start + 60 * 60)
+        self.assertGreater(self.cache.uses[CATEGORIES], 0.9)
+        self.cache.decay_uses(now=start + 24 * 60 * 60)
+        self.assertAlmostEqual(self.cache.uses[CASE_TYPES], 4, places=1)
+        self.cache.decay_uses(now=start + 25 * 60 * 60)
+        self.assertNotIn(CATEGORIES, self.cache.uses)
+        # Only time fades them, not how often they're faded
+        uses = self.cache.uses[CASE_TYPES]
+        for _ in range(10):
+            self.cache.decay_uses(now=start + 25 * 60 * 60)
+        self.assertEqual(self.cache.uses[CASE_TYPES], uses)
+
+    def test_searches_not_counted(self):
+        search = "jurisdictions/illinois/codes/filing_types?search=motion+to"
+        every_name = "jurisdictions/illinois/codes/filing_types?search="
+        for key in [search, every_name]:
+            self.cache.put(key, b"[]", stored_at=time.time() - 50 * 60)
+            self.cache.get(key)
+        self.assertNotIn(search, self.cache.uses)
+        self.assertEqual(CodeCacheWarmer(self.conn).due(), [every_name])
+
+    def test_failures_keep_old_body(self):
+        self.cache.put(MISSING, b'["old"]', stored_at=0)
+        self.cache.uses[MISSING] = 2
+        result = CodeCacheWarmer(self.conn).warm_once()
+        self.assertEqual(result["failed"], 1)
+        self.assertEqual(self.cache.items(), [(MISSING, b'["old"]')])
+
+    def test_warm_snapshot(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "codes.snapshot.gz")
+            write_snapshot(
+                path,
+                [(CATEGORIES, b"[]"), (MISSING, b'["old"]')],
+                jurisdiction="illinois",
+                created_at=0,
+            )
+            result = warm_snapshot(self.conn, path, max_workers=2)
+            self.assertEqual((result["refreshed"], result["failed"]), (1, 1))
+            with open_snapshot(path) as (header, entries):
+                entries = dict(entries)
+                self.assertEqual(header["jurisdiction"], "illinois")
+                self.assertGreater(header["created_at"], 0)
+        self.assertNotEqual(entries[CATEGORIES], b"[]")
+        self.assertEqual(entries[MISSING], b'["old"]')
+        self.assertIs(get_code_cache(), self.cache)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,13 +1,20 @@
 # do not pre-load
 
 import json
+import pickle
 import unittest
 from unittest.mock import MagicMock
 from pathlib import Path
 from docassemble.base.core import DAObject
 from docassemble.AssemblyLine.al_general import ALIndividual
 from ..efm_client import ProxyConnection, ApiResponse
-from ..conversions import choices_and_map, parse_case_info, parse_service_contacts
+from ..conversions import (
+    choices_and_map,
+    expand_found_case,
+    parse_case_info,
+    parse_found_case,
+    parse_service_contacts,
+)
 
 
 class TestConversions(unittest.TestCase):
@@ -50,6 +57,18 @@ class TestConversions(unittest.TestCase):
         self.assertEqual(case.docket_number, "2020SC12")
         self.assertEqual(case.category, "6198")
 
+    def test_expand_saved_found_case(self):
+        # Found cases are saved between pages before the user picks one
+        case = DAObject("case")
+        parse_found_case(self.proxy_conn, case, self.my_var, "adams")
+        case.case_summary = pickle.loads(pickle.dumps(case.case_summary))
+        self.proxy_conn.get_case.reset_mock()
+        expand_found_case(self.proxy_conn, case)
+        self.proxy_conn.get_case.assert_not_called()
+        self.assertEqual(len(case.participants), 2)
+        self.assertEqual(case.participants[0].address.zip, "62876")
+        self.assertFalse(hasattr(case, "case_summary"))
+
     def test_parse_service_contact(self):
         no_contacts = parse_service_contacts([])
         self.assertEqual(len(no_contacts), 0)
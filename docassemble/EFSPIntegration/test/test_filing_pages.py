@@ -0,0 +1,203 @@
+# do not pre-load
+
+import time
+import unittest
+from datetime import datetime, timedelta
+from ..filing_pages import FilingPages, date_windows, filing_timestamp, get_filing_id
+from ..py_efsp_client import EfspConnection
+from ..transports import FakeTransport
+
+
+def make_filing(id, timestamp):
+    return {
+        "documentIdentification": [
+            {"identificationID": {"value": "envelope"}},
+            {"identificationID": {"value": id}},
+        ],
+        "documentFiledDate": {
+            "dateRepresentation": {"value": {"value": timestamp}},
+        },
+    }
+
+
+FILINGS = [make_filing(f"filing-{idx:02}", 1000 * (idx // 2)) for idx in range(25)]
+
+
+class TestFilingPages(unittest.TestCase):
+    def setUp(self):
+        self.pages = FilingPages(reversed(FILINGS))
+
+    def test_fields(self):
+        self.assertEqual(get_filing_id(FILINGS[3]), "filing-03")
+        self.assertEqual(filing_timestamp(FILINGS[3]), 1000)
+        self.assertIsNone(get_filing_id({}))
+        self.assertEqual(filing_timestamp({"documentFiledDate": None}), 0)
+
+    def test_pages(self):
+        seen = []
+        cursor = None
+        while True:
+            page = self.pages.page(after=cursor, size=10)
+            self.assertEqual(page.total, 25)
+            seen.extend(page.filings)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(seen, list(self.pages))
+        # Newest first, and the same filing date in order by id
+        self.assertEqual(get_filing_id(seen[0]), "filing-24")
+        self.assertEqual(
+            [get_filing_id(f) for f in seen[1:3]], ["filing-22", "filing-23"]
+        )
+
+    def test_cursor_survives_new_filings(self):
+        page = self.pages.page(size=5)
+        newer = FilingPages(FILINGS + [make_filing("filing-99", 99000)])
+        self.assertEqual(
+            newer.page(after=page.next_cursor, size=5),
+            self.pages.page(after=page.next_cursor, size=5)._replace(total=26),
+        )
+
+    def test_same_date_and_no_id(self):
+        no_ids = [make_filing(None, 5000) for _ in range(7)] + FILINGS
+        pages = FilingPages(no_ids)
+        seen = []
+        cursor = None
+        while True:
+            page = pages.page(after=cursor, size=3)
+            seen.extend(page.filings)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        self.assertEqual(len(seen), 32)
+        self.assertEqual(seen, list(pages))
+
+    def test_bad_cursor(self):
+        first = self.pages.page(size=5)
+        for cursor in ["not-a-cursor", "12:filing-03", "x:filing-03:0", 7, [1]]:
+            self.assertEqual(self.pages.page(after=cursor, size=5), first)
+            self.assertEqual(len(list(self.pages.iter(after=cursor))), 25)
+
+    def test_lazy_labels(self):
+        labelled = []
+
+        def label(filing):
+            labelled.append(filing)
+            return {get_filing_id(filing): "label"}
+
+        self.assertEqual(
+            self.pages.page(size=3).labels(label)[0], {"filing-24": "label"}
+        )
+        self.assertEqual(len(labelled), 3)
+        exported = self.pages.iter(label=label)
+        next(exported)
+        self.assertEqual(len(labelled), 4)
+        self.assertEqual(len(list(exported)), 24)
+
+    def test_empty(self):
+        page = FilingPages(None).page()
+        self.assertEqual((page.filings, page.next_cursor, page.total), ([], None, 0))
+
+
+class TestDateWindows(unittest.TestCase):
+    def test_windows(self):
+        start = datetime(2024, 1, 1)
+        windows = date_windows(start, datetime(2024, 1, 20), timedelta(days=7))
+        self.assertEqual(
+            [(s.day, b.day) for s, b in windows], [(1, 8), (8, 15), (15, 20)]
+        )
+        self.assertEqual(date_windows(start, start, timedelta(days=7)), [])
+        with self.assertRaises(ValueError):
+            date_windows(start, datetime(2024, 2, 1), timedelta(0))
+
+
+class TestFilingListRange(unittest.TestCase):
+    def setUp(self):
+        def filings(path, query, body):
+            # Every window also returns the filing that's in every window
+            start = query["start_date"][0]
+            return [make_filing(f"from-{start}", 0), make_filing("everywhere", 0)]
+
+        self.transport = FakeTransport(
+            {"GET filingreview/courts/{court}/filings": filings}, latency=0.1
+        )
+        self.conn = EfspConnection(
+            url="http://fake-proxy/",
+            api_key="any",
+            default_jurisdiction="illinois",
+            transport=self.transport,
+        )
+
+    def test_concurrent_windows(self):
+        start = time.monotonic()
+        resp = self.conn.get_filing_list_range(
+            "adams",
+            datetime(2024, 1, 1),
+            datetime(2024, 5, 1),
+            window=timedelta(days=30),
+            max_workers=5,
+        )
+        self.assertLess(time.monotonic() - start, 0.35)
+        self.assertTrue(resp.is_ok())
+        ids = sorted(get_filing_id(filing) for filing in resp.data)
+        self.assertEqual(
+            ids,
+            [
+                "everywhere",
+                "from-2024-01-01",
+                "from-2024-01-31",
+                "from-2024-03-01",
+                "from-2024-03-31",
+                "from-2024-04-30",
+            ],
+        )
+
+    def test_newest_first(self):
+        responses = list(
+            self.conn.iter_filing_list_range(
+                "adams",
+                datetime(2024, 1, 1),
+                datetime(2024, 3, 1),
+                window=timedelta(days=30),
+                max_workers=1,
+            )
+        )
+        self.assertEqual(
+            [[get_filing_id(filing) for filing in resp.data] for resp in responses],
+            [["from-2024-01-31", "everywhere"], ["from-2024-01-01"]],
+        )
+
+    def test_failed_window(self):
+        self.transport.handlers["GET filingreview/courts/{court}/filings"] = (
+            lambda path, query, body: (
+                (500, {"error": "timed out"})
+                if query["start_date"][0] == "2024-02-01"
+                else []
+            )
+        )
+        resp = self.conn.get_filing_list_range(
+            "adams", datetime(2024, 1, 1), datetime(2024, 3, 1)
+        )
+        self.assertEqual(resp.response_code, 500)
+
+
+class TestGetFilingPages(unittest.TestCase):
+    def test_connection(self):
+        transport = FakeTransport(
+            {"GET filingreview/courts/{court}/filings": FILINGS},
+        )
+        conn = EfspConnection(
+            url="http://fake-proxy/",
+            api_key="any",
+            default_jurisdiction="illinois",
+            transport=transport,
+        )
+        resp = conn.get_filing_pages("adams")
+        self.assertTrue(resp.is_ok())
+        self.assertEqual(len(resp.data), 25)
+        self.assertEqual(get_filing_id(resp.data.page().filings[0]), "filing-24")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,31 @@
+# do not pre-load
+
+import unittest
+from .load_test import FILING_STEPS, format_report, percentile, run_load_test
+from .mock_proxy_server import MockProxyServer
+
+
+class TestLoadTest(unittest.TestCase):
+    def test_percentile(self):
+        values = [float(v) for v in range(1, 101)]
+        self.assertEqual(percentile(values, 50), 50.0)
+        self.assertEqual(percentile(values, 95), 95.0)
+        self.assertEqual(percentile(values, 99), 99.0)
+        self.assertEqual(percentile([3.0], 99), 3.0)
+        self.assertIsNone(percentile([], 50))
+
+    def test_run(self):
+        with MockProxyServer() as server:
+            results = run_load_test(server, sessions=3, iterations=2)
+        self.assertEqual(results["filings"], 6)
+        self.assertEqual(results["exceptions"], [])
+        self.assertEqual(results["error_responses"], 0)
+        self.assertEqual(list(results["steps"]), [name for name, _ in FILING_STEPS])
+        self.assertTrue(all(step["count"] == 6 for step in results["steps"].values()))
+        # Each session reuses its connection to the proxy
+        self.assertLessEqual(results["connections_opened"], 3)
+        self.assertIn("filings/s", format_report(results))
+
+
+if __name__ == "__main__":
+    unittest.main()
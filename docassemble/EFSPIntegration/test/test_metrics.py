@@ -0,0 +1,79 @@
+# do not pre-load
+
+import unittest
+from unittest.mock import MagicMock
+from ..metrics import Histogram, MetricsRegistry, get_registry, render_prometheus
+from ..py_efsp_client import EfspConnection, url_jurisdiction
+from .helpers import make_response
+
+
+class TestHistogram(unittest.TestCase):
+    def test_cumulative(self):
+        hist = Histogram([0.1, 1.0])
+        for value in [0.05, 0.1, 0.5, 3]:
+            hist.observe(value)
+        self.assertEqual(hist.cumulative(), [("0.1", 2), ("1.0", 3), ("+Inf", 4)])
+        self.assertEqual(hist.count, 4)
+        self.assertAlmostEqual(hist.sum, 3.65)
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def test_render(self):
+        registry = MetricsRegistry(buckets=[0.5])
+        for status in [200, 200, 404]:
+            registry.observe(
+                endpoint="codes/courts/{court}/party_types",
+                jurisdiction="illinois",
+                method="GET",
+                status=status,
+                seconds=0.2,
+                request_bytes=0,
+                response_bytes=100,
+            )
+        text = render_prometheus(registry)
+        labels = 'endpoint="codes/courts/{court}/party_types",jurisdiction="illinois",method="GET"'
+        self.assertIn("# TYPE efsp_client_request_duration_seconds histogram", text)
+        self.assertIn(
+            f'efsp_client_request_duration_seconds_bucket{{{labels},le="0.5"}} 3', text
+        )
+        self.assertIn(
+            f'efsp_client_request_duration_seconds_bucket{{{labels},le="+Inf"}} 3', text
+        )
+        self.assertIn(f"efsp_client_request_duration_seconds_count{{{labels}}} 3", text)
+        self.assertIn(f'efsp_client_responses_total{{{labels},status="200"}} 2', text)
+        self.assertIn(f'efsp_client_responses_total{{{labels},status="404"}} 1', text)
+        self.assertIn(f"efsp_client_response_bytes_total{{{labels}}} 300", text)
+        self.assertTrue(text.endswith("\n"))
+
+    def test_connection_records(self):
+        get_registry().reset()
+        conn = EfspConnection(
+            url="https://efile.example.com",
+            api_key="fake-key",
+            default_jurisdiction="illinois",
+        )
+        conn.proxy_client.send = MagicMock(
+            side_effect=lambda req, **kwargs: make_response(req, data=[{"code": 1}])
+        )
+        conn.get_party_types("adams", None)
+        conn.get_party_types("cook", None)
+        labels = ("codes/courts/{court}/party_types", "illinois", "GET")
+        self.assertEqual(get_registry().latency[labels].count, 2)
+        self.assertEqual(get_registry().statuses[labels + ("200",)], 2)
+        self.assertEqual(
+            get_registry().response_bytes[labels], 2 * len(b'[{"code": 1}]')
+        )
+        get_registry().reset()
+
+
+class TestUrlJurisdiction(unittest.TestCase):
+    def test_jurisdiction(self):
+        base = "https://efile.example.com/"
+        self.assertEqual(
+            url_jurisdiction(base + "jurisdictions/texas/codes/courts", base), "texas"
+        )
+        self.assertIsNone(url_jurisdiction(base + "authenticate_user", base))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+# do not pre-load
+
+import os
+import time
+import unittest
+from unittest.mock import patch
+from ..py_efsp_client import EfspConnection
+from .benchmark_flows import FLOWS, format_report, run_benchmarks
+from .mock_proxy_server import MockProxyServer
+
+
+class TestMockProxyServer(unittest.TestCase):
+    def setUp(self):
+        self.server = MockProxyServer().start()
+        self.conn = EfspConnection(
+            url=self.server.url, api_key="any", default_jurisdiction="illinois"
+        )
+
+    def tearDown(self):
+        self.conn.proxy_client.close()
+        self.server.stop()
+
+    def test_serves_fixtures(self):
+        auth = self.conn.authenticate_user()
+        self.assertTrue(auth.is_ok())
+        self.assertEqual(self.conn.tyler_token(), "mock-token")
+        self.assertEqual(self.conn.get_court_info_store().name("adams"), "Adams County")
+        case = self.conn.get_case("adams", "abc")
+        self.assertEqual(case.data["value"]["caseDocketID"]["value"], "02-CM-02778-1")
+        self.assertEqual(self.conn.get_policy("adams").response_code, 404)
+        self.assertEqual(
+            self.server.call_counts["GET cases/courts/{court}/cases/{case}"], 1
+        )
+
+    def test_one_connection(self):
+        # `Session.request` adds settings from the environment, which every call needs
+        # so that they all share one connection
+        with patch.dict(os.environ, {"REQUESTS_CA_BUNDLE": "/tmp/mock-ca.pem"}):
+            self.conn.authenticate_user()
+            self.conn.get_courts()
+            self.conn.get_court("adams")
+        self.assertEqual(self.server.connections_opened, 1)
+
+    def test_callable_fixtures(self):
+        self.server.fixtures["GET codes/courts/{court}/codes"] = (
+            lambda path, query, body: (503, {"path": path})
+        )
+        resp = self.conn.get_court("cook")
+        self.assertEqual(resp.response_code, 503)
+        self.assertIn("/courts/cook/", resp.data["path"])
+
+    def test_latency(self):
+        slow = MockProxyServer(latency=0.1, jitter=0.02, seed=1).start()
+        try:
+            conn = EfspConnection(
+                url=slow.url, api_key="any", default_jurisdiction="illinois"
+            )
+            start = time.perf_counter()
+            conn.get_courts()
+            self.assertGreaterEqual(time.perf_counter() - start, 0.08)
+        finally:
+            slow.stop()
+
+
+class TestBenchmarkFlows(unittest.TestCase):
+    def test_flows(self):
+        with MockProxyServer() as server:
+            results = run_benchmarks(server, repeat=1)
+        self.assertEqual(set(results), set(FLOWS))
+        self.assertEqual(results["court_codes"]["calls"], 11)
+        # One search, then the details of the first 8 cases
+        self.assertEqual(results["search_case_by_name"]["calls"], 9)
+        # get_service_types checks the court's info first
+        self.assertEqual(results["review_preview"]["calls"], 4)
+        self.assertIn("court_codes", format_report(results))
+
+
+if __name__ == "__main__":
+    unittest.main()
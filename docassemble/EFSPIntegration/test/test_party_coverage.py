@@ -0,0 +1,63 @@
+# do not pre-load
+
+import unittest
+from types import SimpleNamespace
+from ..party_coverage import PartyTypeCoverage
+
+PARTY_TYPE_MAP = {
+    "PET": {"code": "PET", "name": "Petitioner", "isrequired": True},
+    "RES": {"code": "RES", "name": "Respondent", "isrequired": "true"},
+    "WIT": {"code": "WIT", "name": "Witness", "isrequired": False},
+}
+
+
+def party(name, party_type=None):
+    p = SimpleNamespace(instanceName=name)
+    if party_type is not None:
+        p.party_type = party_type
+    return p
+
+
+class TestPartyTypeCoverage(unittest.TestCase):
+    def setUp(self):
+        self.coverage = PartyTypeCoverage(PARTY_TYPE_MAP)
+
+    def missing_codes(self):
+        return [p_type["code"] for p_type in self.coverage.missing()]
+
+    def test_nobody(self):
+        self.coverage.sync([], [])
+        self.assertEqual(self.missing_codes(), ["PET", "RES"])
+        self.assertTrue(self.coverage.any_missing())
+
+    def test_covered(self):
+        users = [party("users[0]", "PET"), party("users[1]")]
+        other_parties = [party("other_parties[0]", "WIT")]
+        self.coverage.sync(users, other_parties)
+        self.assertEqual(self.missing_codes(), ["RES"])
+        other_parties[0].party_type = "RES"
+        self.coverage.sync(users, other_parties)
+        self.assertFalse(self.coverage.any_missing())
+        self.assertEqual(self.coverage.counts["WIT"], 0)
+
+    def test_removed_parties(self):
+        users = [party("users[0]", "PET"), party("users[1]", "PET")]
+        other_parties = [party("other_parties[0]", "RES")]
+        self.coverage.sync(users, other_parties)
+        self.assertEqual(self.coverage.counts["PET"], 2)
+        # Deleting the first user renames the second one
+        users = [party("users[0]", "PET")]
+        self.coverage.sync(users, other_parties)
+        self.assertEqual(self.coverage.counts["PET"], 1)
+        self.coverage.sync(users, [])
+        self.assertEqual(self.missing_codes(), ["RES"])
+
+    def test_unnamed_parties(self):
+        users = [SimpleNamespace(party_type="PET"), SimpleNamespace(party_type="RES")]
+        self.coverage.sync(users)
+        self.coverage.sync(users)
+        self.assertEqual(dict(self.coverage.counts), {"PET": 1, "RES": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,467 @@
+# do not pre-load
+
+"""Tests for the parts of py_efsp_client that don't need a running proxy server"""
+
+import pickle
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+import requests
+from .. import py_efsp_client
+from ..py_efsp_client import (
+    ApiResponse,
+    Batch,
+    EfspConnection,
+    CourtInfoStore,
+    MemoryTokenStore,
+    TokenManager,
+    set_connection_pool_size,
+    endpoint_template,
+    payload_breakdown,
+)
+from .helpers import make_response
+
+
+class TestEndpointTemplate(unittest.TestCase):
+    def test_templates(self):
+        base = "https://efile.example.com/"
+        juris = base + "jurisdictions/illinois/"
+        self.assertEqual(
+            endpoint_template(juris + "codes/courts/adams/party_types", base),
+            "codes/courts/{court}/party_types",
+        )
+        self.assertEqual(
+            endpoint_template(juris + "cases/courts/peoria:cr/cases/1234?x=1", base),
+            "cases/courts/{court}/cases/{case}",
+        )
+        self.assertEqual(
+            endpoint_template(juris + "firmattorneyservice/service-contacts/public"),
+            "firmattorneyservice/service-contacts/public",
+        )
+        self.assertEqual(
+            endpoint_template(base + "api_user_settings/serverid", base),
+            "api_user_settings/serverid",
+        )
+
+    def test_base_url_with_path(self):
+        base = "https://example.com/proxy/"
+        self.assertEqual(
+            endpoint_template(base + "jurisdictions/illinois/codes/courts", base),
+            "codes/courts",
+        )
+
+
+class TestPayloadSizes(unittest.TestCase):
+    def setUp(self):
+        self.conn = EfspConnection(
+            url="https://efile.example.com",
+            api_key="fake-key",
+            default_jurisdiction="illinois",
+        )
+        self.conn.proxy_client.send = MagicMock(
+            side_effect=lambda req, **kwargs: make_response(req, data={"ok": True})
+        )
+
+    def tearDown(self):
+        self.conn.proxy_client.close()
+
+    def test_breakdown(self):
+        breakdown = payload_breakdown(
+            {"small": 1, "big": "x" * 100, "medium": "y" * 10}, top_n=2
+        )
+        self.assertEqual([key for key, _ in breakdown], ["big", "medium"])
+
+    def test_records_sizes(self):
+        resp = self.conn.file_for_review("adams", {"users": ["a" * 50]})
+        self.assertTrue(resp.is_ok())
+        stats = self.conn.get_payload_sizes()["filingreview/courts/{court}/filings"]
+        self.assertEqual(stats["calls"], 1)
+        self.assertGreater(stats["request_bytes"], 50)
+        self.assertEqual(stats["response_bytes"], len(b'{"ok": true}'))
+
+    def test_budgets(self):
+        endpoint = "filingreview/courts/{court}/filings"
+        self.conn.set_payload_budget(10, endpoint=endpoint)
+        self.assertTrue(self.conn.file_for_review("adams", {"a": "b" * 20}).is_ok())
+        self.conn.set_payload_budget(10, endpoint=endpoint, hard_limit=True)
+        resp = self.conn.file_for_review("adams", {"a": "b" * 20})
+        self.assertEqual(resp.response_code, 413)
+        self.assertEqual(self.conn.proxy_client.send.call_count, 1)
+        # Other endpoints aren't limited
+        self.assertTrue(
+            self.conn.calculate_filing_fees("adams", {"a": "b" * 20}).is_ok()
+        )
+        self.conn.set_payload_budget(None, endpoint=endpoint)
+        self.assertTrue(self.conn.file_for_review("adams", {"a": "b" * 20}).is_ok())
+
+
+class TestCourtInfoStore(unittest.TestCase):
+    def setUp(self):
+        self.conn = EfspConnection(
+            url="https://efile.example.com",
+            api_key="fake-key",
+            default_jurisdiction="illinois",
+        )
+
+        def fake_send(req, **kwargs):
+            if req.url.endswith("/codes"):
+                return make_response(
+                    req,
+                    data={
+                        "name": "Adams",
+                        "hasconditionalservicetypes": False,
+                        "allowablecardtypes": ["VISA"],
+                    },
+                )
+            return make_response(req, data={"tokens": {}})
+
+        self.conn.proxy_client.send = MagicMock(side_effect=fake_send)
+
+    def tearDown(self):
+        self.conn.proxy_client.close()
+
+    def test_fetches_once(self):
+        store = self.conn.get_court_info_store()
+        self.assertEqual(store.name("adams"), "Adams")
+        self.assertEqual(store.allowable_card_types("adams"), ["VISA"])
+        self.conn.get_service_types("adams", {"some": "vars"})
+        # One for the court codes, one for the service types
+        self.assertEqual(self.conn.proxy_client.send.call_count, 2)
+
+    def test_ttl_and_reauth(self):
+        store = self.conn.get_court_info_store()
+        store.info("adams")
+        self.conn.authenticate_user()
+        store.info("adams")
+        # court, authenticate; codes are the same for every login
+        self.assertEqual(self.conn.proxy_client.send.call_count, 2)
+        store.ttl = 0
+        store.info("adams")
+        self.assertEqual(self.conn.proxy_client.send.call_count, 3)
+
+    def test_failures_not_stored(self):
+        fetch = MagicMock(return_value=ApiResponse(500, "Oops", None))
+        store = CourtInfoStore(fetch)
+        self.assertEqual(store.info("adams"), {})
+        self.assertFalse(store.allows_non_indexed_filing("adams"))
+        self.assertEqual(fetch.call_count, 2)
+
+
+class TestTokenManager(unittest.TestCase):
+    def setUp(self):
+        self.store = MemoryTokenStore()
+        self.conn = self.make_conn()
+
+    def make_conn(self):
+        conn = EfspConnection(
+            url="https://efile.example.com",
+            api_key="fake-key",
+            default_jurisdiction="illinois",
+        )
+        conn.token_manager = TokenManager(
+            conn, self.store, refresh=conn.authenticate_user
+        )
+        conn.proxy_client.send = MagicMock(
+            side_effect=lambda req, **kwargs: make_response(
+                req,
+                data={
+                    "tokens": {
+                        "TYLER-TOKEN-ILLINOIS": "abc",
+                        "TYLER-ID-ILLINOIS": "123",
+                    }
+                },
+            )
+        )
+        return conn
+
+    def tearDown(self):
+        self.conn.proxy_client.close()
+
+    def test_reuses_stored_tokens(self):
+        self.assertTrue(self.conn.get_token_manager().ensure().is_ok())
+        self.assertEqual(self.conn.proxy_client.send.call_count, 1)
+        self.assertEqual(self.conn.tyler_token(), "abc")
+
+        # A new connection with the same store doesn't need to authenticate
+        new_conn = self.make_conn()
+        self.assertTrue(new_conn.get_token_manager().ensure().is_ok())
+        self.assertEqual(new_conn.proxy_client.send.call_count, 0)
+        self.assertEqual(new_conn.tyler_token(), "abc")
+        new_conn.proxy_client.close()
+
+    def test_refreshes_near_expiry(self):
+        manager = self.conn.get_token_manager()
+        manager.ensure()
+        manager.lifetime = manager.refresh_margin + 1
+        self.assertTrue(manager.is_fresh())
+        manager.lifetime = manager.refresh_margin
+        self.assertFalse(manager.is_fresh())
+        manager.ensure()
+        self.assertEqual(self.conn.proxy_client.send.call_count, 2)
+
+    def test_config_login_reused(self):
+        py_efsp_client._config_tokens.values.clear()
+        self.addCleanup(py_efsp_client._config_tokens.values.clear)
+        self.conn.get_token_manager().save({"TYLER-TOKEN-ILLINOIS": "users-own"})
+        new_conn = self.make_conn()
+        self.addCleanup(new_conn.proxy_client.close)
+        for conn in [self.conn, new_conn]:
+            self.assertTrue(conn.get_config_token_manager().ensure().is_ok())
+            self.assertEqual(conn.tyler_token(), "abc")
+        # Only the first call logged in; the second reused the server's token
+        self.assertEqual(self.conn.proxy_client.send.call_count, 1)
+        self.assertEqual(new_conn.proxy_client.send.call_count, 0)
+
+    def test_no_refresh(self):
+        manager = TokenManager(self.conn, MemoryTokenStore())
+        self.assertEqual(manager.ensure().response_code, 401)
+        # Only start background refreshes if they'd work
+        manager.start_background_refresh()
+        self.assertIsNone(manager._timer)
+
+
+class TestReauthOn401(unittest.TestCase):
+    def setUp(self):
+        self.auth_calls = 0
+        self.auth_lock = threading.Lock()
+        py_efsp_client._recent_reauths.clear()
+
+    def make_conn(self, new_token="new"):
+        conn = EfspConnection(
+            url="https://efile.example.com",
+            api_key="fake-key",
+            default_jurisdiction="illinois",
+        )
+        conn.reauthenticate_on_401 = True
+        manager = TokenManager(conn, MemoryTokenStore(), refresh=conn.authenticate_user)
+        manager.can_refresh = True
+        conn.token_manager = manager
+        conn.proxy_client.headers["TYLER-TOKEN-ILLINOIS"] = "old"
+
+        def fake_send(req, **kwargs):
+            if req.url.endswith("/authenticate"):
+                with self.auth_lock:
+                    self.auth_calls += 1
+                return make_response(
+                    req, data={"tokens": {"TYLER-TOKEN-ILLINOIS": new_token}}
+                )
+            if req.headers.get("TYLER-TOKEN-ILLINOIS") == "old":
+                return make_response(req, 401, data=None)
+            return make_response(req, data={"ok": True})
+
+        conn.proxy_client.send = MagicMock(side_effect=fake_send)
+        return conn
+
+    def test_replays_idempotent(self):
+        conn = self.make_conn(new_token="new-1")
+        resp = conn.get_user()
+        self.assertTrue(resp.is_ok())
+        self.assertEqual(self.auth_calls, 1)
+        self.assertEqual(conn.tyler_token(), "new-1")
+
+    def test_does_not_replay_post(self):
+        conn = self.make_conn(new_token="new-2")
+        resp = conn.file_for_review("adams", {})
+        self.assertEqual(resp.response_code, 401)
+        self.assertEqual(self.auth_calls, 0)
+
+    def test_off_by_default(self):
+        conn = self.make_conn(new_token="new-3")
+        conn.reauthenticate_on_401 = False
+        self.assertEqual(conn.get_user().response_code, 401)
+        self.assertEqual(self.auth_calls, 0)
+
+    def test_old_reauths_forgotten(self):
+        conn = self.make_conn()
+        conn.get_token_manager().reauthenticate("old")
+        self.assertEqual(len(py_efsp_client._recent_reauths), 1)
+        later = time.time() + py_efsp_client._RECENT_REAUTH_SECONDS
+        with py_efsp_client._reauth_locks_lock:
+            py_efsp_client._prune_reauths(later)
+        self.assertEqual(py_efsp_client._recent_reauths, {})
+        self.assertEqual(py_efsp_client._reauth_locks, {})
+        conn.proxy_client.close()
+
+    def test_concurrent_401s_share_reauth(self):
+        conns = [self.make_conn(new_token="new-4") for _ in range(5)]
+        results = []
+        threads = [
+            threading.Thread(target=lambda c=c: results.append(c.get_user()))
+            for c in conns
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertTrue(all(resp.is_ok() for resp in results))
+        self.assertEqual(self.auth_calls, 1)
+
+
+class TestPickling(unittest.TestCase):
+    def setUp(self):
+        self.conn = EfspConnection(
+            url="https://efile.example.com",
+            api_key="fake-key",
+            default_jurisdiction="illinois",
+            interview_name="my-interview",
+        )
+        self.conn.proxy_client.headers["TYLER-TOKEN-ILLINOIS"] = "abc"
+        self.conn.proxy_client.send = MagicMock(
+            side_effect=lambda req, **kwargs: make_response(
+                req, data={"name": "Adams", "some_codes": ["x" * 100] * 100}
+            )
+        )
+
+    def test_round_trip(self):
+        self.conn.get_court_info_store().info("adams")
+        restored = pickle.loads(pickle.dumps(self.conn))
+        self.assertNotIn("_proxy_client", restored.__dict__)
+        self.assertEqual(restored.tyler_token(), "abc")
+        self.assertEqual(restored.proxy_client.headers["X-API-KEY"], "fake-key")
+        self.assertEqual(restored.get_session_id(), self.conn.get_session_id())
+        self.assertEqual(restored.get_interview_name(), "my-interview")
+        self.assertEqual(restored.get_court_info_store().courts, {})
+
+    def test_size(self):
+        self.conn.get_court_info_store().info("adams")
+        with_session = len(pickle.dumps(self.conn.__dict__))
+        lightweight = len(pickle.dumps(self.conn))
+        self.assertLess(lightweight, with_session / 3)
+
+    def test_old_pickles(self):
+        session = requests.Session()
+        session.headers["TYLER-TOKEN-ILLINOIS"] = "old-token"
+        state = self.conn.__getstate__()
+        state.pop("auth_headers")
+        state["proxy_client"] = session
+        restored = EfspConnection.__new__(EfspConnection)
+        restored.__setstate__(state)
+        self.assertEqual(restored.tyler_token(), "old-token")
+
+
+class TestSharedPool(unittest.TestCase):
+    def make_conn(self, url="https://efile.example.com"):
+        return EfspConnection(
+            url=url, api_key="fake-key", default_jurisdiction="illinois"
+        )
+
+    def test_shared_by_host(self):
+        conn_a, conn_b = self.make_conn(), self.make_conn()
+        other = self.make_conn("https://other.example.com")
+        url = conn_a.full_url("codes/courts")
+        adapter = conn_a.proxy_client.get_adapter(url)
+        self.assertIs(adapter, conn_b.proxy_client.get_adapter(url))
+        self.assertIsNot(
+            adapter, other.proxy_client.get_adapter(other.full_url("codes/courts"))
+        )
+
+        # Headers stay with their own connection
+        conn_a.proxy_client.headers["TYLER-TOKEN-ILLINOIS"] = "abc"
+        self.assertIsNone(conn_b.tyler_token())
+
+        # Closing one connection doesn't close the pool for the others
+        conn_a.proxy_client.close()
+        self.assertIs(adapter, conn_b.proxy_client.get_adapter(url))
+
+    def test_pool_size(self):
+        try:
+            set_connection_pool_size(25)
+            conn = self.make_conn()
+            adapter = conn.proxy_client.get_adapter(conn.full_url("codes/courts"))
+            self.assertEqual(adapter._pool_maxsize, 25)
+        finally:
+            set_connection_pool_size(10)
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.conn = EfspConnection(
+            url="https://efile.example.com",
+            api_key="fake-key",
+            default_jurisdiction="illinois",
+        )
+        self.in_flight = 0
+        self.most_in_flight = 0
+        self.lock = threading.Lock()
+
+        def slow_send(req, **kwargs):
+            with self.lock:
+                self.in_flight += 1
+                self.most_in_flight = max(self.most_in_flight, self.in_flight)
+            time.sleep(0.1)
+            with self.lock:
+                self.in_flight -= 1
+            return make_response(req, data={"url": req.url})
+
+        self.conn.proxy_client.send = MagicMock(side_effect=slow_send)
+
+    def test_runs_concurrently(self):
+        start = time.monotonic()
+        with self.conn.batch() as b:
+            self.assertIsInstance(b, Batch)
+            firm = b.get_firm()
+            users = b.get_user_list()
+            attorneys = b.get_attorney_list()
+            court = b.get_court("adams")
+            self.assertFalse(firm.done())
+        elapsed = time.monotonic() - start
+        self.assertLess(elapsed, 0.35)
+        self.assertEqual(self.most_in_flight, 4)
+        self.assertTrue(firm.result().data["url"].endswith("firmattorneyservice/firm"))
+        self.assertTrue(users.result().is_ok())
+        self.assertTrue(attorneys.result().is_ok())
+        self.assertTrue(court.result().data["url"].endswith("courts/adams/codes"))
+        self.assertEqual(
+            self.conn.get_payload_sizes()["codes/courts/{court}/codes"]["calls"], 1
+        )
+
+    def test_bounded(self):
+        with self.conn.batch(max_workers=2) as b:
+            futures = [b.get_court(f"court{i}") for i in range(5)]
+        self.assertEqual(self.most_in_flight, 2)
+        self.assertTrue(all(f.result().is_ok() for f in futures))
+
+    def test_as_completed(self):
+        b = self.conn.batch(max_workers=2)
+        b.submit(lambda: time.sleep(0.2) or "slow")
+        b.submit(lambda: "fast")
+        self.assertEqual([f.result() for f in b.as_completed()], ["fast", "slow"])
+
+        b = self.conn.batch(max_workers=1)
+        b.submit(lambda: "first")
+        b.submit(lambda: time.sleep(0.1))
+        unstarted = b.get_firm()
+        done = b.as_completed()
+        next(done)
+        done.close()
+        self.assertTrue(unstarted.cancelled())
+        self.conn.proxy_client.send.assert_not_called()
+
+    def test_exceptions_and_cancelling(self):
+        with self.conn.batch() as b:
+            bad = b.submit(lambda: 1 / 0)
+        with self.assertRaises(ZeroDivisionError):
+            bad.result()
+
+        with self.assertRaises(ValueError):
+            with self.conn.batch() as b:
+                skipped = b.get_firm()
+                raise ValueError("stop")
+        self.assertTrue(skipped.cancelled())
+        self.conn.proxy_client.send.assert_not_called()
+
+    def test_unauthorized_hook_runs_on_calling_thread(self):
+        self.conn.proxy_client.send = MagicMock(
+            side_effect=lambda req, **kwargs: make_response(req, 401, "no")
+        )
+        threads = []
+        self.conn._on_unauthorized = lambda: threads.append(threading.current_thread())
+        with self.conn.batch() as b:
+            b.get_firm()
+            b.get_user_list()
+        self.assertEqual(threads, [threading.current_thread()])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,182 @@
+# do not pre-load
+
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from requests import Request
+from ..py_efsp_client import EfspConnection
+from ..redaction import REDACTED, redact_body, redact_headers, redact_url
+from ..slow_calls import SlowCallCapture, set_slow_call_capture
+from ..tracing import MemorySpanExporter, set_span_exporter
+from .helpers import make_response
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(0.2)
+        body = json.dumps({"caseTrackingID": "abc", "token": "secret-token"}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestRedaction(unittest.TestCase):
+    def test_redact(self):
+        self.assertEqual(
+            json.loads(
+                redact_body(
+                    '{"username": "a", "password": "b", "x": [{"cardNumber": 1}]}'
+                )
+            ),
+            {"username": "a", "password": REDACTED, "x": [{"cardNumber": REDACTED}]},
+        )
+        self.assertEqual(redact_body(b"\xff\xfe"), "<2 bytes of binary data>")
+        self.assertEqual(redact_body("<html>"), "<6 characters of non-JSON data>")
+        self.assertTrue(
+            redact_body('{"a": "' + "x" * 100 + '"}', 10).startswith('{"a": "xxx')
+        )
+        self.assertEqual(
+            redact_headers({"TYLER-TOKEN-ILLINOIS": "t", "Accept": "json"}),
+            {"TYLER-TOKEN-ILLINOIS": REDACTED, "Accept": "json"},
+        )
+        self.assertEqual(
+            redact_url("https://a/b?api_key=k&name=n"),
+            f"https://a/b?api_key={REDACTED.replace('[', '%5B').replace(']', '%5D')}&name=n",
+        )
+
+
+class TestCaptureRedaction(unittest.TestCase):
+    def test_no_names(self):
+        req = Request(
+            "GET",
+            "https://efile.example.com/jurisdictions/illinois/cases/courts/adams/cases",
+            params={
+                "first_name": "Zebulon",
+                "last_name": "Quixote",
+                "business_name": "Quixote Farms",
+            },
+        ).prepare()
+        party = {
+            "firstName": "Zebulon",
+            "entityRepresentation": {
+                "value": {
+                    "personName": {"personGivenName": {"value": "Zebulon"}},
+                    "personSurName": {"value": "Quixote"},
+                    "contactMailingAddress": {"streetFullText": "1 Windmill Ln"},
+                    "email": "zeb@example.com",
+                }
+            },
+            "caseTrackingID": "abc",
+        }
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "slow.jsonl")
+            capture = SlowCallCapture(path, sample_rate=1.0)
+            capture.capture(
+                req,
+                make_response(req, data=[party]),
+                endpoint="cases/courts/{court}/cases",
+                timings={"total": 3.0},
+            )
+            capture.close()
+            with open(path) as f:
+                text = f.read()
+        for private in ["Zebulon", "Quixote", "Windmill", "zeb@"]:
+            self.assertNotIn(private, text)
+        self.assertIn("abc", text)
+
+    def test_no_names_in_all_vars(self):
+        with open(Path(__file__).parent / "opening_affidavit_adams.json") as f:
+            all_vars = f.read()
+        req = Request(
+            "POST",
+            "https://efile.example.com/jurisdictions/illinois/filingreview/courts/adams/filings",
+            data=all_vars,
+        ).prepare()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "slow.jsonl")
+            capture = SlowCallCapture(
+                path, sample_rate=1.0, max_body_bytes=len(all_vars) * 2
+            )
+            capture.capture(
+                req,
+                make_response(req, data={}),
+                endpoint="filingreview/courts/{court}/filings",
+                timings={"total": 3.0},
+            )
+            capture.close()
+            with open(path) as f:
+                body = json.loads(json.loads(f.read())["request"]["body"])
+        self.assertEqual(body["users"]["elements"][0]["name"]["first"], REDACTED)
+        self.assertEqual(body["users"]["elements"][0]["name"]["last"], REDACTED)
+        self.assertEqual(body["court_id"], "adams")
+        for private in ["Bryce", "Willey", "Bob Bad"]:
+            self.assertNotIn(private, json.dumps(body))
+
+
+class TestSlowCalls(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.conn = EfspConnection(
+            url=f"http://127.0.0.1:{self.server.server_address[1]}",
+            api_key="fake-key",
+            default_jurisdiction="illinois",
+        )
+        self.spans = MemorySpanExporter()
+        set_span_exporter(self.spans)
+
+    def tearDown(self):
+        set_span_exporter(None)
+        set_slow_call_capture(None)
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_timings(self):
+        self.conn.self_change_password("old", "new")
+        attrs = self.spans.spans[-1].attributes
+        self.assertGreater(attrs["connect"], 0)
+        self.assertGreaterEqual(attrs["ttfb"], 0.2)
+        self.assertGreaterEqual(attrs["body"], 0)
+        self.assertGreaterEqual(attrs["total"], attrs["ttfb"])
+
+    def test_slow_log_and_capture(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "slow.jsonl")
+            set_slow_call_capture(path, sample_rate=1.0)
+            self.conn.set_slow_call_threshold(0.1)
+            with self.assertLogs(level="WARNING") as logs:
+                self.conn.self_change_password("hunter2", "hunter3")
+            self.assertIn("Slow call: POST on adminusers/user/password", logs.output[0])
+            set_slow_call_capture(None)
+            with open(path) as f:
+                records = [json.loads(line) for line in f]
+        self.assertEqual(len(records), 1)
+        record = records[0]
+        self.assertEqual(record["endpoint"], "adminusers/user/password")
+        self.assertEqual(record["request"]["headers"]["X-API-KEY"], REDACTED)
+        self.assertNotIn("hunter", json.dumps(record))
+        self.assertEqual(record["response"]["status"], 200)
+        self.assertEqual(
+            json.loads(record["response"]["body"]),
+            {"caseTrackingID": "abc", "token": REDACTED},
+        )
+
+    def test_fast_calls_not_logged(self):
+        self.conn.set_slow_call_threshold(5)
+        with self.assertNoLogs(level="WARNING"):
+            self.conn.self_change_password("old", "new")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+# do not pre-load
+
+import os
+import tempfile
+import unittest
+from ..py_efsp_client import EfspConnection
+from ..status_poller import FilingStatusPoller, filing_status_code
+from ..transports import FakeTransport
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestFilingStatusPoller(unittest.TestCase):
+    def setUp(self):
+        self.statuses = {}
+
+        def status(path, query, body):
+            filing_id = path.split("/")[-2]
+            if filing_id not in self.statuses:
+                return (404, {"error": "no filing"})
+            return {"filingStatus": {"filingStatusCode": self.statuses[filing_id]}}
+
+        self.transport = FakeTransport(
+            {"GET filingreview/courts/{court}/filings/{filing}/status": status}
+        )
+        self.conn = EfspConnection(
+            url="http://fake-proxy/",
+            api_key="any",
+            default_jurisdiction="illinois",
+            transport=self.transport,
+        )
+        self.clock = FakeClock()
+        self.events = []
+        self.poller = FilingStatusPoller(
+            self.conn,
+            self.events.append,
+            min_interval=10,
+            max_interval=100,
+            clock=self.clock,
+        )
+
+    def checks(self):
+        return self.transport.call_counts[
+            "GET filingreview/courts/{court}/filings/{filing}/status"
+        ]
+
+    def test_status_code(self):
+        self.assertEqual(
+            filing_status_code({"filingStatus": {"statusText": {"value": "Accepted"}}}),
+            "accepted",
+        )
+        self.assertIsNone(filing_status_code(None))
+        self.assertIsNone(filing_status_code({"filingStatus": "odd"}))
+
+    def test_events_and_terminal_states(self):
+        self.statuses = {"a": "submitted", "b": "accepted"}
+        self.poller.add("adams", "a")
+        self.poller.add("adams", "b")
+        self.poller.add("adams", "a")
+        events = self.poller.poll_once()
+        self.assertEqual(self.events, events)
+        self.assertEqual(
+            sorted((e.filing_id, e.old_status, e.new_status) for e in events),
+            [("a", None, "submitted"), ("b", None, "accepted")],
+        )
+        self.assertEqual([f.filing_id for f in self.poller.pending()], ["a"])
+        # Nothing is due yet
+        self.assertEqual(self.poller.poll_once(), [])
+        self.assertEqual(self.checks(), 2)
+
+        self.statuses["a"] = "rejected"
+        self.clock.sleep(10)
+        (event,) = self.poller.poll_once()
+        self.assertEqual(
+            (event.old_status, event.new_status), ("submitted", "rejected")
+        )
+        self.assertIsNone(self.poller.next_check_in())
+
+    def test_backoff(self):
+        self.statuses = {"a": "submitted"}
+        self.poller.add("adams", "a")
+        intervals = []
+        for _ in range(6):
+            self.poller.poll_once()
+            filing = self.poller.filings[("adams", "a")]
+            intervals.append(filing.interval)
+            self.clock.sleep(filing.interval)
+        self.assertEqual(intervals, [10, 20, 40, 80, 100, 100])
+
+        self.statuses["a"] = "underreview"
+        self.poller.poll_once()
+        self.assertEqual(filing.interval, 10)
+
+    def test_old_filings_start_slow(self):
+        self.statuses = {"a": "submitted"}
+        self.poller.add(
+            "adams", "a", submitted_at=self.clock() - 500, status="submitted"
+        )
+        self.poller.poll_once()
+        self.assertEqual(self.poller.filings[("adams", "a")].interval, 50)
+
+    def test_errors_back_off(self):
+        self.poller.add("adams", "missing")
+        self.poller.poll_once()
+        filing = self.poller.filings[("adams", "missing")]
+        self.assertEqual(
+            (filing.failures, filing.status, filing.interval), (1, None, 10)
+        )
+        self.assertEqual(self.events, [])
+
+    def test_limit_and_concurrency(self):
+        self.statuses = {str(idx): "submitted" for idx in range(20)}
+        for filing_id in self.statuses:
+            self.poller.add("adams", filing_id)
+        self.assertEqual(len(self.poller.poll_once(limit=5)), 5)
+        self.assertEqual(len(self.poller.poll_once()), 15)
+        self.assertEqual(self.checks(), 20)
+
+    def test_run_until_done(self):
+        self.statuses = {"a": "submitted"}
+        self.poller.add("adams", "a")
+
+        def sleep(seconds):
+            self.clock.sleep(seconds)
+            if self.clock() >= 1100:
+                self.statuses["a"] = "accepted"
+
+        events = self.poller.run(sleep=sleep)
+        self.assertEqual([e.new_status for e in events], ["submitted", "accepted"])
+        self.assertEqual(self.clock(), 1150)
+
+        self.poller.add("adams", "b")
+        self.statuses["b"] = "submitted"
+        self.assertEqual(len(self.poller.run(timeout=30, sleep=self.clock.sleep)), 1)
+
+    def test_save_and_load(self):
+        self.statuses = {"a": "submitted"}
+        self.poller.add("adams", "a")
+        self.poller.poll_once()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "filings.json")
+            self.assertEqual(len(FilingStatusPoller.load(self.conn, path).filings), 0)
+            self.poller.save(path)
+            loaded = FilingStatusPoller.load(self.conn, path, clock=self.clock)
+        filing = loaded.filings[("adams", "a")]
+        self.assertEqual((filing.status, filing.interval), ("submitted", 10))
+        self.assertEqual(loaded.poll_once(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
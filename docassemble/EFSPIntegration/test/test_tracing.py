@@ -0,0 +1,99 @@
+# do not pre-load
+
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+from ..py_efsp_client import EfspConnection
+from ..tracing import (
+    JsonlFileExporter,
+    MemorySpanExporter,
+    current_span,
+    set_span_exporter,
+    span,
+)
+from .helpers import make_response
+
+
+class TestSpans(unittest.TestCase):
+    def setUp(self):
+        self.exporter = MemorySpanExporter()
+        set_span_exporter(self.exporter)
+        self.conn = EfspConnection(
+            url="https://efile.example.com",
+            api_key="fake-key",
+            default_jurisdiction="illinois",
+        )
+        self.conn.proxy_client.send = MagicMock(
+            side_effect=lambda req, **kwargs: make_response(req, data={"a": 1})
+        )
+
+    def tearDown(self):
+        set_span_exporter(None)
+
+    def test_call_span(self):
+        self.conn.get_court("adams")
+        self.assertEqual(len(self.exporter.spans), 1)
+        call = self.exporter.spans[0]
+        self.assertEqual(call.name, "proxy_call")
+        self.assertIsNone(call.parent_id)
+        self.assertGreaterEqual(call.duration, 0)
+        self.assertEqual(call.attributes["endpoint"], "codes/courts/{court}/codes")
+        self.assertEqual(call.attributes["jurisdiction"], "illinois")
+        self.assertEqual(call.attributes["status"], 200)
+        self.assertEqual(call.attributes["response_bytes"], len(b'{"a": 1}'))
+        self.assertEqual(call.attributes["retries"], 0)
+        self.assertEqual(call.attributes["session_id"], self.conn.get_session_id())
+        sent = self.conn.proxy_client.send.call_args[0][0]
+        self.assertEqual(call.attributes["request_id"], sent.headers["efsp-request-id"])
+
+    def test_flow_nesting(self):
+        with self.conn.flow("review screen", court_id="adams") as flow:
+            self.conn.get_court_info_store().get("adams")
+            self.conn.get_court_info_store().get("adams")
+            with self.conn.batch() as b:
+                b.get_firm()
+        self.assertIsNone(current_span())
+        by_name = {}
+        for finished in self.exporter.spans:
+            by_name.setdefault(finished.name, []).append(finished)
+        self.assertEqual(
+            [s.attributes["cache_hit"] for s in by_name["court_info"]], [False, True]
+        )
+        calls = by_name["proxy_call"]
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(calls[0].parent_id, by_name["court_info"][0].span_id)
+        # The batched call ran on another thread, but is still in the flow
+        self.assertEqual(calls[1].parent_id, flow.span_id)
+        self.assertTrue(all(s.trace_id == flow.trace_id for s in self.exporter.spans))
+        self.assertIs(self.exporter.spans[-1], flow)
+        self.assertEqual(flow.attributes["kind"], "flow")
+
+    def test_errors_recorded(self):
+        with self.assertRaises(ValueError):
+            with span("broken"):
+                raise ValueError("nope")
+        self.assertIn("nope", self.exporter.spans[0].attributes["error"])
+
+
+class TestJsonlFileExporter(unittest.TestCase):
+    def test_writes_lines(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "spans.jsonl")
+            set_span_exporter(JsonlFileExporter(path))
+            try:
+                with span("outer"):
+                    with span("inner", endpoint="codes/courts"):
+                        pass
+            finally:
+                set_span_exporter(None)
+            with open(path) as f:
+                lines = [json.loads(line) for line in f]
+        self.assertEqual([line["name"] for line in lines], ["inner", "outer"])
+        self.assertEqual(lines[0]["parent_id"], lines[1]["span_id"])
+        self.assertEqual(lines[0]["attributes"], {"endpoint": "codes/courts"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+# do not pre-load
+
+import pickle
+import unittest
+from ..py_efsp_client import EfspConnection
+from ..transports import FakeTransport, PooledTransport, RequestsTransport
+from .benchmark_send import BENCHMARKS, format_report, run_benchmarks
+from .mock_proxy_server import MockProxyServer, default_fixtures
+
+
+class TestFakeTransport(unittest.TestCase):
+    def setUp(self):
+        self.transport = FakeTransport(default_fixtures())
+        self.conn = EfspConnection(
+            url="http://fake-proxy/",
+            api_key="any",
+            default_jurisdiction="illinois",
+            transport=self.transport,
+        )
+
+    def test_fixtures(self):
+        self.assertTrue(self.conn.authenticate_user().is_ok())
+        self.assertEqual(self.conn.tyler_token(), "mock-token")
+        self.assertEqual(self.conn.get_court("adams").data["name"], "Adams County")
+        self.assertEqual(self.conn.get_policy("adams").response_code, 404)
+        self.assertEqual(
+            self.transport.call_counts["GET codes/courts/{court}/codes"], 1
+        )
+        self.assertEqual(
+            self.transport.requests[-1].headers["TYLER-TOKEN-ILLINOIS"], "mock-token"
+        )
+
+    def test_handlers(self):
+        seen = []
+
+        def fees(path, query, body):
+            seen.append(body)
+            return 400, {"error": "bad"}
+
+        self.transport.handlers["POST filingreview/courts/{court}/filing/fees"] = fees
+        resp = self.conn.calculate_filing_fees("adams", {"a": 1})
+        self.assertEqual(resp.response_code, 400)
+        self.assertEqual(seen, [{"a": 1}])
+
+    def test_not_pickled(self):
+        conn = pickle.loads(pickle.dumps(self.conn))
+        self.assertIsInstance(conn.get_transport(), RequestsTransport)
+        self.assertIs(self.conn.get_transport(), self.transport)
+
+    def test_benchmarks(self):
+        results = run_benchmarks(iterations=5)
+        self.assertEqual(set(results), set(BENCHMARKS))
+        self.assertIn("retry_after_401", format_report(results))
+
+
+class TestNetworkTransports(unittest.TestCase):
+    def test_requests_and_pooled(self):
+        with MockProxyServer() as server:
+            for transport in [RequestsTransport(), PooledTransport(server.url)]:
+                conn = EfspConnection(
+                    url=server.url,
+                    api_key="any",
+                    default_jurisdiction="illinois",
+                    transport=transport,
+                )
+                self.assertEqual(conn.get_courts().data[0], "adams")
+                transport.close()
+            self.assertEqual(server.call_counts["GET codes/courts"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
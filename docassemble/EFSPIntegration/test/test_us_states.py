@@ -0,0 +1,43 @@
+# do not pre-load
+
+import importlib.util
+import unittest
+from ..us_states import US_STATE_CODES, state_name_to_code
+from .benchmark_imports import format_report, run_benchmarks
+
+HAS_PYCOUNTRY = importlib.util.find_spec("pycountry") is not None
+
+
+class TestStateNameToCode(unittest.TestCase):
+    def test_table(self):
+        self.assertEqual(state_name_to_code("illinois"), "IL")
+        self.assertEqual(state_name_to_code(" New York "), "NY")
+        self.assertEqual(state_name_to_code("Virgin Islands, U.S."), "VI")
+        self.assertEqual(len(US_STATE_CODES), 50 + 1 + 6)
+
+    @unittest.skipUnless(HAS_PYCOUNTRY, "pycountry isn't installed")
+    def test_matches_pycountry(self):
+        import pycountry
+
+        for subdivision in pycountry.subdivisions.get(country_code="US"):
+            self.assertEqual(
+                US_STATE_CODES[subdivision.name.lower()], subdivision.code[3:]
+            )
+        self.assertEqual(state_name_to_code("Ontario"), "ON")
+        self.assertEqual(state_name_to_code("Not a state"), "Not a state")
+
+
+class TestImports(unittest.TestCase):
+    def test_no_eager_imports(self):
+        modules = [
+            "docassemble.EFSPIntegration.us_states",
+            "docassemble.EFSPIntegration.py_efsp_client",
+        ]
+        results = run_benchmarks(modules, repeat=1)
+        for module in modules:
+            self.assertEqual(results[module]["eager"], [], module)
+        self.assertIn("us_states", format_report(results))
+
+
+if __name__ == "__main__":
+    unittest.main()
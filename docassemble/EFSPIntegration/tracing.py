@@ -0,0 +1,158 @@
+"""
+Spans that record how long each call to the E-file proxy server took, and what happened.
+
+Every call made through an [EfspConnection](#EfspConnection) is a span. Calls made inside
+a `with proxy_conn.flow("review screen"):` block are nested under that flow's span, so
+the waterfall of calls for a slow interview page can be put back together later.
+Spans are only kept if an exporter is set, i.e.
+`set_span_exporter(JsonlFileExporter("/tmp/efsp_spans.jsonl"))`.
+"""
+
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+from uuid import uuid4
+
+__all__ = [
+    "Span",
+    "SpanExporter",
+    "JsonlFileExporter",
+    "MemorySpanExporter",
+    "set_span_exporter",
+    "get_span_exporter",
+    "current_span",
+    "use_parent",
+    "span",
+]
+
+
+class Span:
+    """One timed piece of work. `attributes` holds what's known about it, like the
+    endpoint template, status code and number of bytes sent."""
+
+    def __init__(
+        self, name: str, parent: Optional["Span"] = None, **attributes: Any
+    ) -> None:
+        self.name = name
+        self.span_id: str = uuid4().hex[:16]
+        self.trace_id: str = parent.trace_id if parent else uuid4().hex
+        self.parent_id: Optional[str] = parent.span_id if parent else None
+        self.start = time.time()
+        self._start_monotonic = time.monotonic()
+        self.duration: Optional[float] = None
+        self.attributes: Dict[str, Any] = attributes
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def end(self) -> None:
+        if self.duration is None:
+            self.duration = time.monotonic() - self._start_monotonic
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "duration": self.duration,
+            "attributes": self.attributes,
+        }
+
+
+class SpanExporter:
+    """Where finished spans go. Subclasses override `export`."""
+
+    def export(self, span: Span) -> None:
+        pass
+
+
+class JsonlFileExporter(SpanExporter):
+    """Appends each finished span to a file, as one JSON object per line"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(line + "\n")
+
+
+class MemorySpanExporter(SpanExporter):
+    """Keeps finished spans in a list; mostly useful for tests"""
+
+    def __init__(self) -> None:
+        self.spans: List[Span] = []
+
+    def export(self, span: Span) -> None:
+        self.spans.append(span)
+
+
+_exporter: Optional[SpanExporter] = None
+_local = threading.local()
+
+
+def set_span_exporter(exporter: Optional[SpanExporter]) -> None:
+    """Sets where every span in this process is sent. `None` stops exporting spans."""
+    global _exporter
+    _exporter = exporter
+
+
+def get_span_exporter() -> Optional[SpanExporter]:
+    return _exporter
+
+
+def _stack() -> List[Span]:
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def current_span() -> Optional[Span]:
+    """The innermost span that's open on this thread"""
+    stack = _stack()
+    return stack[-1] if stack else None
+
+
+@contextmanager
+def use_parent(parent: Optional[Span]) -> Iterator[None]:
+    """Nests spans started on this thread under `parent`, i.e. in another thread's
+    flow"""
+    if parent is None:
+        yield
+        return
+    stack = _stack()
+    stack.append(parent)
+    try:
+        yield
+    finally:
+        stack.remove(parent)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """Times the body of the `with` block, nested under the current span (if any)"""
+    new_span = Span(name, current_span(), **attributes)
+    stack = _stack()
+    stack.append(new_span)
+    try:
+        yield new_span
+    except BaseException as ex:
+        new_span.set(error=repr(ex))
+        raise
+    finally:
+        stack.remove(new_span)
+        new_span.end()
+        if _exporter is not None:
+            try:
+                _exporter.export(new_span)
+            except Exception:
+                # Losing a span shouldn't ever break the call it's about
+                logging.getLogger(__name__).exception(f"Couldn't export span {name}")
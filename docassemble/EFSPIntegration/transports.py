@@ -0,0 +1,298 @@
+"""
+Transports send prepared requests to the proxy and return its responses. An
+[EfspConnection](#EfspConnection) sends everything through one:
+
+* [PooledTransport](#PooledTransport): shares keep-alive connections to each proxy
+  host with every other connection in this process, like a connection's own
+  `proxy_client` session does
+* [RequestsTransport](#RequestsTransport): a plain `requests.Session`, with its own
+  connections
+* [FakeTransport](#FakeTransport): answers from Python functions in this process,
+  without any network, for fast tests and benchmarks
+
+```
+conn = EfspConnection(
+    url="http://proxy/", api_key="any", transport=FakeTransport(default_fixtures())
+)
+```
+
+Without one, a connection uses a `RequestsTransport` with its `proxy_client` session.
+"""
+
+import http.client
+import json
+from abc import ABC, abstractmethod
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+from requests import PreparedRequest, Response
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from .endpoints import endpoint_template
+
+__all__ = [
+    "Transport",
+    "RequestsTransport",
+    "PooledTransport",
+    "FakeTransport",
+    "build_response",
+    "set_connection_pool_size",
+]
+
+
+class Transport(ABC):
+    """Sends requests to the proxy. Subclasses implement `send`."""
+
+    @abstractmethod
+    def send(self, request: PreparedRequest, **kwargs) -> Response:
+        """Sends `request`, and returns the response with its body already read.
+
+        Args:
+          kwargs: the same settings that `requests.Session.send` takes, like `stream`
+              and `timeout`. Transports that don't use the network can ignore them
+        """
+
+    def close(self) -> None:
+        pass
+
+
+def build_response(
+    request: PreparedRequest,
+    status: int,
+    content: bytes = b"",
+    *,
+    headers: Optional[Dict[str, str]] = None,
+    reason: Optional[str] = None,
+    encoding: str = "utf-8",
+    elapsed: float = 0.0,
+) -> Response:
+    """Makes a `requests.Response` to `request`, for transports that don't get one from
+    the network"""
+    resp = Response()
+    resp.status_code = status
+    resp.reason = reason or http.client.responses.get(status, "")
+    resp.headers = CaseInsensitiveDict(headers or {})
+    resp.encoding = encoding
+    resp._content = content
+    resp.url = request.url or ""
+    resp.request = request
+    resp.elapsed = timedelta(seconds=elapsed)
+    return resp
+
+
+# Connection pools shared by every EfspConnection in this process, one per proxy host,
+# so that connections (and their TLS handshakes) are reused across interviews,
+# including by connections that were just unpickled.
+_shared_adapters: Dict[str, HTTPAdapter] = {}
+_shared_adapters_lock = threading.Lock()
+_pool_settings: Dict[str, Any] = {
+    "pool_connections": 4,
+    "pool_maxsize": 10,
+    "pool_block": False,
+}
+
+
+def set_connection_pool_size(
+    pool_maxsize: int, *, pool_connections: int = 4, pool_block: bool = False
+) -> None:
+    """Sets how many connections to keep open to each proxy host, for all connections in
+    this process. Does nothing if the size hasn't changed.
+
+    Args:
+      pool_maxsize: how many connections to a host to keep alive for reuse
+      pool_connections: how many different pools (i.e. http and https) to keep per host
+      pool_block: if true, wait for a free connection instead of opening more than
+          `pool_maxsize` at once
+    """
+    new_settings = {
+        "pool_connections": pool_connections,
+        "pool_maxsize": pool_maxsize,
+        "pool_block": pool_block,
+    }
+    with _shared_adapters_lock:
+        if new_settings == _pool_settings:
+            return
+        _pool_settings.update(new_settings)
+        # Sessions already using the old pools keep them until they're done
+        _shared_adapters.clear()
+
+
+def _host_prefix(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}/"
+
+
+# How long the call being made on this thread has spent connecting and waiting
+_call_timing = threading.local()
+
+
+def _add_timing(phase: str, seconds: float) -> None:
+    timings = getattr(_call_timing, "timings", None)
+    if timings is not None:
+        timings[phase] = timings.get(phase, 0.0) + seconds
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        start = time.monotonic()
+        try:
+            super().connect()
+        finally:
+            _add_timing("connect", time.monotonic() - start)
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        start = time.monotonic()
+        try:
+            super().connect()
+        finally:
+            _add_timing("connect", time.monotonic() - start)
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedHTTPAdapter(HTTPAdapter):
+    """Records how long opening new connections (including the TLS handshake) takes"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+
+def _shared_adapter(url: str) -> HTTPAdapter:
+    prefix = _host_prefix(url)
+    with _shared_adapters_lock:
+        if prefix not in _shared_adapters:
+            _shared_adapters[prefix] = _TimedHTTPAdapter(**_pool_settings)
+        return _shared_adapters[prefix]
+
+
+class _PooledSession(requests.Session):
+    """A session that sends everything to the proxy through the shared pool for its host.
+
+    The session itself only holds this connection's headers and cookies, which
+    are merged into each request as it's prepared. Closing it leaves the shared
+    pool open for everyone else.
+    """
+
+    def __init__(self, base_url: str):
+        super().__init__()
+        self.mount(_host_prefix(base_url), _shared_adapter(base_url))
+
+    def close(self) -> None:
+        for adapter in self.adapters.values():
+            if adapter not in _shared_adapters.values():
+                adapter.close()
+
+
+def _pooled_session(base_url: str) -> requests.Session:
+    """A new session that uses the process-wide connection pool for the proxy's host"""
+    return _PooledSession(base_url)
+
+
+class RequestsTransport(Transport):
+    """Sends requests with a `requests.Session`: a new one with its own connections,
+    unless one is given"""
+
+    def __init__(self, session: Optional[requests.Session] = None):
+        self.session = session if session is not None else requests.Session()
+
+    def send(self, request: PreparedRequest, **kwargs) -> Response:
+        # Like `Session.request` does, so requests sent either way share a connection
+        # pool. i.e. if `REQUESTS_CA_BUNDLE` is set, the verify settings differ
+        settings = self.session.merge_environment_settings(
+            request.url,
+            kwargs.pop("proxies", {}),
+            kwargs.pop("stream", None),
+            kwargs.pop("verify", None),
+            kwargs.pop("cert", None),
+        )
+        return self.session.send(request, **settings, **kwargs)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class PooledTransport(RequestsTransport):
+    """Sends requests through the connection pool for `base_url`'s host that's shared
+    by the whole process. See [set_connection_pool_size](#set_connection_pool_size)."""
+
+    def __init__(self, base_url: str):
+        super().__init__(_pooled_session(base_url))
+
+
+class FakeTransport(Transport):
+    """Answers requests by calling Python functions, without opening any sockets.
+
+    Args:
+      handlers: the responses, keyed by method and endpoint template like
+          `"GET codes/courts/{court}/codes"` (the same as the fixtures of
+          [MockProxyServer](#MockProxyServer)). Values are the JSON data to respond
+          with, or functions that take the request's path, query params and JSON body,
+          and return the data (or a `(status, data)` tuple)
+      latency: seconds to wait before every response
+    """
+
+    def __init__(
+        self, handlers: Optional[Dict[str, Any]] = None, *, latency: float = 0.0
+    ):
+        self.handlers: Dict[str, Any] = dict(handlers or {})
+        self.latency = latency
+        self.call_counts: Counter = Counter()
+        self.requests: List[PreparedRequest] = []
+        self._lock = threading.Lock()
+
+    def send(self, request: PreparedRequest, **kwargs) -> Response:
+        parts = urlsplit(request.url or "")
+        key = f"{request.method} {endpoint_template(parts.path)}"
+        with self._lock:
+            self.call_counts[key] += 1
+            self.requests.append(request)
+        status, data = self._respond(key, parts.path, parse_qs(parts.query), request)
+        if self.latency:
+            time.sleep(self.latency)
+        return build_response(
+            request,
+            status,
+            json.dumps(data).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            elapsed=self.latency,
+        )
+
+    def _respond(
+        self, key: str, path: str, query: Dict[str, List[str]], request: PreparedRequest
+    ) -> Tuple[int, Any]:
+        if key not in self.handlers:
+            return 404, {"error": f"The fake transport doesn't handle {key}"}
+        handler = self.handlers[key]
+        if not callable(handler):
+            return 200, handler
+        body: Any = request.body
+        if isinstance(body, bytes):
+            body = body.decode("utf-8", errors="replace")
+        try:
+            body = json.loads(body) if body else None
+        except ValueError:
+            pass
+        result = handler(path, query, body)
+        if isinstance(result, tuple):
+            return result
+        return 200, result
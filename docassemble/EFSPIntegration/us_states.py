@@ -0,0 +1,84 @@
+"""
+Two letter codes for US states and territories, without loading `pycountry` (which
+takes longer to import and search than the rest of this package's client does to load).
+"""
+
+from typing import Dict
+
+__all__ = ["US_STATE_CODES", "state_name_to_code"]
+
+# Lowercase names, as pycountry has them, to codes
+US_STATE_CODES: Dict[str, str] = {
+    "alabama": "AL",
+    "alaska": "AK",
+    "arizona": "AZ",
+    "arkansas": "AR",
+    "california": "CA",
+    "colorado": "CO",
+    "connecticut": "CT",
+    "delaware": "DE",
+    "district of columbia": "DC",
+    "florida": "FL",
+    "georgia": "GA",
+    "hawaii": "HI",
+    "idaho": "ID",
+    "illinois": "IL",
+    "indiana": "IN",
+    "iowa": "IA",
+    "kansas": "KS",
+    "kentucky": "KY",
+    "louisiana": "LA",
+    "maine": "ME",
+    "maryland": "MD",
+    "massachusetts": "MA",
+    "michigan": "MI",
+    "minnesota": "MN",
+    "mississippi": "MS",
+    "missouri": "MO",
+    "montana": "MT",
+    "nebraska": "NE",
+    "nevada": "NV",
+    "new hampshire": "NH",
+    "new jersey": "NJ",
+    "new mexico": "NM",
+    "new york": "NY",
+    "north carolina": "NC",
+    "north dakota": "ND",
+    "ohio": "OH",
+    "oklahoma": "OK",
+    "oregon": "OR",
+    "pennsylvania": "PA",
+    "rhode island": "RI",
+    "south carolina": "SC",
+    "south dakota": "SD",
+    "tennessee": "TN",
+    "texas": "TX",
+    "utah": "UT",
+    "vermont": "VT",
+    "virginia": "VA",
+    "washington": "WA",
+    "west virginia": "WV",
+    "wisconsin": "WI",
+    "wyoming": "WY",
+    "american samoa": "AS",
+    "guam": "GU",
+    "northern mariana islands": "MP",
+    "puerto rico": "PR",
+    "united states minor outlying islands": "UM",
+    "virgin islands, u.s.": "VI",
+}
+
+
+def state_name_to_code(state_name: str) -> str:
+    """The code of a state or other subdivision, like "IL" for "illinois". Names that
+    aren't US states or territories are looked up in pycountry. Returns `state_name` if
+    it can't be found."""
+    code = US_STATE_CODES.get(state_name.strip().lower())
+    if code is not None:
+        return code
+    import pycountry
+
+    try:
+        return pycountry.subdivisions.lookup(state_name).code.split("-")[-1]
+    except LookupError:
+        return state_name